@@ -0,0 +1,85 @@
+"""Benchmarks pooled workspaces against a new workspace per job.
+
+A batch of jobs cycles over a few projects, each with a uv.lock, as the CLI sets them up (the lock backed up
+and seeded). Every job rewrites the working pyproject.toml and writes an output file, and optionally rewrites
+the seeded lock as a re-lock would (uv leaves an unchanged lock untouched). The unpooled and the pooled batches
+alternate, and the best average time per job of each is reported.
+
+Usage:
+    python benchmarks/pool.py [--lock-kb KB] [--base-dir DIR]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from loguru import logger
+
+from pipzap.parsing.pool import WorkspacePool
+from pipzap.parsing.workspace import BackupPath, Workspace
+
+PROJECTS = 8
+JOBS = 400
+BATCHES = 10
+
+
+def _projects(lock_bytes: int) -> List[Path]:
+    line = (
+        '[[package]]\nname = "pkg"\nversion = "1.0.0"\nsource = { registry = "https://pypi.org/simple" }\n\n'
+    )
+    sources = []
+    for index in range(PROJECTS):
+        project = Path(tempfile.mkdtemp())
+        source = project / "pyproject.toml"
+        source.write_text(
+            f"[project]\nname = 'demo{index}'\nversion = '0.1.0'\ndependencies = ['requests']\n"
+        )
+        (project / "uv.lock").write_text("version = 1\n" + line * (lock_bytes // len(line)))
+        sources.append(source)
+    return sources
+
+
+def _batch(
+    sources: List[Path], pool: Optional[WorkspacePool], relock: bool, base_dir: Optional[str]
+) -> float:
+    start = time.perf_counter()
+    for job in range(JOBS):
+        source = sources[job % len(sources)]
+        kwargs = dict(extra_backup=[BackupPath("uv.lock", keep=False)], seed_lock=True, base_dir=base_dir)
+        with pool.workspace(source, **kwargs) if pool else Workspace(source, **kwargs) as workspace:
+            workspace.path.write_text(workspace.path.read_text() + "\n[tool.uv]\n")
+            (workspace.base / "requirements.txt").write_text("requests==2.32.3\n")
+            if relock:
+                with open(workspace.base / "uv.lock", "r+b") as lock:
+                    lock.write(b"version = 1\n")
+    return (time.perf_counter() - start) / JOBS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--lock-kb", type=int, default=450, help="Size of the uv.lock files. Default: 450")
+    parser.add_argument(
+        "--base-dir", help="Directory to create the workspaces in. Default: the temp directory"
+    )
+    args = parser.parse_args()
+    logger.remove()
+
+    sources = _projects(args.lock_kb * 1024)
+
+    for relock in (False, True):
+        unpooled = pooled = float("inf")
+        with WorkspacePool(max_idle=PROJECTS, base_dir=args.base_dir) as pool:
+            for _ in range(BATCHES):
+                unpooled = min(unpooled, _batch(sources, None, relock, args.base_dir))
+                pooled = min(pooled, _batch(sources, pool, relock, args.base_dir))
+
+        title = "jobs re-locking" if relock else "jobs keeping the lock"
+        print(f"{title:<24} unpooled {unpooled * 1000:6.2f} ms    pooled {pooled * 1000:6.2f} ms per job")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmarks re-pruning from a persisted state against the stateless sweep.
+
+Every scenario runs on a synthetic lock graph of 50k packages and 1000 direct dependencies. The stateless and
+the incremental prunes alternate, and the best wall time of each (state loading and saving included) is reported.
+
+Usage:
+    python benchmarks/prune_state.py [--reachable]
+"""
+
+import argparse
+import gc
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from pipzap.core.dependencies import Dependency, ProjectDependencies
+from pipzap.core.prune_state import PruneState
+from pipzap.core.pruner import DependencyPruner
+from pipzap.core.source_format import SourceFormat
+
+NUM_PACKAGES = 50_000
+NUM_DIRECT = 1000
+REPEATS = 15
+
+
+def _project(graph: Dict[str, List[str]], direct: List[str], lock_hash: str) -> ProjectDependencies:
+    key = {name: Dependency(name=name).key for name in graph}
+    return ProjectDependencies(
+        direct=[Dependency(name=name) for name in direct],
+        graph={key[name]: [key[child] for child in children] for name, children in graph.items()},
+        source_format=SourceFormat.UV,
+        lock_hash=lock_hash,
+    )
+
+
+def _prune(project: ProjectDependencies, state_path: Optional[Path], keep: List[str]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    state = PruneState(state_path) if state_path is not None else None
+    DependencyPruner.prune(project, keep=keep, state=state)
+    if state is not None:
+        state.save()
+    return time.perf_counter() - start
+
+
+def _compare(
+    project: ProjectDependencies, state_path: Path, previous: Optional[bytes], keep: List[str]
+) -> Tuple[float, float]:
+    """Best times of a stateless prune and of a prune from the previous state (None for a cold state)."""
+    stateless = incremental = float("inf")
+    for _ in range(REPEATS):
+        stateless = min(stateless, _prune(project, None, keep))
+
+        state_path.unlink(missing_ok=True)
+        if previous is not None:
+            state_path.write_bytes(previous)
+        incremental = min(incremental, _prune(project, state_path, keep))
+    return stateless, incremental
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--reachable", action="store_true", help="Make every package reachable from the roots"
+    )
+    args = parser.parse_args()
+    logger.remove()
+
+    rng = random.Random(0)
+    names = [f"pkg{i}" for i in range(NUM_PACKAGES)]
+    graph = {
+        name: [names[rng.randrange(index + 1, NUM_PACKAGES)] for _ in range(rng.randint(0, 4))]
+        for index, name in enumerate(names[:-1])
+    }
+    graph[names[-1]] = []
+    if args.reachable:
+        for index in range(1, NUM_PACKAGES):
+            graph[names[rng.randrange(index)]].append(names[index])
+    direct = rng.sample(names, NUM_DIRECT)
+
+    # Every scenario re-prunes from the state of the base project
+    state_path = Path(tempfile.mkdtemp()) / "state.bin"
+    base = _project(graph, direct, "base")
+    _prune(base, state_path, [])
+    previous = state_path.read_bytes()
+
+    def scenario(
+        title: str, project: ProjectDependencies, cold: bool = False, keep: Optional[List[str]] = None
+    ):
+        stateless, incremental = _compare(project, state_path, None if cold else previous, keep or [])
+        print(f"{title:<32} stateless {stateless:6.3f} s    with state {incremental:6.3f} s")
+
+    scenario("cold state", base, cold=True)
+    scenario("unchanged lock, new keep-list", base, keep=[direct[0]])
+
+    updated = dict(graph, **{names[-100]: graph[names[-100]] + [names[-1]]})
+    scenario("lock diff, deep package", _project(updated, direct, "deep"))
+
+    updated = dict(graph, **{names[10]: graph[names[10]] + [names[-1]]})
+    scenario("lock diff, shallow package", _project(updated, direct, "shallow"))
+
+    updated = dict(graph, **{"added": [names[-1]], names[20]: graph[names[20]] + ["added"]})
+    scenario("lock diff, added package", _project(updated, direct, "added"))
+
+    updated = dict(graph)
+    for name in rng.sample(names, 50):
+        updated[name] = [names[rng.randrange(NUM_PACKAGES)] for _ in range(rng.randint(0, 4))]
+    scenario("lock diff, 50 random packages", _project(updated, direct, "random"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmarks constructing and deriving dependency records.
+
+100k records over 5000 package names are built, a third of them in a group and a seventh with a marker,
+as a large lock produces them, then each is derived once with `dataclasses.replace`. The best time of each
+step and the memory per record are reported.
+
+Usage:
+    python benchmarks/records.py
+"""
+
+import time
+import tracemalloc
+from dataclasses import replace
+from typing import List
+
+from pipzap.core.dependencies import Dependency
+
+RECORDS = 100_000
+REPEATS = 15
+
+
+def _build(names: List[str]) -> List[Dependency]:
+    return [
+        Dependency(
+            name,
+            groups=frozenset({"dev"}) if index % 3 == 0 else frozenset(),
+            marker="python_version >= '3.9'" if index % 7 == 0 else None,
+            pinned_version="1.0",
+        )
+        for index, name in enumerate(names)
+    ]
+
+
+def main() -> None:
+    names = [f"pkg-{index % 5000}" for index in range(RECORDS)]
+
+    construct = derive = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        records = _build(names)
+        construct = min(construct, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for record in records:
+            replace(record, pinned_version="2.0")
+        derive = min(derive, time.perf_counter() - start)
+
+    del records
+    tracemalloc.start()
+    records = _build(names)
+    size = tracemalloc.get_traced_memory()[0] / RECORDS
+    tracemalloc.stop()
+
+    print(
+        f"construct {construct:.3f} s    replace {derive:.3f} s per {RECORDS} records    {size:.0f} B per record"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmarks setting up and tearing down isolated workspaces.
+
+Every workspace backs up a 5 MB uv.lock of the project (as the CLI does) and seeds its lock from it,
+and the best average time per workspace over a few batches is reported.
+
+Usage:
+    python benchmarks/workspace.py [--base-dir DIR] [--project-dir DIR]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from pipzap.parsing.workspace import BackupPath, Workspace
+
+LOCK_BYTES = 5 * 1024 * 1024
+WORKSPACES = 200
+BATCHES = 10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--base-dir", help="Directory to create the workspaces in. Default: the temp directory"
+    )
+    parser.add_argument(
+        "--project-dir", help="Directory to create the project in. Default: the temp directory"
+    )
+    args = parser.parse_args()
+    logger.remove()
+
+    project = Path(tempfile.mkdtemp(dir=args.project_dir))
+    source = project / "pyproject.toml"
+    source.write_text("[project]\nname = 'demo'\nversion = '0.1.0'\ndependencies = ['requests']\n")
+    line = (
+        '[[package]]\nname = "pkg"\nversion = "1.0.0"\nsource = { registry = "https://pypi.org/simple" }\n\n'
+    )
+    (project / "uv.lock").write_text("version = 1\n" + line * (LOCK_BYTES // len(line)))
+
+    best = float("inf")
+    for _ in range(BATCHES):
+        start = time.perf_counter()
+        for _ in range(WORKSPACES):
+            with Workspace(
+                source,
+                extra_backup=[BackupPath("uv.lock", keep=False)],
+                seed_lock=True,
+                base_dir=args.base_dir,
+            ):
+                pass
+        best = min(best, (time.perf_counter() - start) / WORKSPACES)
+
+    print(f"{best * 1000:.2f} ms per workspace")
+
+
+if __name__ == "__main__":
+    main()
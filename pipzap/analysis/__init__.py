@@ -0,0 +1,6 @@
+from .builds import SourceBuildReport
+from .footprint import FootprintReport
+from .impact import RemovalImpact
+from .query import DependencyQuery
+
+__all__ = ["DependencyQuery", "FootprintReport", "RemovalImpact", "SourceBuildReport"]
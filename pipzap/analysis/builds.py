@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from pipzap.analysis.footprint import fork_environments, package_owners, select_wheel
+from pipzap.core.dependencies import ProjectDependencies
+from pipzap.core.environments import MarkerEvaluator, TargetEnvironment
+from pipzap.parsing.lock_stream import iter_locked_packages
+
+
+@dataclass(frozen=True)
+class SourceBuild:
+    """A locked package that has to be built from source in some of the target environments."""
+
+    name: str
+    """Package name."""
+
+    version: Optional[str]
+    """Locked version."""
+
+    sdist: Optional[str]
+    """File name of the sdist that gets built, None if the lock records none."""
+
+    environments: List[str]
+    """Names of the target environments installing the package without a compatible wheel."""
+
+    required_by: List[str]
+    """Labels of the direct dependencies pulling the package in, in any of those environments."""
+
+
+class SourceBuildReport:
+    """Finds the locked packages that fall back to building their sdist across a target environment matrix.
+
+    The wheel file name tags recorded in uv.lock are matched against the tags every environment supports,
+    in a single streaming pass over the lock. Only packages actually installed in an environment (after
+    evaluating the markers) are reported for it, together with the direct dependencies pulling them in.
+    """
+
+    def __init__(
+        self,
+        dependencies: ProjectDependencies,
+        lock_path: Union[Path, str],
+        environments: Sequence[TargetEnvironment],
+    ):
+        """
+        Args:
+            dependencies: Parsed and resolved project dependencies.
+            lock_path: Path to the uv.lock the dependencies were parsed from.
+            environments: Target environments to check the wheels against.
+        """
+        self.environments = list(environments)
+        self.dependencies = dependencies
+        self.lock_path = lock_path
+
+    def builds(self) -> List[SourceBuild]:
+        """Lists the packages without a compatible wheel in at least one installing environment.
+
+        Returns:
+            The source builds, sorted by package name, in the lock order of the versions.
+        """
+        priorities = [
+            {tag: rank for rank, tag in enumerate(env.supported_tags())} for env in self.environments
+        ]
+        evaluator = MarkerEvaluator(self.environments)
+
+        # Forked resolutions lock a name once per fork, so every locked version keeps the environments
+        # its fork applies to, along with the ones it has no compatible wheel for (both as bitmasks)
+        locked: Dict[str, List[Tuple[Optional[str], Optional[str], int, int]]] = {}
+        for package in iter_locked_packages(self.lock_path):
+            if package.is_local:
+                continue
+
+            forks = fork_environments(package, evaluator)
+
+            missing = 0
+            for index, tags in enumerate(priorities):
+                if select_wheel(package, tags) is None:
+                    missing |= 1 << index
+
+            sdist = package.sdist.filename if package.sdist else None
+            locked.setdefault(package.name, []).append((package.version, sdist, forks, missing))
+
+        if not any(missing for versions in locked.values() for *_, missing in versions):
+            return []
+
+        owners = [package_owners(self.dependencies, env) for env in self.environments]
+
+        builds = []
+        for name, versions in sorted(locked.items()):
+            for version, sdist, forks, missing in versions:
+                environments: List[str] = []
+                required_by: Set[str] = set()
+
+                for index, (labels, by_name) in enumerate(owners):
+                    if not missing >> index & 1 or name not in by_name:
+                        continue
+
+                    # No fork matching the environment (e.g. a bare "3.8" below a ">=3.8.1" fork) keeps them all
+                    if not forks >> index & 1 and any(fork >> index & 1 for *_, fork, _ in versions):
+                        continue
+
+                    environments.append(self.environments[index].name)
+                    required_by.update(label for bit, label in enumerate(labels) if by_name[name] >> bit & 1)
+
+                if environments:
+                    builds.append(SourceBuild(name, version, sdist, environments, sorted(required_by)))
+
+        return builds
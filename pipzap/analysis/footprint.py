@@ -0,0 +1,263 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from packaging.tags import Tag
+from packaging.utils import InvalidWheelFilename, parse_wheel_filename
+
+from pipzap.analysis.query import dependency_label
+from pipzap.core.dependencies import DepKeyT, ProjectDependencies
+from pipzap.core.environments import MarkerEvaluator, TargetEnvironment
+from pipzap.core.graph import components_members, package_name, strongly_connected_components
+from pipzap.parsing.lock_stream import LockedArtifact, LockedPackage, iter_locked_packages
+
+ATTRIBUTIONS = ("fractional", "exclusive")
+
+
+@dataclass(frozen=True)
+class PackageFootprint:
+    """The artifact a package installs from in a target environment."""
+
+    name: str
+    """Package name."""
+
+    size: int
+    """Size of the selected artifact in bytes (0 if unknown)."""
+
+    artifact: Optional[str]
+    """File name of the selected artifact, None if the lock records none."""
+
+    built: bool
+    """Whether no wheel is compatible with the environment, so the sdist has to be built."""
+
+
+@dataclass(frozen=True)
+class RootFootprint:
+    """Install footprint of a direct dependency."""
+
+    label: str
+    """Direct dependency label."""
+
+    closure: int
+    """Total size of everything the dependency installs, in bytes."""
+
+    exclusive: int
+    """Total size of the packages no other direct dependency installs, in bytes."""
+
+    fractional: float
+    """Total size with every shared package split evenly between the dependencies installing it, in bytes."""
+
+    packages: int
+    """Number of packages the dependency installs."""
+
+
+def select_wheel(package: LockedPackage, priorities: Dict[Tag, int]) -> Optional[LockedArtifact]:
+    """Picks the wheel an installer would choose for an environment.
+
+    Args:
+        package: Locked package with its wheels.
+        priorities: Rank of every tag the environment accepts, lower is preferred.
+
+    Returns:
+        The most preferred compatible wheel, None if no wheel is compatible.
+    """
+    best: Optional[LockedArtifact] = None
+    best_rank = len(priorities)
+
+    for wheel in package.wheels:
+        try:
+            *_, tags = parse_wheel_filename(wheel.filename)
+        except InvalidWheelFilename:
+            continue
+
+        rank = min((priorities.get(tag, best_rank) for tag in tags), default=best_rank)
+        if rank < best_rank:
+            best, best_rank = wheel, rank
+
+    return best
+
+
+def fork_environments(package: LockedPackage, evaluator: MarkerEvaluator) -> int:
+    """Evaluates the `resolution-markers` of a locked package version.
+
+    Args:
+        package: Locked package version.
+        evaluator: Evaluator of the target environments.
+
+    Returns:
+        Bitmask of the environments the fork of the version applies to, all of them if the package is not forked.
+    """
+    if not package.resolution_markers:
+        return evaluator.all
+
+    forks = 0
+    for marker in package.resolution_markers:
+        forks |= evaluator.evaluate(marker)
+    return forks
+
+
+def select_artifacts(
+    lock_path: Union[Path, str], environment: TargetEnvironment
+) -> Dict[str, PackageFootprint]:
+    """Selects the artifact of every locked package for an environment, streaming the lock.
+
+    Packages locked more than once (forked resolutions) use the version whose fork applies to the environment.
+    If no fork does (e.g. a bare "3.8" below a ">=3.8.1" fork) or several do, the largest of their artifacts is kept.
+    Local packages without registry artifacts (e.g. the project itself) are skipped.
+
+    Args:
+        lock_path: Path to the uv.lock.
+        environment: Target environment to select the wheels for.
+
+    Returns:
+        Mapping of package names to their selected artifacts.
+    """
+    priorities = {tag: rank for rank, tag in enumerate(environment.supported_tags())}
+    evaluator = MarkerEvaluator([environment])
+    selected: Dict[str, Tuple[bool, PackageFootprint]] = {}
+
+    for package in iter_locked_packages(lock_path):
+        if package.is_local:
+            continue
+
+        wheel = select_wheel(package, priorities)
+        artifact = wheel or package.sdist
+        footprint = PackageFootprint(
+            name=package.name,
+            size=(artifact.size or 0) if artifact else 0,
+            artifact=artifact.filename if artifact else None,
+            built=wheel is None,
+        )
+
+        applies = bool(fork_environments(package, evaluator))
+        current = selected.get(package.name)
+        if current is None or (current[0], current[1].size) < (applies, footprint.size):
+            selected[package.name] = (applies, footprint)
+
+    return {name: footprint for name, (_, footprint) in selected.items()}
+
+
+def package_owners(
+    dependencies: ProjectDependencies, environment: TargetEnvironment
+) -> Tuple[List[str], Dict[str, int]]:
+    """Maps every package installed in an environment to the bitset of direct dependencies installing it.
+
+    The owner bitsets are propagated in a single sweep over the condensation of the environment's graph
+    (from the roots down), so shared packages are attributed to all of their owners at once.
+
+    Args:
+        dependencies: Parsed and resolved project dependencies.
+        environment: Target environment to evaluate the markers in.
+
+    Returns:
+        A tuple of (labels of the installed direct dependencies, indexed by bit, package owner bitsets).
+    """
+    evaluator = MarkerEvaluator([environment])
+    graph = dependencies.graph.including(key for dep in dependencies.direct for key in dep.node_keys)
+    graph = graph.restricted(bytes(evaluator.evaluate(marker, default=False) for marker in graph.markers))
+
+    # Dependencies sharing a key (e.g. `pkg` and `pkg[x]`) are a single root
+    roots: Dict[DepKeyT, List[int]] = {}
+    for dep in dependencies.direct:
+        if evaluator.evaluate(dep.marker):
+            roots.setdefault(dep.key, []).extend(graph.node_id(key) for key in dep.node_keys)
+
+    offsets, targets = graph.offsets, graph.targets
+    component, num_components = strongly_connected_components(graph)
+    owners = [0] * num_components
+    for index, nodes in enumerate(roots.values()):
+        for node in nodes:
+            owners[component[node]] |= 1 << index
+
+    # Components are numbered sinks-first, so walking them backwards visits every predecessor first
+    members = components_members(component, num_components)
+    for comp in range(num_components - 1, -1, -1):
+        if not owners[comp]:
+            continue
+
+        for node in members[comp]:
+            for child in targets[offsets[node] : offsets[node + 1]]:
+                owners[component[child]] |= owners[comp]
+
+    by_name: Dict[str, int] = {}
+    for node in range(graph.num_nodes):
+        if owners[component[node]]:
+            name = package_name(graph.key_of(node))
+            by_name[name] = by_name.get(name, 0) | owners[component[node]]
+
+    return [dependency_label(key) for key in roots], by_name
+
+
+class FootprintReport:
+    """Install footprint of every direct dependency in a target environment, from the artifact sizes in uv.lock."""
+
+    def __init__(
+        self,
+        dependencies: ProjectDependencies,
+        lock_path: Union[Path, str],
+        environment: TargetEnvironment,
+    ):
+        """
+        Args:
+            dependencies: Parsed and resolved project dependencies.
+            lock_path: Path to the uv.lock the dependencies were parsed from.
+            environment: Target environment to select the wheels and evaluate the markers for.
+        """
+        self.environment = environment
+        self.packages = select_artifacts(lock_path, environment)
+        self._labels, self._owners = package_owners(dependencies, environment)
+
+    @property
+    def total(self) -> int:
+        """Size of everything installed, in bytes."""
+        return sum(self.packages[name].size for name in self._owners if name in self.packages)
+
+    @property
+    def built(self) -> List[PackageFootprint]:
+        """Installed packages without a compatible wheel."""
+        return [
+            self.packages[name]
+            for name in sorted(self._owners)
+            if name in self.packages and self.packages[name].built
+        ]
+
+    def roots(self, attribution: str = "fractional") -> List[RootFootprint]:
+        """Ranks the direct dependencies by their footprint.
+
+        Args:
+            attribution: How shared packages count towards the ranking: split evenly between their owners
+                         ("fractional") or not at all ("exclusive"). Default: "fractional".
+
+        Returns:
+            Footprints of the installed direct dependencies, the heaviest first.
+        """
+        if attribution not in ATTRIBUTIONS:
+            raise ValueError(
+                f"Unknown attribution '{attribution}', expected one of: {', '.join(ATTRIBUTIONS)}"
+            )
+
+        closure = [0] * len(self._labels)
+        exclusive = [0] * len(self._labels)
+        fractional = [0.0] * len(self._labels)
+        packages = [0] * len(self._labels)
+
+        for name, owners in self._owners.items():
+            size = self.packages[name].size if name in self.packages else 0
+            indices = []
+            while owners:
+                lowest = owners & -owners
+                indices.append(lowest.bit_length() - 1)
+                owners ^= lowest
+
+            for index in indices:
+                closure[index] += size
+                fractional[index] += size / len(indices)
+                packages[index] += 1
+                if len(indices) == 1:
+                    exclusive[index] += size
+
+        footprints = [
+            RootFootprint(label, closure[index], exclusive[index], fractional[index], packages[index])
+            for index, label in enumerate(self._labels)
+        ]
+        return sorted(footprints, key=lambda root: (-getattr(root, attribution), root.label))
@@ -0,0 +1,152 @@
+from collections import Counter
+from typing import Dict, List, Optional
+
+from pipzap.analysis.query import dependency_label
+from pipzap.core.dependencies import DepKeyT, ProjectDependencies
+from pipzap.core.environments import MarkerEvaluator, TargetEnvironment
+from pipzap.core.graph import package_name
+
+
+class RemovalImpact:
+    """Answers "what leaves the environment if this direct dependency is dropped?" for every direct dependency.
+
+    A dominator tree is built over the lock graph, rooted at a virtual project node. Every direct
+    dependency gets a virtual node in between, pointing at the nodes it installs (the package and
+    its required extras). A node is dominated by that virtual node if and only if every path from the project
+    to it goes through the dependency, so the dominated subtrees are exactly the exclusively-owned packages,
+    all obtained from a single tree without re-resolving anything.
+    """
+
+    def __init__(self, dependencies: ProjectDependencies, environment: Optional[TargetEnvironment] = None):
+        """
+        Args:
+            dependencies: Parsed and resolved project dependencies to analyze.
+            environment: Target environment to evaluate the markers in. If None, every edge
+                         and dependency is considered installed. Default: None.
+        """
+        self.dependencies = dependencies
+        graph = dependencies.graph.including(key for dep in dependencies.direct for key in dep.node_keys)
+
+        evaluator = MarkerEvaluator([environment]) if environment is not None else None
+        if evaluator is not None:
+            graph = graph.restricted(
+                bytes(evaluator.evaluate(marker, default=False) for marker in graph.markers)
+            )
+
+        # Dependencies sharing a key (e.g. `pkg` and `pkg[x]`) are dropped together, so they share a virtual node
+        self._installs: Dict[DepKeyT, List[int]] = {}
+        for dep in dependencies.direct:
+            nodes = self._installs.setdefault(dep.key, [])
+            if evaluator is None or evaluator.evaluate(dep.marker):
+                nodes.extend(graph.node_id(key) for key in dep.node_keys)
+
+        self._graph = graph
+        self._idom = self._immediate_dominators()
+
+    def exclusive(self) -> Dict[str, List[str]]:
+        """Lists the packages every direct dependency exclusively owns.
+
+        Returns:
+            Mapping of direct dependency labels to the sorted names of the packages that would no longer be
+            installed without the dependency (including its own package, unless something else pulls it in).
+            Dependencies not installed in the target environment are omitted.
+        """
+        graph = self._graph
+        num_nodes = graph.num_nodes
+        children: List[List[int]] = [[] for _ in range(len(self._idom))]
+        for node, idom in enumerate(self._idom):
+            if idom >= 0 and node != idom:
+                children[idom].append(node)
+
+        # Package names are spread over several nodes (groups, extras), so a name only leaves with all of its nodes
+        installed = Counter(
+            package_name(graph.key_of(node)) for node in range(num_nodes) if self._idom[node] >= 0
+        )
+
+        owned: Dict[str, List[str]] = {}
+        for index, (key, nodes) in enumerate(self._installs.items()):
+            if not nodes:
+                continue
+
+            subtree: Counter = Counter()
+            stack = list(children[num_nodes + index])
+            while stack:
+                node = stack.pop()
+                subtree[package_name(graph.key_of(node))] += 1
+                stack.extend(children[node])
+
+            owned[dependency_label(key)] = sorted(
+                name for name, count in subtree.items() if count == installed[name]
+            )
+
+        return owned
+
+    def _immediate_dominators(self) -> List[int]:
+        """Computes the immediate dominator of every node with the Cooper-Harvey-Kennedy iterative algorithm.
+
+        The nodes are the graph nodes, followed by a virtual node per direct dependency key and the virtual root.
+
+        Returns:
+            The immediate dominator of every node (the root dominates itself), -1 for the unreachable nodes.
+        """
+        graph = self._graph
+        num_nodes = graph.num_nodes
+        offsets, targets = graph.offsets, graph.targets
+        dep_nodes = list(self._installs.values())
+        root = num_nodes + len(dep_nodes)
+        root_nodes = [num_nodes + index for index, nodes in enumerate(dep_nodes) if nodes]
+
+        def successors(node: int) -> List[int]:
+            if node < num_nodes:
+                return list(targets[offsets[node] : offsets[node + 1]])
+            return dep_nodes[node - num_nodes] if node != root else root_nodes
+
+        # Iterative DFS postorder from the virtual root
+        postorder: List[int] = []
+        order = [-1] * (root + 1)
+        visited = bytearray(root + 1)
+        visited[root] = 1
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if not visited[child]:
+                    visited[child] = 1
+                    work.append((child, iter(successors(child))))
+                    break
+            else:
+                work.pop()
+                order[node] = len(postorder)
+                postorder.append(node)
+
+        predecessors: List[List[int]] = [[] for _ in range(root + 1)]
+        for node in postorder:
+            for child in successors(node):
+                predecessors[child].append(node)
+
+        idom = [-1] * (root + 1)
+        idom[root] = root
+
+        def intersect(left: int, right: int) -> int:
+            while left != right:
+                while order[left] < order[right]:
+                    left = idom[left]
+                while order[right] < order[left]:
+                    right = idom[right]
+            return left
+
+        changed = True
+        while changed:
+            changed = False
+            for node in reversed(postorder[:-1]):
+                new_idom = -1
+                for parent in predecessors[node]:
+                    if idom[parent] == -1:
+                        continue
+                    new_idom = parent if new_idom == -1 else intersect(parent, new_idom)
+
+                if idom[node] != new_idom:
+                    idom[node] = new_idom
+                    changed = True
+
+        return idom
@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+from pipzap.core.dependencies import DepKeyT, ProjectDependencies
+from pipzap.core.graph import DependencyGraph, package_name
+from pipzap.exceptions import QueryError
+from pipzap.utils.names import canonical_name
+
+
+def dependency_label(key: DepKeyT) -> str:
+    """Human-readable label of a direct dependency key, e.g. `pytest (dev)`."""
+    name, groups, extras = key
+    contexts = [*sorted(groups), *(f"extra:{extra}" for extra in sorted(extras))]
+    return f"{name} ({', '.join(contexts)})" if contexts else name
+
+
+class DependencyQuery:
+    """Answers "who pulls this in?"-style questions over a resolved dependency graph.
+
+    The reverse-edge index is built once on construction, so every query is a single linear
+    traversal of the already parsed graph, with no re-resolution involved.
+    """
+
+    def __init__(self, dependencies: ProjectDependencies):
+        """
+        Args:
+            dependencies: Parsed and resolved project dependencies to query.
+        """
+        self.dependencies = dependencies
+        self._graph = dependencies.graph.including(
+            key for dep in dependencies.direct for key in dep.node_keys
+        )
+        self._reverse = self._graph.reversed()
+
+        # The project itself is the synthetic root of the lock, not a dependent of anything it requires
+        project = (dependencies.uv_pyproject_source or {}).get("project", {}).get("name")
+        self._root = canonical_name(project) if project else None
+
+        # Forked packages have a node per locked version next to their package node
+        self._packages: Dict[str, List[int]] = {}
+        for node in range(self._graph.num_nodes):
+            key = self._graph.key_of(node)
+            name, groups, extras = key
+            if not groups and not extras and "[" not in name:
+                self._packages.setdefault(package_name(key), []).append(node)
+
+    def why(self, package: str) -> Dict[str, List[str]]:
+        """Finds the shortest dependency path from each direct dependency to the package.
+
+        Args:
+            package: Name of the package to explain.
+
+        Returns:
+            Mapping of direct dependency labels to the package names along the shortest path,
+            starting with the direct dependency and ending with the package itself.
+            Direct dependencies that do not pull the package in are omitted.
+        """
+        targets = self._nodes(package)
+        name = canonical_name(package)
+        next_hop: Dict[int, Optional[int]] = {target: None for target in targets}
+        queue = deque(targets)
+
+        # Direct dependencies in groups and extras are separate nodes of the same package
+        for dep in self.dependencies.direct:
+            if dep.canonical == name:
+                next_hop[self._graph.node_id(dep.key)] = None
+
+        while queue:
+            node = queue.popleft()
+            for parent in self._reverse.successors(node):
+                if parent not in next_hop and package_name(self._graph.key_of(parent)) != self._root:
+                    next_hop[parent] = node
+                    queue.append(parent)
+
+        paths: Dict[str, List[str]] = {}
+        for dep in self.dependencies.direct:
+            label = dependency_label(dep.key)
+            for node in map(self._graph.node_id, dep.node_keys):
+                if node not in next_hop:
+                    continue
+
+                path = []
+                current: Optional[int] = node
+                while current is not None:
+                    path.append(self._graph.key_of(current)[0])
+                    current = next_hop[current]
+
+                # A required extra may offer a shorter path than the package itself
+                if label not in paths or len(path) < len(paths[label]):
+                    paths[label] = path
+
+        return paths
+
+    def rdeps(self, package: str, transitive: bool = False) -> List[str]:
+        """Lists the packages depending on the given one.
+
+        Args:
+            package: Name of the package to find dependents of.
+            transitive: Whether to include indirect dependents as well. Default: False.
+
+        Returns:
+            Sorted names of the dependent packages.
+        """
+        return self._collect(self._reverse, self._nodes(package), transitive)
+
+    def closure(self, package: str) -> List[str]:
+        """Lists every package the given one (transitively) depends on.
+
+        Args:
+            package: Name of the package to find dependencies of.
+
+        Returns:
+            Sorted names of the packages in the transitive closure (extras activated along the way included),
+            excluding the package itself.
+        """
+        return self._collect(self._graph, self._nodes(package), transitive=True)
+
+    def _nodes(self, package: str) -> List[int]:
+        nodes = self._packages.get(canonical_name(package))
+        if nodes is None:
+            raise QueryError(f"Package '{package}' is not present in the resolved dependency graph")
+        return nodes
+
+    def _collect(self, graph: DependencyGraph, starts: List[int], transitive: bool) -> List[str]:
+        """Gathers the names of nodes reachable from `starts` (or only their neighbours if not `transitive`)."""
+        seen = set(starts)
+        stack = list(starts)
+
+        while stack:
+            for child in graph.successors(stack.pop()):
+                if child in seen:
+                    continue
+
+                seen.add(child)
+                if transitive:
+                    stack.append(child)
+
+        names = {package_name(self._graph.key_of(node)) for node in seen}
+        names.discard(package_name(self._graph.key_of(starts[0])))
+        if self._root:
+            names.discard(self._root)
+        return sorted(names)
@@ -1,18 +1,25 @@
 import argparse
 import sys
 from pathlib import Path
-from typing import Dict, Optional, Set, Type
+from typing import Dict, List, Optional, Set, Type
 
 from loguru import logger
 
 from pipzap import __uv_version__ as uv_version
 from pipzap import __version__ as zap_version
+from pipzap.analysis import DependencyQuery, FootprintReport, RemovalImpact, SourceBuildReport
+from pipzap.analysis.footprint import ATTRIBUTIONS
 from pipzap.core import DependencyPruner, SourceFormat
+from pipzap.core.environments import DEFAULT_PLATFORMS, PLATFORMS, TargetEnvironment, environment_matrix
+from pipzap.core.prune_state import PruneState
 from pipzap.discovery import discover_dependencies
 from pipzap.formatting import CondaFormatter, PoetryFormatter, RequirementsTXTFormatter, UVFormatter
 from pipzap.formatting.base import DependenciesFormatter
 from pipzap.parsing import DependenciesParser, ProjectConverter, Workspace
+from pipzap.parsing.graph_cache import GraphCache
 from pipzap.parsing.workspace import BackupPath
+from pipzap.utils.pretty_string import format_size, pluralize
+from pipzap.utils.requirement_string import parse_requirement_string
 
 KNOWN_FORMATTERS: Dict[SourceFormat, Type[DependenciesFormatter]] = {
     SourceFormat.POETRY: PoetryFormatter,
@@ -21,22 +28,44 @@ KNOWN_FORMATTERS: Dict[SourceFormat, Type[DependenciesFormatter]] = {
     SourceFormat.CONDA: CondaFormatter,
 }
 
+QUERY_COMMANDS: Dict[str, str] = {
+    "why": "Show the shortest path from each direct dependency to a package",
+    "rdeps": "List the packages depending on a package",
+    "closure": "List the transitive dependencies of a package",
+    "impact": "List the packages every direct dependency exclusively pulls in",
+    "footprint": "Rank the direct dependencies by the size of the wheels they install",
+    "builds": "List the packages without a compatible wheel that would be built from source",
+}
+
+PACKAGE_QUERIES = {"why", "rdeps", "closure"}
+MATRIX_QUERIES = {"builds"}
+
 
 class PipZapCLI:
     def __init__(self) -> None:
         self.parser = argparse.ArgumentParser(
             description="Dependency pruning and merging tool",
+            epilog=f"Query an existing uv.lock with: pipzap {{{','.join(QUERY_COMMANDS)}}} [PACKAGE] [FILE]. "
+            f"v{zap_version}",
+        )
+        self.query_parser = argparse.ArgumentParser(
+            prog="pipzap",
+            description="Query the dependency graph of an already locked uv project",
             epilog=zap_version,
         )
         self._setup_parser()
+        self._setup_query_parser()
 
     def run(self, do_raise: bool = False, args: Optional[argparse.Namespace] = None) -> None:
-        args = args or self.parser.parse_args()
+        args = args or self._parse_args(sys.argv[1:])
 
         if not args.verbose:
             logger.remove()
             logger.add(sys.stderr, format="<level>• {message}</level>", level="INFO")
 
+        if getattr(args, "command", None):
+            return self._run_query(args, do_raise)
+
         version_level = logger.debug if not args.version else logger.info
         version_level(f"Starting PipZap v{zap_version} (uv v{uv_version})")
 
@@ -89,21 +118,36 @@ class PipZapCLI:
                 BackupPath("pyproject.toml", keep=True),
             ]
 
-            with Workspace(args.file, args.no_isolation, extra_backup=to_backup) as workspace:
+            with Workspace(
+                args.file,
+                args.no_isolation,
+                extra_backup=to_backup,
+                seed_lock=args.warm_lock,
+                timeout=args.timeout,
+                base_dir=args.workspace_dir,
+            ) as workspace:
                 logger.debug(f"Source data:\n{workspace.path.read_text()}")
 
                 source_format = ProjectConverter(args.python_version).convert_to_uv(workspace)
-                parsed = DependenciesParser.parse(workspace, source_format)
+                cache = None if args.no_cache else GraphCache.default()
+                parsed = DependenciesParser.parse(workspace, source_format, cache)
+                state = None if args.no_cache else PruneState.for_project(args.file)
                 pruned = DependencyPruner.prune(
                     parsed,
                     args.keep,
                     preserve_all=args.preserve_all,
                     workspace=workspace,
+                    environments=self._target_environments(args),
+                    cross_group=args.cross_group,
+                    aggressive=args.aggressive,
+                    state=state,
                 )
+                if state is not None:
+                    state.save()
 
                 if discovered_packages:
                     original_count = len(pruned.direct)
-                    pruned.direct = [dep for dep in pruned.direct if dep.name.lower() in discovered_packages]
+                    pruned.direct = [dep for dep in pruned.direct if dep.canonical in discovered_packages]
                     filtered_count = original_count - len(pruned.direct)
 
                     if filtered_count > 0:
@@ -115,6 +159,9 @@ class PipZapCLI:
 
                 result = KNOWN_FORMATTERS[args.format or source_format](workspace, pruned).format()
 
+            requirements = parse_requirement_string.cache_info()
+            logger.debug(f"Requirement strings: {requirements.misses} parsed, {requirements.hits} reused")
+
             if not args.output:
                 logger.success("Result:")
                 print("\n" + result)
@@ -138,6 +185,180 @@ class PipZapCLI:
             if do_raise:
                 raise err
 
+    @staticmethod
+    def _target_environments(args: argparse.Namespace) -> Optional[List[TargetEnvironment]]:
+        """Builds the target environment matrix, or None if no targets were requested."""
+        if not args.target_python and not args.target_platform:
+            return None
+
+        python_versions = args.target_python or [
+            args.python_version or f"{sys.version_info.major}.{sys.version_info.minor}"
+        ]
+        return environment_matrix(python_versions, args.target_platform or DEFAULT_PLATFORMS)
+
+    @staticmethod
+    def _query_environment(args: argparse.Namespace, default: bool = False) -> Optional[TargetEnvironment]:
+        """Builds the single target environment of a query, or None if no target was requested and not `default`."""
+        if not args.target_python and not args.target_platform and not default:
+            return None
+
+        python_version = args.target_python or f"{sys.version_info.major}.{sys.version_info.minor}"
+        return TargetEnvironment.from_strings(python_version, args.target_platform or "linux")
+
+    @staticmethod
+    def _query_matrix(args: argparse.Namespace) -> List[TargetEnvironment]:
+        """Builds the target environment matrix of a query, defaulting to the current Python on every platform."""
+        python_versions = args.target_python or [f"{sys.version_info.major}.{sys.version_info.minor}"]
+        return environment_matrix(python_versions, args.target_platform or DEFAULT_PLATFORMS)
+
+    def _parse_args(self, argv: List[str]) -> argparse.Namespace:
+        if argv and argv[0] in QUERY_COMMANDS:
+            return self.query_parser.parse_args(argv)
+        return self.parser.parse_args(argv)
+
+    def _run_query(self, args: argparse.Namespace, do_raise: bool) -> None:
+        """Answers a graph query from an existing `uv.lock`, without re-resolving the project."""
+        try:
+            cache = None if args.no_cache else GraphCache.default()
+            dependencies = DependenciesParser.parse_locked(args.file, cache)
+
+            if args.command == "impact":
+                owned = RemovalImpact(dependencies, self._query_environment(args)).exclusive()
+                for label, names in sorted(owned.items(), key=lambda item: (-len(item[1]), item[0])):
+                    print(f"{label}: {len(names)} packages" + (f" ({', '.join(names)})" if names else ""))
+                return
+
+            lock_path = (args.file if args.file.is_dir() else args.file.parent) / "uv.lock"
+
+            if args.command == "footprint":
+                environment = self._query_environment(args, default=True)
+                assert environment, "[internal assertion] Footprint requires a target environment"
+
+                report = FootprintReport(dependencies, lock_path, environment)
+                print(f"Footprint for {environment.name}: {format_size(report.total)}")
+                for root in report.roots(args.attribution):
+                    print(
+                        f"    {root.label}: {format_size(getattr(root, args.attribution))} {args.attribution}, "
+                        f"{format_size(root.closure)} closure of {pluralize(root.packages, 'package')}"
+                    )
+                for package in report.built:
+                    print(
+                        f"    ! {package.name}: no compatible wheel, builds {package.artifact or 'from source'}"
+                    )
+                return
+
+            if args.command == "builds":
+                environments = self._query_matrix(args)
+                builds = SourceBuildReport(dependencies, lock_path, environments).builds()
+                if not builds:
+                    print(
+                        f"Every installed package has a compatible wheel in {len(environments)} environments"
+                    )
+                    return
+
+                for build in builds:
+                    where = "every environment" if len(build.environments) == len(environments) else None
+                    print(
+                        f"{build.name} {build.version or ''}".rstrip()
+                        + f": builds {build.sdist or 'from source'} on {where or ', '.join(build.environments)}"
+                        + f" (required by {', '.join(build.required_by)})"
+                    )
+                return
+
+            query = DependencyQuery(dependencies)
+
+            if args.command == "why":
+                paths = query.why(args.package)
+                if not paths:
+                    print(f"{args.package} is not required by any direct dependency")
+                    return
+
+                print(f"{args.package} is required by:")
+                for direct, path in sorted(paths.items()):
+                    print(f"    {direct}: {' -> '.join(path)}")
+                return
+
+            if args.command == "rdeps":
+                names = query.rdeps(args.package, transitive=args.transitive)
+            else:
+                names = query.closure(args.package)
+
+            print("\n".join(names) if names else "(none)")
+
+        except Exception as err:
+            if args.verbose:
+                logger.exception(err)
+            else:
+                logger.error(err)
+
+            if do_raise:
+                raise err
+
+    def _setup_query_parser(self):
+        subparsers = self.query_parser.add_subparsers(dest="command", required=True)
+
+        for command, help in QUERY_COMMANDS.items():
+            subparser = subparsers.add_parser(command, help=help, description=help)
+            if command in PACKAGE_QUERIES:
+                subparser.add_argument("package", type=str, help="Name of the package to query")
+
+            subparser.add_argument(
+                "file",
+                type=Path,
+                nargs="?",
+                default=Path("pyproject.toml"),
+                help="Path to the uv pyproject.toml with a uv.lock next to it (defaults to ./pyproject.toml)",
+            )
+            subparser.add_argument("-v", "--verbose", action="store_true", help="Produce richer logs")
+            subparser.add_argument(
+                "--no-cache", action="store_true", help="Neither read nor write the graph cache"
+            )
+
+            if command == "rdeps":
+                subparser.add_argument(
+                    "-t",
+                    "--transitive",
+                    action="store_true",
+                    help="Include indirect dependents as well",
+                )
+
+            if command in MATRIX_QUERIES:
+                subparser.add_argument(
+                    "--target-python",
+                    type=str,
+                    nargs="+",
+                    metavar="VERSION",
+                    help="Target Python versions (defaults to the current one)",
+                )
+                subparser.add_argument(
+                    "--target-platform",
+                    type=str,
+                    nargs="+",
+                    choices=list(PLATFORMS),
+                    metavar="PLATFORM",
+                    help=f"Target platforms (defaults to {', '.join(DEFAULT_PLATFORMS)})",
+                )
+            elif command not in PACKAGE_QUERIES:
+                subparser.add_argument(
+                    "--target-python",
+                    type=str,
+                    help="Target Python version (defaults to the current one when a target is needed)",
+                )
+                subparser.add_argument(
+                    "--target-platform",
+                    type=str,
+                    choices=list(PLATFORMS),
+                    help="Target platform (defaults to linux when a target is needed)",
+                )
+
+            if command == "footprint":
+                subparser.add_argument(
+                    "--attribution",
+                    choices=list(ATTRIBUTIONS),
+                    default="fractional",
+                    help="Split shared packages evenly between their owners, or only count exclusive ones",
+                )
+
     def _setup_parser(self):
         self.parser.add_argument("file", type=Path, nargs="?", help="Path to the dependency file")
         self.parser.add_argument("-v", "--verbose", action="store_true", help="Produce richer logs")
@@ -188,8 +409,56 @@ class PipZapCLI:
             action="store_true",
             help="Discover dependencies by scanning Python source files with pipreqs",
         )
+        self.parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Neither read nor write the parsed graph cache and the pruning state",
+        )
         self.parser.add_argument(
             "--preserve-all",
             action="store_true",
             help="Re-check and add back any dependencies that would be missing after pruning",
         )
+        self.parser.add_argument(
+            "--warm-lock",
+            action="store_true",
+            help="Seed resolution with the existing uv.lock next to the source file and keep it across re-locks",
+        )
+        self.parser.add_argument(
+            "--timeout",
+            type=float,
+            default=None,
+            metavar="SECONDS",
+            help="Abort when a single uv invocation takes longer than this (defaults to no limit)",
+        )
+        self.parser.add_argument(
+            "--workspace-dir",
+            type=Path,
+            default=None,
+            help="Create the temporary workspaces in this directory, e.g. a RAM-backed /dev/shm "
+            "(defaults to $PIPZAP_WORKSPACE_DIR, then the system temporary directory)",
+        )
+        self.parser.add_argument(
+            "--aggressive",
+            action="store_true",
+            help="Keep only a minimal set of roots whose combined closure installs the same packages",
+        )
+        self.parser.add_argument(
+            "--cross-group",
+            action="store_true",
+            help="Also drop dependency-group and extra deps already installed by the main dependencies",
+        )
+        self.parser.add_argument(
+            "--target-python",
+            type=str,
+            nargs="+",
+            metavar="VERSION",
+            help="Evaluate markers for these Python versions, pruning marker-guarded deps covered in all targets",
+        )
+        self.parser.add_argument(
+            "--target-platform",
+            type=str,
+            nargs="+",
+            choices=list(PLATFORMS),
+            help=f"Evaluate markers for these platforms (defaults to {', '.join(DEFAULT_PLATFORMS)} with --target-python)",
+        )
@@ -1,43 +1,147 @@
-from dataclasses import dataclass, field
-from typing import Dict, FrozenSet, List, Optional, Tuple
+import sys
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, FrozenSet, Iterable, List, Optional, Tuple
 
+from pipzap.core.graph import DepKeyT, DependencyGraph, extra_key
 from pipzap.core.source_format import SourceFormat
+from pipzap.utils.names import canonical_name
 from pipzap.utils.pretty_string import format_project_dependencies
 
-DepKeyT = Tuple[str, FrozenSet[str], FrozenSet[str]]
+INTERN_CACHE_SIZE = 4096
+"""Number of distinct group, extra and marker sets shared between the records."""
 
+_EMPTY: FrozenSet[str] = frozenset()
 
-@dataclass
+
+@lru_cache(maxsize=INTERN_CACHE_SIZE)
+def _shared_set(values: FrozenSet[str]) -> FrozenSet[str]:
+    return frozenset(sys.intern(str(value)) for value in values)
+
+
+def _intern_set(values: Iterable[str]) -> FrozenSet[str]:
+    """Returns the shared instance of a frozenset of strings (group, extra and marker sets repeat a lot)."""
+    if not values:
+        return _EMPTY
+    # A shared instance is found by identity, without hashing or comparing its members again
+    return _shared_set(values if type(values) is frozenset else frozenset(values))
+
+
+def _intern_str(value: Optional[str]) -> Optional[str]:
+    """Interns a string, converting `str` subclasses (e.g. tomlkit strings) first."""
+    if value is None:
+        return None
+    return sys.intern(value if type(value) is str else str(value))
+
+
+@dataclass(frozen=True, init=False)
 class Dependency:
-    """Represents a dependency with potentially multiple contexts and its own extras."""
+    """Represents a dependency with potentially multiple contexts and its own extras.
+
+    Records are immutable (use `dataclasses.replace` to derive one), slotted, and their strings and string sets
+    are interned, so that large projects share the storage of repeated groups and markers.
+    """
+
+    # Declared rather than generated by `@dataclass(slots=True)`, which requires Python 3.10.
+    # The fields have no class-level defaults, which would conflict with the slots: `__init__` sets them
+    __slots__ = (
+        "name",
+        "groups",
+        "extras",
+        "marker",
+        "index",
+        "required_extras",
+        "pinned_version",
+        "indirect_markers",
+        "_key",
+    )
 
     name: str
     """Package name (e.g., "torch")."""
 
-    groups: FrozenSet[str] = field(default_factory=frozenset)
+    groups: FrozenSet[str]
     """Group names the dependency belongs to."""
 
-    extras: FrozenSet[str] = field(default_factory=frozenset)
+    extras: FrozenSet[str]
     """Names of extras the dependency belongs to."""
 
-    marker: Optional[str] = None
+    marker: Optional[str]
     """Marker of the dependency from pyproject.toml (e.g., "python_version >= '3.8'")."""
 
-    index: Optional[str] = None
+    index: Optional[str]
     """Name of the custom index to use for the dependency."""
 
-    required_extras: FrozenSet[str] = field(default_factory=frozenset)
+    required_extras: FrozenSet[str]
     """Extras required by this dependency."""
 
-    pinned_version: Optional[str] = None
+    pinned_version: Optional[str]
     """Exact pinned version from uv.lock."""
 
-    indirect_markers: FrozenSet[str] = field(default_factory=frozenset)
+    indirect_markers: FrozenSet[str]
     """Markers from uv.lock where this dependency is required by others."""
 
+    def __init__(
+        self,
+        name: str,
+        groups: Iterable[str] = _EMPTY,
+        extras: Iterable[str] = _EMPTY,
+        marker: Optional[str] = None,
+        index: Optional[str] = None,
+        required_extras: Iterable[str] = _EMPTY,
+        pinned_version: Optional[str] = None,
+        indirect_markers: Iterable[str] = _EMPTY,
+    ):
+        # Frozen, so the fields are set through the slot descriptors (see below). Empty sets and
+        # missing strings, most of them, skip the interning calls
+        name = sys.intern(name if type(name) is str else str(name))
+        groups = _intern_set(groups) if groups else _EMPTY
+        extras = _intern_set(extras) if extras else _EMPTY
+        _set_name(self, name)
+        _set_groups(self, groups)
+        _set_extras(self, extras)
+        _set_marker(self, marker if marker is None else _intern_str(marker))
+        _set_index(self, index if index is None else _intern_str(index))
+        _set_required_extras(self, _intern_set(required_extras) if required_extras else _EMPTY)
+        _set_pinned_version(self, pinned_version if pinned_version is None else _intern_str(pinned_version))
+        _set_indirect_markers(self, _intern_set(indirect_markers) if indirect_markers else _EMPTY)
+        self._key: DepKeyT  # normalized key, not a field
+        _set_key(self, (canonical_name(name), groups, extras))
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, item.name) for item in fields(self))
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        Dependency.__init__(self, *state)
+
     @property
     def key(self) -> DepKeyT:
-        return (self.name.lower(), frozenset(self.groups), frozenset(self.extras))
+        """Normalized `(name, groups, extras)` key, computed once."""
+        return self._key
+
+    @property
+    def canonical(self) -> str:
+        """Canonical (PEP 503) package name, interned."""
+        return self._key[0]
+
+    @property
+    def node_keys(self) -> List[DepKeyT]:
+        """Graph nodes installed by the dependency: its own node and the nodes of its required extras."""
+        return [self.key, *(extra_key(self.canonical, extra) for extra in sorted(self.required_extras))]
+
+
+# Setting a slot through its descriptor skips the attribute lookup of `object.__setattr__`,
+# which dominates the construction of the records otherwise
+(
+    _set_name,
+    _set_groups,
+    _set_extras,
+    _set_marker,
+    _set_index,
+    _set_required_extras,
+    _set_pinned_version,
+    _set_indirect_markers,
+    _set_key,
+) = (getattr(Dependency, slot).__set__ for slot in Dependency.__slots__)
 
 
 @dataclass
@@ -47,8 +151,8 @@ class ProjectDependencies:
     direct: List[Dependency]
     """Dependencies directly mentioned in the source requirements.txt or pyproject.toml."""
 
-    graph: Dict[DepKeyT, List[DepKeyT]]
-    """Graph of dependency relations."""
+    graph: DependencyGraph
+    """Graph of dependency relations. Plain `Dict[DepKeyT, List[DepKeyT]]` mappings are compacted on init."""
 
     source_format: SourceFormat
     """The format of the original dependencies definition."""
@@ -62,5 +166,12 @@ class ProjectDependencies:
     uv_pyproject_source: Optional[dict] = None
     """Normalized always-uv pyproject.toml version."""
 
+    lock_hash: Optional[str] = None
+    """SHA-256 of the uv.lock contents the graph was parsed from, if any."""
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.graph, DependencyGraph):
+            self.graph = DependencyGraph.from_mapping(self.graph)
+
     def __str__(self) -> str:
         return format_project_dependencies(self)
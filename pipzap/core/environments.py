@@ -0,0 +1,193 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from loguru import logger
+from packaging.markers import InvalidMarker, Marker
+from packaging.tags import Tag, compatible_tags, cpython_tags, mac_platforms
+
+
+@dataclass(frozen=True)
+class TargetPlatform:
+    """Marker-relevant description of an operating system and architecture."""
+
+    name: str
+    """Short name of the platform (e.g., "linux")."""
+
+    sys_platform: str
+    """Value of `sys.platform` (e.g., "linux", "darwin", "win32")."""
+
+    platform_system: str
+    """Value of `platform.system()` (e.g., "Linux", "Darwin", "Windows")."""
+
+    os_name: str
+    """Value of `os.name` (e.g., "posix", "nt")."""
+
+    platform_machine: str
+    """Value of `platform.machine()` (e.g., "x86_64", "arm64")."""
+
+
+PLATFORMS: Dict[str, TargetPlatform] = {
+    platform.name: platform
+    for platform in [
+        TargetPlatform("linux", "linux", "Linux", "posix", "x86_64"),
+        TargetPlatform("linux-aarch64", "linux", "Linux", "posix", "aarch64"),
+        TargetPlatform("macos", "darwin", "Darwin", "posix", "arm64"),
+        TargetPlatform("macos-x86_64", "darwin", "Darwin", "posix", "x86_64"),
+        TargetPlatform("windows", "win32", "Windows", "nt", "AMD64"),
+    ]
+}
+"""Known target platforms by name."""
+
+DEFAULT_PLATFORMS = ["linux", "macos", "windows"]
+
+MAX_GLIBC_MINOR = 39
+"""Newest glibc (`2.x`) the Linux targets are assumed to run, bounding the accepted manylinux tags."""
+
+MACOS_VERSIONS = {"arm64": (14, 0), "x86_64": (13, 0)}
+"""macOS version the macOS targets are assumed to run, per architecture."""
+
+_LEGACY_MANYLINUX = {17: "manylinux2014", 12: "manylinux2010", 5: "manylinux1"}
+
+
+def platform_tags(platform: TargetPlatform) -> List[str]:
+    """Wheel platform tags a target platform accepts, from the most to the least specific."""
+    arch = platform.platform_machine
+
+    if platform.sys_platform == "linux":
+        tags = []
+        for minor in range(MAX_GLIBC_MINOR, 4, -1):
+            tags.append(f"manylinux_2_{minor}_{arch}")
+            if minor in _LEGACY_MANYLINUX:
+                tags.append(f"{_LEGACY_MANYLINUX[minor]}_{arch}")
+        return [*tags, f"linux_{arch}"]
+
+    if platform.sys_platform == "darwin":
+        return list(mac_platforms(MACOS_VERSIONS[arch], arch))
+
+    return ["win_amd64" if arch == "AMD64" else f"win_{arch.lower()}"]
+
+
+@dataclass(frozen=True)
+class TargetEnvironment:
+    """A single target environment: a Python version on a platform."""
+
+    python_version: str
+    """Full Python version (e.g., "3.11.0")."""
+
+    platform: TargetPlatform
+    """Target platform."""
+
+    @classmethod
+    def from_strings(cls, python_version: str, platform: str) -> "TargetEnvironment":
+        """Builds an environment out of a "3.11" / "3.11.4"-like version and a known platform name.
+
+        Raises:
+            ValueError: If the version is malformed or the platform is unknown.
+        """
+        if not re.fullmatch(r"\d+\.\d+(\.\d+)?", python_version):
+            raise ValueError(f"Invalid target Python version '{python_version}', expected e.g. '3.11'")
+
+        if platform not in PLATFORMS:
+            raise ValueError(f"Unknown target platform '{platform}', expected one of: {', '.join(PLATFORMS)}")
+
+        if python_version.count(".") == 1:
+            python_version = f"{python_version}.0"
+
+        return cls(python_version, PLATFORMS[platform])
+
+    @property
+    def name(self) -> str:
+        return f"py{self.python_version}-{self.platform.name}"
+
+    def supported_tags(self) -> List[Tag]:
+        """Wheel tags a CPython interpreter of the environment accepts, from the most to the least preferred."""
+        major, minor, *_ = (int(part) for part in self.python_version.split("."))
+        platforms = platform_tags(self.platform)
+        return [
+            *cpython_tags((major, minor), platforms=platforms),
+            *compatible_tags((major, minor), f"cp{major}{minor}", platforms),
+        ]
+
+    def marker_environment(self) -> Dict[str, str]:
+        """The environment as expected by `packaging.markers.Marker.evaluate`."""
+        major, minor, *_ = self.python_version.split(".")
+        return {
+            "implementation_name": "cpython",
+            "implementation_version": self.python_version,
+            "os_name": self.platform.os_name,
+            "platform_machine": self.platform.platform_machine,
+            "platform_python_implementation": "CPython",
+            "platform_release": "",
+            "platform_system": self.platform.platform_system,
+            "platform_version": "",
+            "python_full_version": self.python_version,
+            "python_version": f"{major}.{minor}",
+            "sys_platform": self.platform.sys_platform,
+            "extra": "",
+        }
+
+
+def environment_matrix(python_versions: Iterable[str], platforms: Iterable[str]) -> List[TargetEnvironment]:
+    """Builds every combination of the target Python versions and platforms."""
+    platforms = list(platforms)
+    return [
+        TargetEnvironment.from_strings(version, platform)
+        for version in python_versions
+        for platform in platforms
+    ]
+
+
+class MarkerEvaluator:
+    """Evaluates environment markers against a fixed set of target environments.
+
+    Each distinct marker string is compiled and evaluated against all the environments once,
+    and the result is cached as a bitmask (bit `i` is set if the marker holds in environment `i`).
+    Lockfiles repeat the same few markers thousands of times, so every further lookup is a dict hit.
+    """
+
+    def __init__(self, environments: Sequence[TargetEnvironment]):
+        """
+        Args:
+            environments: Target environments to evaluate the markers against.
+        """
+        self.environments = list(environments)
+        self._marker_envs = [env.marker_environment() for env in self.environments]
+        self._cache: Dict[str, int] = {}
+
+    @property
+    def all(self) -> int:
+        """Bitmask of all the environments."""
+        return (1 << len(self.environments)) - 1
+
+    @property
+    def num_compiled(self) -> int:
+        return len(self._cache)
+
+    def evaluate(self, marker: Optional[str], default: bool = True) -> int:
+        """Evaluates a marker against every environment.
+
+        Args:
+            marker: Marker string. Holds in every environment if None or empty.
+            default: Whether an unparsable marker is assumed to hold in every environment or in none. Default: True.
+
+        Returns:
+            Bitmask of the environments the marker holds in.
+        """
+        if not marker:
+            return self.all
+
+        mask = self._cache.get(marker)
+        if mask is not None:
+            return mask
+
+        try:
+            compiled = Marker(marker)
+            mask = sum(1 << i for i, env in enumerate(self._marker_envs) if compiled.evaluate(env))
+
+        except (InvalidMarker, KeyError, ValueError) as e:
+            logger.warning(f"Unable to evaluate marker '{marker}': {e}")
+            return self.all if default else 0
+
+        self._cache[marker] = mask
+        return mask
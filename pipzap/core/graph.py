@@ -0,0 +1,420 @@
+import sys
+from array import array
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+DepKeyT = Tuple[str, FrozenSet[str], FrozenSet[str]]
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class DependencyGraph(Mapping[DepKeyT, List[DepKeyT]]):
+    """Compact, immutable graph of dependency relations.
+
+    Every node key is interned to an integer ID once, and the edges are stored in CSR form:
+    the successors of node `i` are `targets[offsets[i]:offsets[i + 1]]`. The hot paths (pruning, queries)
+    operate on these integer arrays directly, while the `Mapping` interface keeps the original
+    `Dict[DepKeyT, List[DepKeyT]]` view for everything else. Only the nodes with a defined adjacency
+    (parents) are the keys of the mapping, the rest are reachable as successors only.
+
+    Extras of a package are separate nodes keyed by `extra_key` (`name[extra]`), pointing at the
+    optional dependencies of that extra. Requesting `pkg[x]` adds edges to both `pkg` and `pkg[x]`.
+
+    A package locked in several versions (forked resolutions) has a node per version, keyed by `fork_key`
+    (`name@version`), and its package node points at all of them, under the markers of their forks.
+
+    Edges may be conditional on an environment marker from uv.lock. Marker strings are interned
+    into a table, and `edge_markers[i]` holds the marker ID of edge `i` (`NO_MARKER` if unconditional).
+    """
+
+    NO_MARKER = -1
+
+    __slots__ = ("_keys", "_ids", "_offsets", "_targets", "_defined", "_edge_markers", "_markers")
+
+    def __init__(
+        self,
+        keys: List[DepKeyT],
+        offsets: array,
+        targets: array,
+        defined: bytearray,
+        ids: Optional[Dict[DepKeyT, int]] = None,
+        edge_markers: Optional[array] = None,
+        markers: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            keys: Node keys, indexed by node ID.
+            offsets: CSR row offsets, `len(keys) + 1` long.
+            targets: CSR successor node IDs.
+            defined: Per-node flags of whether the node is a key of the mapping.
+            ids: Reverse index of `keys`. Built from `keys` if None. Default: None.
+            edge_markers: Marker ID of every edge, parallel to `targets`. All unconditional if None. Default: None.
+            markers: Marker strings, indexed by marker ID. Default: None.
+        """
+        self._keys = keys
+        self._ids = ids if ids is not None else {key: node for node, key in enumerate(keys)}
+        self._offsets = offsets
+        self._targets = targets
+        self._defined = defined
+        self._edge_markers = edge_markers if edge_markers is not None else array("i", [-1]) * len(targets)
+        self._markers = markers or []
+
+    @classmethod
+    def from_mapping(cls, graph: Mapping[DepKeyT, Iterable[DepKeyT]]) -> "DependencyGraph":
+        """Builds a compact graph out of a plain mapping. Returns the graph itself if it is compact already."""
+        if isinstance(graph, DependencyGraph):
+            return graph
+
+        builder = GraphBuilder()
+        for parent, children in graph.items():
+            builder.set_edges(builder.node(parent), [builder.node(child) for child in children])
+        return builder.build()
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self._keys)
+
+    @property
+    def node_keys(self) -> List[DepKeyT]:
+        """Node keys, indexed by node ID."""
+        return self._keys
+
+    @property
+    def offsets(self) -> array:
+        return self._offsets
+
+    @property
+    def targets(self) -> array:
+        return self._targets
+
+    @property
+    def defined(self) -> bytearray:
+        return self._defined
+
+    @property
+    def edge_markers(self) -> array:
+        return self._edge_markers
+
+    @property
+    def markers(self) -> List[str]:
+        return self._markers
+
+    def node_id(self, key: DepKeyT) -> int:
+        """Integer ID of a node key. Raises `KeyError` if the graph does not contain it."""
+        return self._ids[key]
+
+    def key_of(self, node: int) -> DepKeyT:
+        return self._keys[node]
+
+    def successors(self, node: int) -> Sequence[int]:
+        return self._targets[self._offsets[node] : self._offsets[node + 1]]
+
+    def reversed(self) -> "DependencyGraph":
+        """Builds the graph with every edge flipped (successors become predecessors), sharing the node IDs."""
+        num_nodes = len(self._keys)
+        offsets, targets = self._offsets, self._targets
+
+        rev_offsets = array("i", [0]) * (num_nodes + 1)
+        for child in targets:
+            rev_offsets[child + 1] += 1
+        for node in range(num_nodes):
+            rev_offsets[node + 1] += rev_offsets[node]
+
+        fill = array("i", rev_offsets)
+        rev_targets = array("i", [0]) * len(targets)
+        rev_markers = array("i", [0]) * len(targets)
+        edge_markers = self._edge_markers
+        for node in range(num_nodes):
+            for edge in range(offsets[node], offsets[node + 1]):
+                child = targets[edge]
+                rev_targets[fill[child]] = node
+                rev_markers[fill[child]] = edge_markers[edge]
+                fill[child] += 1
+
+        defined = bytearray(b"\x01" * num_nodes)
+        return DependencyGraph(
+            self._keys, rev_offsets, rev_targets, defined, self._ids, rev_markers, self._markers
+        )
+
+    def restricted(self, active_markers: Sequence[int]) -> "DependencyGraph":
+        """Builds the graph of a single environment, sharing the node IDs.
+
+        Args:
+            active_markers: Per-marker flags of whether the marker holds. Unconditional edges are always kept.
+
+        Returns:
+            A graph without the edges whose marker does not hold.
+        """
+        offsets, targets, edge_markers = self._offsets, self._targets, self._edge_markers
+        kept_offsets = array("i", [0])
+        kept_targets = array("i")
+        kept_markers = array("i")
+
+        for node in range(len(self._keys)):
+            for edge in range(offsets[node], offsets[node + 1]):
+                marker = edge_markers[edge]
+                if marker == self.NO_MARKER or active_markers[marker]:
+                    kept_targets.append(targets[edge])
+                    kept_markers.append(marker)
+            kept_offsets.append(len(kept_targets))
+
+        return DependencyGraph(
+            self._keys, kept_offsets, kept_targets, self._defined, self._ids, kept_markers, self._markers
+        )
+
+    def including(self, keys: Iterable[DepKeyT]) -> "DependencyGraph":
+        """Returns a graph that contains all the provided keys as nodes, adding isolated nodes if needed."""
+        missing = [key for key in dict.fromkeys(keys) if key not in self._ids]
+        if not missing:
+            return self
+
+        offsets = array("i", self._offsets)
+        offsets.extend([offsets[-1]] * len(missing))
+        defined = self._defined + bytes(len(missing))
+        return DependencyGraph(
+            self._keys + missing, offsets, self._targets, defined, None, self._edge_markers, self._markers
+        )
+
+    def __getitem__(self, key: DepKeyT) -> List[DepKeyT]:
+        node = self._ids.get(key)
+        if node is None or not self._defined[node]:
+            raise KeyError(key)
+
+        return [self._keys[child] for child in self.successors(node)]
+
+    def __contains__(self, key: object) -> bool:
+        node = self._ids.get(key)  # type: ignore[call-overload]
+        return node is not None and bool(self._defined[node])
+
+    def __iter__(self) -> Iterator[DepKeyT]:
+        return (key for key, defined in zip(self._keys, self._defined) if defined)
+
+    def __len__(self) -> int:
+        return len(self._defined) - self._defined.count(0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(nodes={self.num_nodes}, edges={len(self._targets)})"
+
+
+class GraphBuilder:
+    """Incrementally collects nodes and edges of a `DependencyGraph`."""
+
+    def __init__(self) -> None:
+        self._keys: List[DepKeyT] = []
+        self._ids: Dict[DepKeyT, int] = {}
+        self._package_ids: Dict[str, int] = {}
+        self._edges: List[Optional[List[int]]] = []
+        self._edge_markers: Dict[int, List[int]] = {}
+        self._marker_ids: Dict[str, int] = {}
+
+    def node(self, key: DepKeyT) -> int:
+        """Interns a node key, returning its integer ID."""
+        node = self._ids.get(key)
+        if node is not None:
+            return node
+
+        name, groups, extras = key
+        key = (sys.intern(name), groups or _EMPTY, extras or _EMPTY)
+
+        node = self._ids[key] = len(self._keys)
+        self._keys.append(key)
+        self._edges.append(None)
+        return node
+
+    def package_node(self, name: str) -> int:
+        """Interns a plain package node `(name, {}, {})` without building the key tuple on repeated lookups."""
+        node = self._package_ids.get(name)
+        if node is None:
+            node = self._package_ids[name] = self.node((name, _EMPTY, _EMPTY))
+        return node
+
+    def extra_node(self, name: str, extra: str) -> int:
+        """Interns the node of a package extra, `name[extra]`."""
+        return self.node(extra_key(name, extra))
+
+    def fork_node(self, name: str, version: str) -> int:
+        """Interns the node of a single version of a forked package, `name@version`."""
+        return self.node(fork_key(name, version))
+
+    def is_defined(self, node: int) -> bool:
+        return self._edges[node] is not None
+
+    def marker(self, marker: Optional[str]) -> int:
+        """Interns an environment marker string, returning its ID (`NO_MARKER` for None or empty markers)."""
+        if not marker:
+            return DependencyGraph.NO_MARKER
+
+        marker_id = self._marker_ids.get(marker)
+        if marker_id is None:
+            marker_id = self._marker_ids[marker] = len(self._marker_ids)
+        return marker_id
+
+    def set_edges(self, node: int, children: List[int], markers: Optional[List[int]] = None) -> None:
+        """Defines (or replaces) the successors of a node.
+
+        Args:
+            node: ID of the parent node.
+            children: IDs of the successor nodes.
+            markers: Marker IDs of the edges, parallel to `children`. All unconditional if None. Default: None.
+        """
+        self._edges[node] = children
+        self._edge_markers.pop(node, None)
+
+        if markers and any(marker != DependencyGraph.NO_MARKER for marker in markers):
+            self._edge_markers[node] = markers
+
+    def build(self) -> DependencyGraph:
+        offsets = array("i", [0])
+        targets = array("i")
+        edge_markers = array("i")
+        defined = bytearray(len(self._keys))
+
+        for node, children in enumerate(self._edges):
+            if children is not None:
+                targets.extend(children)
+                edge_markers.extend(
+                    self._edge_markers.get(node) or [DependencyGraph.NO_MARKER] * len(children)
+                )
+                defined[node] = 1
+            offsets.append(len(targets))
+
+        markers = list(self._marker_ids)
+        return DependencyGraph(self._keys, offsets, targets, defined, self._ids, edge_markers, markers)
+
+
+def extra_key(name: str, extra: str) -> DepKeyT:
+    """Node key of an extra of a package, activating its optional dependencies."""
+    return (f"{name}[{extra}]", _EMPTY, _EMPTY)
+
+
+def fork_key(name: str, version: str) -> DepKeyT:
+    """Node key of a single version of a package locked once per resolution fork."""
+    return (f"{name}@{version}", _EMPTY, _EMPTY)
+
+
+def package_name(key: DepKeyT) -> str:
+    """Name of the package a node belongs to, the extra and fork nodes included."""
+    return key[0].split("[", 1)[0].split("@", 1)[0]
+
+
+def strongly_connected_components(
+    graph: DependencyGraph,
+    roots: Optional[Iterable[int]] = None,
+    sinks: Optional[Sequence[int]] = None,
+) -> Tuple[List[int], int]:
+    """Condenses a graph into its strongly connected components.
+
+    Iterative Tarjan's algorithm, so that deep dependency chains do not hit the recursion limit.
+
+    Args:
+        graph: The graph to condense.
+        roots: IDs of the nodes to condense the reachable part of the graph from. Default: None (the whole graph).
+        sinks: Per-node flags of whether to cut the traversal at the node, leaving its successors out.
+               Default: None.
+
+    Returns:
+        A tuple of (component ID of every node, number of components). Components are numbered
+        in reverse topological order: for every edge `u -> v` crossing components, `component[v] < component[u]`.
+        Nodes outside of the condensed part get the component ID -1.
+    """
+    num_nodes = graph.num_nodes
+    offsets, targets = graph.offsets, graph.targets
+    cut = sinks if sinks is not None else bytes(num_nodes)
+    index = [-1] * num_nodes
+    low = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    component = [-1] * num_nodes
+
+    stack: List[int] = []
+    counter = 0
+    num_components = 0
+
+    for start in range(num_nodes) if roots is None else roots:
+        if index[start] != -1:
+            continue
+
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        work = [(start, offsets[start + 1] if cut[start] else offsets[start])]
+
+        while work:
+            node, pos = work[-1]
+
+            if pos < offsets[node + 1]:
+                work[-1] = (node, pos + 1)
+                child = targets[pos]
+
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, offsets[child + 1] if cut[child] else offsets[child]))
+
+                elif on_stack[child] and index[child] < low[node]:
+                    low[node] = index[child]
+
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+
+            if low[node] != index[node]:
+                continue
+
+            while True:
+                member = stack.pop()
+                on_stack[member] = False
+                component[member] = num_components
+                if member == node:
+                    break
+
+            num_components += 1
+
+    return component, num_components
+
+
+def components_members(component: Sequence[int], num_components: int) -> List[List[int]]:
+    """Groups node IDs by their component ID, leaving out the nodes without one."""
+    members: List[List[int]] = [[] for _ in range(num_components)]
+    for node, comp in enumerate(component):
+        if comp >= 0:
+            members[comp].append(node)
+    return members
+
+
+def reachable(graph: DependencyGraph, roots: Iterable[int], unconditional_only: bool = False) -> bytearray:
+    """Marks every node reachable from the roots (the roots included).
+
+    Args:
+        graph: The graph to traverse.
+        roots: IDs of the nodes to start from.
+        unconditional_only: Whether to skip the edges conditional on an environment marker. Default: False.
+
+    Returns:
+        Per-node flags of whether the node is reachable.
+    """
+    offsets, targets, edge_markers = graph.offsets, graph.targets, graph.edge_markers
+    seen = bytearray(graph.num_nodes)
+    stack = []
+
+    for root in roots:
+        if not seen[root]:
+            seen[root] = 1
+            stack.append(root)
+
+    while stack:
+        node = stack.pop()
+        for edge in range(offsets[node], offsets[node + 1]):
+            child = targets[edge]
+            if seen[child] or (unconditional_only and edge_markers[edge] != DependencyGraph.NO_MARKER):
+                continue
+
+            seen[child] = 1
+            stack.append(child)
+
+    return seen
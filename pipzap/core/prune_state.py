@@ -0,0 +1,600 @@
+import hashlib
+import marshal
+import os
+import sys
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate, repeat
+from operator import sub
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from loguru import logger
+
+from pipzap.core.graph import (
+    DepKeyT,
+    DependencyGraph,
+    components_members,
+    strongly_connected_components,
+)
+from pipzap.utils.cache import cache_dir, evict_lru, temp_path
+
+ALL_EDGES = "*"
+"""Variant name of the summaries over every edge, regardless of the markers."""
+
+
+def _key_string(key: DepKeyT) -> str:
+    name, groups, extras = key
+    if not groups and not extras:
+        return name
+    return f"{name}|{','.join(sorted(groups))}|{','.join(sorted(extras))}"
+
+
+def _decode_ids(data: bytes) -> array:
+    ids = array("i")
+    ids.frombytes(data)
+    return ids
+
+
+def _degrees(offsets: array) -> array:
+    return array("i", map(sub, offsets[1:], offsets[:-1]))
+
+
+def _runs(base_of: Sequence[int], skip: Set[int]) -> Iterator[Tuple[int, int, int]]:
+    """Splits the node IDs into maximal runs of consecutive nodes that were consecutive in the previous graph too.
+
+    Args:
+        base_of: ID of every node in the previous graph, -1 if new. A `range` if the node table is unchanged.
+        skip: Nodes to yield on their own, as if new.
+
+    Returns:
+        An iterator over (first node, end node, first previous node) of the runs, in the node order. New and
+        skipped nodes are single-node runs with a previous node of -1.
+    """
+    steps: Iterable[int] = ()
+    if not isinstance(base_of, range):
+        steps = [node for node, step in enumerate(map(sub, base_of[1:], base_of[:-1]), 1) if step != 1]
+
+    bounds = sorted({0, len(base_of), *steps, *skip, *(node + 1 for node in skip)})
+    for start, end in zip(bounds, bounds[1:]):
+        if base_of[start] < 0 or start in skip:
+            yield start, start + 1, -1
+            start += 1
+
+        # A new node may precede a run, which then starts at the first previous node
+        if start < end:
+            yield start, end, base_of[start]
+
+
+def _predecessors(offsets: array, targets: array) -> Tuple[array, array]:
+    """Same as `DependencyGraph.reversed`, leaving the markers out: the offsets and sources of every node's in-edges."""
+    num_nodes = len(offsets) - 1
+    fill = [0] * (num_nodes + 1)
+    for child in targets:
+        fill[child + 1] += 1
+    for node in range(num_nodes):
+        fill[node + 1] += fill[node]
+
+    rev_offsets = array("i", fill)
+    sources = [0] * len(targets)
+    start = 0
+    for node, end in enumerate(offsets[1:]):
+        for child in targets[start:end]:
+            sources[fill[child]] = node
+            fill[child] += 1
+        start = end
+
+    return rev_offsets, array("i", sources)
+
+
+def _ancestors(offsets: array, sources: array, nodes: Iterable[int], num_nodes: int) -> bytearray:
+    """Flags the nodes reaching any of the provided ones (the nodes included), given the predecessor lists.
+
+    Once half of the nodes are flagged, the search stops and flags all of them: whatever reaches that much
+    of the graph is about everything, and sweeping all of it is cheaper than searching on.
+    """
+    seen = bytearray(num_nodes)
+    stack = []
+    for node in nodes:
+        if not seen[node]:
+            seen[node] = 1
+            stack.append(node)
+
+    budget = num_nodes // 2 - len(stack)
+    while stack:
+        node = stack.pop()
+        for parent in sources[offsets[node] : offsets[node + 1]]:
+            if not seen[parent]:
+                seen[parent] = 1
+                stack.append(parent)
+                budget -= 1
+
+        if budget < 0:
+            return bytearray(b"\x01") * num_nodes
+
+    return seen
+
+
+@dataclass
+class _Summaries:
+    """Reach summaries of the dependency nodes in a graph variant, as bitsets over the dependency nodes."""
+
+    order: List[str]
+    """Keys of the dependency nodes, indexed by their bit. Bits of former dependency nodes are kept,
+    so that the bitsets of the other summaries stay valid."""
+
+    bits: Dict[str, Tuple[int, int]]
+    """Per dependency node key: the bits of its strongly connected component (itself and the dependency nodes
+    it mutually reaches), and the bits of the other dependency nodes it reaches."""
+
+
+class PruneState:
+    """Pruning summaries persisted across runs, so that re-pruning only recomputes what a lock diff affects.
+
+    The state holds the uv.lock content hash, the graph of the previous run (node key table, marker table,
+    CSR adjacency and predecessor lists) and the reach summaries: for every graph variant (all edges, or the
+    edges of a target environment), the direct dependency nodes every direct dependency node reaches.
+    A node's closure only changes if a node in it changes its adjacency, so a summary stays valid unless its
+    node reaches a changed node, or a dependency node that had no summary yet.
+
+    Changing the keep-list alone reuses every summary. A lock update diffs the adjacency in a few array slice
+    comparisons, finds the stale summaries through the persisted predecessor lists, and recomputes them in a
+    single sweep over what the stale nodes reach, stopping at the dependency nodes whose summaries are still valid.
+    """
+
+    VERSION = 2
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, path: Union[Path, str]):
+        """
+        Args:
+            path: File to load the state from (if it exists) and to save it to.
+        """
+        self.path = Path(path)
+
+        # Reach summaries still valid since the previous runs, and stale ones
+        self.reused = 0
+        self.recomputed = 0
+
+        # As of the previous run
+        self._base_lock_hash: Optional[str] = None
+        self._base_keys: List[str] = []
+        self._base_markers: List[str] = []
+        self._base_adjacency = (array("i", [0]), array("i"), array("i"))
+        self._base_reversal: Optional[Tuple[array, array]] = None
+        self._reach: Dict[str, _Summaries] = {}
+        self._load()
+
+        # As of this run
+        self._graph: Optional[DependencyGraph] = None
+        self._lock_hash: Optional[str] = None
+        self._keys: List[str] = []
+        self._base_of: Sequence[int] = range(0)
+        self._new_of: Sequence[int] = range(0)
+        self._changed: List[int] = []
+        self._affected: Optional[bytearray] = None
+        self._reversal: Optional[Tuple[array, array]] = None
+        self._touched: Dict[str, _Summaries] = {}
+        self._modified = False
+
+    @classmethod
+    def for_project(cls, project_path: Union[Path, str]) -> "PruneState":
+        """The state of a project in the cache directory, keyed by the project's absolute path."""
+        digest = hashlib.sha256(str(Path(project_path).resolve()).encode()).hexdigest()[:16]
+        return cls(cache_dir() / "prune" / f"{digest}.bin")
+
+    def refresh(self, graph: DependencyGraph, lock_hash: Optional[str] = None) -> None:
+        """Diffs the full graph (before any marker restriction) against the one of the previous run.
+
+        The graph is a function of the lock and the direct dependency keys, which the node table reflects,
+        so an unchanged lock hash and node table skip the diff altogether.
+
+        Args:
+            graph: The graph to prune, with the direct dependency nodes included.
+            lock_hash: Hash of the uv.lock contents the graph was parsed from, if any. Default: None.
+        """
+        if graph is self._graph:
+            return
+
+        keys = [key[0] if not key[1] and not key[2] else _key_string(key) for key in graph.node_keys]
+        base_of: Sequence[int]
+        new_of: Sequence[int]
+        if keys == self._base_keys:
+            base_of = new_of = range(len(keys))
+        else:
+            base_ids = dict(zip(self._base_keys, range(len(self._base_keys))))
+            new_ids = dict(zip(keys, range(len(keys))))
+            base_of = list(map(base_ids.get, keys, repeat(-1)))
+            new_of = list(map(new_ids.get, self._base_keys, repeat(-1)))
+
+        self._graph, self._lock_hash, self._keys = graph, lock_hash, keys
+        self._base_of, self._new_of = base_of, new_of
+
+        if lock_hash is not None and lock_hash == self._base_lock_hash and isinstance(base_of, range):
+            self._changed = []
+        else:
+            self._changed = self._diff(graph)
+
+        self._affected = None
+        self._reversal = None
+        self._touched = {}
+        self._modified = (
+            bool(self._changed) or lock_hash != self._base_lock_hash or not isinstance(base_of, range)
+        )
+
+        logger.debug(
+            f"Prune state: {len(self._changed)} of {graph.num_nodes} nodes changed since the last run"
+        )
+
+    def coverage(
+        self,
+        graph: DependencyGraph,
+        sources: List[List[int]],
+        variants: Sequence[str] = (ALL_EDGES,),
+    ) -> Tuple[List[int], List[int], int]:
+        """Same as `DependencyPruner._coverage`, recomputing only the stale reach summaries.
+
+        Args:
+            graph: The graph to sweep: the refreshed graph itself, or a restriction of it.
+            sources: Node IDs installed by every direct dependency.
+            variants: Names of the variants sharing this graph (e.g., environments with the same active markers),
+                      which the summaries are looked up in and stored under. Default: all edges.
+
+        Returns:
+            A tuple of (per-dependency bits of its own nodes, per-dependency bits it strictly reaches, number of bits).
+        """
+        assert self._graph is not None, "[internal assertion] Prune state used before refresh"
+        keys = self._keys
+        nodes = list(dict.fromkeys(node for group in sources for node in group))
+
+        # Every variant's summaries are complete for the dependency nodes of their own run only, so they never mix
+        stored = max(
+            (self._reach.get(variant) or _Summaries([], {}) for variant in variants),
+            key=lambda summaries: sum(keys[node] in summaries.bits for node in nodes),
+        )
+        if len(stored.order) > 2 * len(nodes):
+            # Mostly bits of former dependency nodes, so the bit order starts over
+            stored = _Summaries([], {})
+
+        order = list(stored.order)
+        position = {key: bit for bit, key in enumerate(order)}
+        bit_of: Dict[int, int] = {}
+        for node in nodes:
+            if keys[node] not in position:
+                position[keys[node]] = len(order)
+                order.append(keys[node])
+            bit_of[node] = 1 << position[keys[node]]
+
+        new = [node for node in nodes if keys[node] not in stored.bits]
+        if len(new) == len(nodes):
+            recompute = nodes
+        else:
+            if self._affected is None:
+                self._affected = self._ancestors(self._changed)
+
+            # Nodes reaching a new dependency node have no trace of it in their summaries
+            reaching_new = self._ancestors(new) if new else self._affected
+            recompute = [node for node in nodes if self._affected[node] or reaching_new[node]]
+
+        bits = {keys[node]: stored.bits[keys[node]] for node in nodes if keys[node] in stored.bits}
+        if recompute:
+            stale = set(recompute)
+            valid = {node: bits[keys[node]] for node in nodes if node not in stale}
+            for node, summary in self._sweep(graph, recompute, bit_of, valid).items():
+                bits[keys[node]] = summary
+
+        self.reused += len(nodes) - len(recompute)
+        self.recomputed += len(recompute)
+        self._modified |= bool(recompute) or any(variant not in self._reach for variant in variants)
+        logger.debug(
+            f"Prune state ({', '.join(variants)}): reused {len(nodes) - len(recompute)} "
+            f"of {len(nodes)} reach summaries"
+        )
+
+        summaries = _Summaries(order, bits)
+        for variant in variants:
+            self._touched[variant] = summaries
+
+        return self._coverage_from_bits(sources, nodes, bit_of, summaries)
+
+    def save(self) -> None:
+        """Persists the state of the last refreshed graph. Failing to write is logged, not raised."""
+        if self._graph is None or not self._modified:
+            return
+
+        # Summaries of the variants not swept in this run are kept only if the graph has not changed since
+        reach = dict(self._touched)
+        if not self._changed:
+            for variant, summaries in self._reach.items():
+                reach.setdefault(variant, summaries)
+
+        graph = self._graph
+        reversal = self._current_reversal()
+        data = marshal.dumps(
+            (
+                self.VERSION,
+                marshal.version,
+                sys.byteorder,
+                self._lock_hash,
+                # Keys hold no line breaks, and a single string loads much faster than a tuple of them
+                "\n".join(self._keys),
+                tuple(graph.markers),
+                graph.offsets.tobytes(),
+                graph.targets.tobytes(),
+                graph.edge_markers.tobytes(),
+                reversal[0].tobytes(),
+                reversal[1].tobytes(),
+                {variant: (tuple(summaries.order), summaries.bits) for variant, summaries in reach.items()},
+            )
+        )
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp = temp_path(self.path)
+            temp.write_bytes(data)
+            os.replace(temp, self.path)
+            evict_lru(self.path.parent, self.MAX_BYTES)
+        except OSError as e:
+            logger.warning(f"Unable to save the pruning state to {self.path}: {e}")
+            return
+
+        self._base_lock_hash, self._base_keys, self._base_markers = self._lock_hash, self._keys, graph.markers
+        self._base_adjacency = (graph.offsets, graph.targets, graph.edge_markers)
+        self._base_reversal, self._reversal = reversal, None
+        self._base_of = self._new_of = range(len(self._keys))
+        self._reach, self._changed, self._affected, self._modified = reach, [], None, False
+        logger.debug(f"Prune state saved to {self.path}")
+
+    def _load(self) -> None:
+        if not self.path.is_file():
+            return
+
+        try:
+            version, marshal_version, byteorder, *data = marshal.loads(self.path.read_bytes())
+            if (version, marshal_version, byteorder) != (self.VERSION, marshal.version, sys.byteorder):
+                logger.debug(f"Ignoring an incompatible pruning state at {self.path}")
+                return
+
+            lock_hash, nodes, markers, offsets, targets, edge_markers, rev_offsets, rev_sources, reach = data
+            keys = nodes.split("\n") if nodes else []
+            adjacency = (_decode_ids(offsets), _decode_ids(targets), _decode_ids(edge_markers))
+            reversal = (_decode_ids(rev_offsets), _decode_ids(rev_sources))
+            if len(adjacency[0]) != len(keys) + 1 or len(reversal[0]) != len(keys) + 1:
+                raise ValueError("node table and adjacency mismatch")
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            logger.debug(f"Ignoring an unreadable pruning state at {self.path}: {e}")
+            return
+
+        self._base_lock_hash, self._base_keys, self._base_markers = lock_hash, keys, list(markers)
+        self._base_adjacency, self._base_reversal = adjacency, reversal
+        self._reach = {variant: _Summaries(list(order), bits) for variant, (order, bits) in reach.items()}
+
+        # Refreshes the recency for the LRU eviction
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _diff(self, graph: DependencyGraph) -> List[int]:
+        """Lists the nodes whose adjacency (successor keys and edge markers) differs from the previous run.
+
+        The previous adjacency is translated to the current node and marker IDs once. Runs of nodes kept in the
+        same order are then compared with a few array slice comparisons, split in halves only where they differ.
+        A lock update keeping the node and marker tables (e.g., a version bump) keeps the IDs too, and skips
+        the translation.
+        """
+        base_offsets, base_targets, base_markers = self._base_adjacency
+        offsets, targets, edge_markers = graph.offsets, graph.targets, graph.edge_markers
+
+        if not isinstance(self._new_of, range):
+            base_targets = array("i", map(self._new_of.__getitem__, base_targets))
+
+        if graph.markers != self._base_markers:
+            marker_ids = {marker: index for index, marker in enumerate(graph.markers)}
+            # NO_MARKER (-1) indexes the trailing entry, so it maps to itself
+            marker_map = [marker_ids.get(marker, -2) for marker in self._base_markers] + [
+                DependencyGraph.NO_MARKER
+            ]
+            base_markers = array("i", map(marker_map.__getitem__, base_markers))
+
+        degrees, base_degrees = _degrees(offsets), _degrees(base_offsets)
+        changed = []
+        for start, end, base_start in _runs(self._base_of, set()):
+            if base_start < 0:
+                changed.append(start)
+                continue
+
+            shift = base_start - start
+            pending = [(start, end)]
+            while pending:
+                first, last = pending.pop()
+                edges = slice(offsets[first], offsets[last])
+                base_edges = slice(base_offsets[first + shift], base_offsets[last + shift])
+                if (
+                    degrees[first:last] == base_degrees[first + shift : last + shift]
+                    and targets[edges] == base_targets[base_edges]
+                    and edge_markers[edges] == base_markers[base_edges]
+                ):
+                    continue
+
+                if last - first == 1:
+                    changed.append(first)
+                    continue
+
+                middle = (first + last) // 2
+                pending.extend([(middle, last), (first, middle)])
+
+        return changed
+
+    def _ancestors(self, nodes: List[int]) -> bytearray:
+        """Flags the nodes reaching any of the provided ones over any edge (the nodes included).
+
+        A path to a changed node runs through unchanged nodes up to the first changed one, so a node reaches
+        a changed node in the current graph if and only if it does in the previous one. The search thus runs
+        on the persisted predecessor lists, and reverses the current graph only without them.
+        """
+        assert self._graph is not None, "[internal assertion] Prune state used before refresh"
+        num_nodes = self._graph.num_nodes
+        if not nodes:
+            return bytearray(num_nodes)
+
+        if self._base_reversal is None:
+            return _ancestors(*self._reversed(), nodes, num_nodes)
+
+        base_of, new_of = self._base_of, self._new_of
+        base_seen = _ancestors(
+            *self._base_reversal,
+            (base_of[node] for node in nodes if base_of[node] >= 0),
+            len(self._base_keys),
+        )
+        if isinstance(new_of, range):
+            return base_seen
+
+        # Nodes new to the graph (-1) index the trailing zero, and are flagged only if provided
+        base_seen.append(0)
+        seen = bytearray(map(base_seen.__getitem__, base_of))
+        for node in nodes:
+            seen[node] = 1
+
+        return seen
+
+    def _current_reversal(self) -> Tuple[array, array]:
+        """Predecessor lists of the refreshed graph (offsets and sources), patched from the previous ones if known."""
+        if self._reversal is not None:
+            return self._reversal
+        if self._base_reversal is None:
+            return self._reversed()
+        if not self._changed and isinstance(self._base_of, range):
+            return self._base_reversal
+        return self._patched_reversal()
+
+    def _reversed(self) -> Tuple[array, array]:
+        """Predecessor lists of the refreshed graph (offsets and sources), reversing it once per refresh."""
+        assert self._graph is not None, "[internal assertion] Prune state used before refresh"
+        if self._reversal is None:
+            self._reversal = _predecessors(self._graph.offsets, self._graph.targets)
+        return self._reversal
+
+    def _patched_reversal(self) -> Tuple[array, array]:
+        """Carries the predecessor lists of the previous graph over to the refreshed one.
+
+        Only the successors of the changed and the removed nodes gain or lose predecessors, so the lists
+        of all other nodes are copied as they are (translated to the current node IDs), a run at a time.
+        """
+        assert self._graph and self._base_reversal, "[internal assertion] Patching requires both graphs"
+        graph, changed = self._graph, set(self._changed)
+        base_of, new_of = self._base_of, self._new_of
+        base_offsets, base_targets, _ = self._base_adjacency
+        rev_offsets, rev_sources = self._base_reversal
+
+        gained: Dict[int, List[int]] = {}
+        for node in self._changed:
+            for child in graph.successors(node):
+                gained.setdefault(child, []).append(node)
+
+        patched = set(gained)
+        dropped = [base_of[node] for node in self._changed if base_of[node] >= 0]
+        if not isinstance(new_of, range):
+            dropped.extend(base for base, node in enumerate(new_of) if node < 0)
+            rev_sources = array("i", map(new_of.__getitem__, rev_sources))
+
+        for base in dropped:
+            patched.update(
+                new_of[child] for child in base_targets[base_offsets[base] : base_offsets[base + 1]]
+            )
+        patched.discard(-1)
+
+        base_degrees = _degrees(rev_offsets)
+        degrees = array("i")
+        sources = array("i")
+        for start, end, base_start in _runs(base_of, patched):
+            if base_start >= 0:
+                sources.extend(rev_sources[rev_offsets[base_start] : rev_offsets[base_start + end - start]])
+                degrees.extend(base_degrees[base_start : base_start + end - start])
+                continue
+
+            base = base_of[start]
+            kept = [] if base < 0 else rev_sources[rev_offsets[base] : rev_offsets[base + 1]]
+            parents = sorted(
+                [parent for parent in kept if parent >= 0 and parent not in changed] + gained.get(start, [])
+            )
+            sources.extend(parents)
+            degrees.append(len(parents))
+
+        offsets = array("i", [0])
+        offsets.extend(accumulate(degrees))
+        return offsets, sources
+
+    @staticmethod
+    def _sweep(
+        graph: DependencyGraph, roots: List[int], bit_of: Dict[int, int], valid: Dict[int, Tuple[int, int]]
+    ) -> Dict[int, Tuple[int, int]]:
+        """Computes the summaries of the stale dependency nodes in one sweep over the condensation of what they reach.
+
+        The traversal stops at the dependency nodes with a valid summary, which stands for everything below them.
+        Those never share a component with a stale node, since anything reaching a stale node is stale too.
+
+        Args:
+            graph: The graph to sweep.
+            roots: The stale dependency nodes.
+            bit_of: The bit of every dependency node.
+            valid: The summaries of the other dependency nodes.
+
+        Returns:
+            The summaries of the stale dependency nodes.
+        """
+        offsets, targets = graph.offsets, graph.targets
+        sinks = bytearray(graph.num_nodes)
+        for node in valid:
+            sinks[node] = 1
+
+        component, num_components = strongly_connected_components(graph, roots, sinks)
+        bits = [0] * num_components
+        below = [0] * num_components
+        for node in roots:
+            bits[component[node]] |= bit_of[node]
+        for node, (own, reached) in valid.items():
+            if component[node] >= 0:
+                bits[component[node]], below[component[node]] = own, reached
+
+        # Components are numbered sinks-first, so every successor is finalized before its predecessors
+        for comp, members in enumerate(components_members(component, num_components)):
+            for member in members:
+                if sinks[member]:
+                    continue
+                for child in targets[offsets[member] : offsets[member + 1]]:
+                    child_comp = component[child]
+                    if child_comp != comp:
+                        below[comp] |= bits[child_comp] | below[child_comp]
+
+        return {node: (bits[component[node]], below[component[node]]) for node in roots}
+
+    @staticmethod
+    def _coverage_from_bits(
+        sources: List[List[int]], nodes: List[int], bit_of: Dict[int, int], summaries: _Summaries
+    ) -> Tuple[List[int], List[int], int]:
+        """Derives the dependency coverage bits from the reach summaries.
+
+        The lowest bit of every strongly connected component stands for all of its dependency nodes,
+        matching the single bit per component of the full sweep. Bits of former dependency nodes are ignored.
+        """
+        summary_of = [summaries.bits[summaries.order[bit_of[node].bit_length() - 1]] for node in nodes]
+        alive = 0
+        for node in nodes:
+            alive |= bit_of[node]
+
+        representatives = 0
+        for own, _ in summary_of:
+            own &= alive
+            representatives |= own & -own
+
+        by_node = dict(zip(nodes, summary_of))
+        need = [0] * len(sources)
+        reach = [0] * len(sources)
+        for index, group in enumerate(sources):
+            for node in group:
+                own, reached = by_node[node]
+                need[index] |= own & representatives
+                reach[index] |= reached & representatives
+
+        return need, reach, len(summaries.order)
@@ -1,11 +1,36 @@
+import heapq
+from copy import deepcopy
 from dataclasses import replace
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
 from loguru import logger
 
 from pipzap.core.dependencies import Dependency, DepKeyT, ProjectDependencies
+from pipzap.core.environments import MarkerEvaluator, TargetEnvironment
+from pipzap.core.graph import (
+    DependencyGraph,
+    components_members,
+    package_name,
+    reachable,
+    strongly_connected_components,
+)
+from pipzap.core.prune_state import ALL_EDGES, PruneState
 from pipzap.parsing.workspace import Workspace
-from pipzap.utils.io import read_toml, write_toml
+from pipzap.utils.io import read_toml
+from pipzap.utils.names import canonical_name
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+def _covered_twice(sets: List[int], selected: List[int]) -> int:
+    """Bits covered by at least two of the selected sets."""
+    once = twice = 0
+    for index in selected:
+        twice |= once & sets[index]
+        once |= sets[index]
+    return twice
 
 
 class DependencyPruner:
@@ -18,14 +43,28 @@ class DependencyPruner:
         keep: Optional[List[str]] = None,
         preserve_all: bool = False,
         workspace: Optional["Workspace"] = None,
+        environments: Optional[Sequence[TargetEnvironment]] = None,
+        cross_group: bool = False,
+        aggressive: bool = False,
+        state: Optional[PruneState] = None,
     ) -> ProjectDependencies:
         """Identifies and removes the redundant/transitive dependencies.
 
         Args:
             resolved_deps: Parsed and resolved dependencies and the internal dependency tree to prune.
             keep: Package names to not prune.
-            preserve_all: If True, re-lock pruned deps and add back any that would be missing.
+            preserve_all: If True, add back any deps that would be missing after pruning. Verified against
+                          the original lock graph when possible, otherwise by re-locking the pruned deps.
             workspace: Workspace for re-locking (required if preserve_all is True).
+            environments: Target environments to evaluate the markers in. If provided, dependencies with
+                          markers are pruned too, as long as they are covered in every environment. Default: None.
+            cross_group: If True, also drop group and extra deps that the main dependencies always install.
+                         Default: False.
+            aggressive: If True, keep only a minimal set of roots that still installs the whole resolved set,
+                        instead of removing just the deps that another dep reaches. Default: False.
+            state: Pruning state persisted by the previous runs. If provided, only the reach summaries
+                   affected by the lock or dependency changes since are recomputed, and the state is updated
+                   in place (saving it is up to the caller). Default: None.
 
         Returns:
             A copy of the original project dependencies with the redundant deps removed.
@@ -36,9 +75,15 @@ class DependencyPruner:
             f"graph size: {len(resolved_deps.graph)}"
         )
 
-        redundant = cls._find_redundant_deps(resolved_deps, keep or [])
+        if aggressive:
+            redundant = cls._find_minimal_roots(resolved_deps, keep or [], environments, state)
+        else:
+            redundant = cls._find_redundant_deps(resolved_deps, keep or [], environments, state)
         pruned = cls._filter_redundant(resolved_deps.direct, redundant)
 
+        if cross_group:
+            pruned = cls._filter_cross_group(resolved_deps, pruned, keep or [])
+
         logger.info(f"Redundant: {', '.join(name for name, *_ in redundant or [('<empty>', '')])}")
         logger.info(
             f"Pruned {len(resolved_deps.direct) - len(pruned)} "  #
@@ -48,21 +93,28 @@ class DependencyPruner:
         if not preserve_all or not workspace:
             return replace(resolved_deps, direct=pruned)
 
-        missing, original_lock = cls._find_missing_after_prune(pruned, workspace)
+        graph_missing = cls._find_missing_in_graph(resolved_deps, pruned)
+        if graph_missing is not None:
+            logger.info("Preserve-all: verified against the original lock graph, no re-lock needed")
+            missing = graph_missing
+            original_lock = read_toml(workspace.base / "uv.lock", roundtrip=False) if missing else {}
+        else:
+            missing, original_lock = cls._find_missing_after_prune(pruned, workspace)
+
         if not missing:
             return replace(resolved_deps, direct=pruned)
 
         logger.info(f"Preserve-all: adding back {len(missing)} missing deps: {', '.join(missing)}")
-        pruned_names = {dep.name.lower() for dep in pruned}
+        pruned_names = {dep.canonical for dep in pruned}
 
         for dep in resolved_deps.direct:
-            if dep.name.lower() in missing and dep.name.lower() not in pruned_names:
+            if dep.canonical in missing and dep.canonical not in pruned_names:
                 pruned.append(dep)
-                pruned_names.add(dep.name.lower())
-                missing.discard(dep.name.lower())
+                pruned_names.add(dep.canonical)
+                missing.discard(dep.canonical)
 
         if missing:
-            lock_packages = {p["name"].lower(): p for p in original_lock.get("package", [])}
+            lock_packages = {canonical_name(p["name"]): p for p in original_lock.get("package", [])}
             for name in missing:
                 if name in lock_packages and name not in pruned_names:
                     pkg = lock_packages[name]
@@ -75,6 +127,59 @@ class DependencyPruner:
 
         return replace(resolved_deps, direct=pruned)
 
+    @classmethod
+    def _find_missing_in_graph(
+        cls, resolved_deps: ProjectDependencies, pruned_deps: List[Dependency]
+    ) -> Optional[Set[str]]:
+        """Computes the packages that would be missing after pruning directly from the original lock graph.
+
+        The graph proves the result when everything the removed dependencies pull in (through any edge)
+        is either unreachable from the pruned set altogether, which makes it definitely missing,
+        or reachable from the unconditional pruned roots through unconditional edges only. Packages that
+        the pruned set reaches through marker-conditional edges alone cannot be proven to be installed
+        in every environment, so those require a re-lock.
+
+        Returns:
+            Missing package names, or None if the graph cannot prove the equivalence.
+        """
+        graph = resolved_deps.graph.including(key for dep in resolved_deps.direct for key in dep.node_keys)
+        pruned_keys = {dep.key for dep in pruned_deps}
+        removed = [dep for dep in resolved_deps.direct if dep.key not in pruned_keys]
+
+        pruned_roots = [graph.node_id(key) for dep in pruned_deps for key in dep.node_keys]
+        unconditional_roots = [
+            graph.node_id(key) for dep in pruned_deps if dep.marker is None for key in dep.node_keys
+        ]
+
+        from_removed = reachable(graph, (graph.node_id(key) for dep in removed for key in dep.node_keys))
+        from_pruned = reachable(graph, pruned_roots)
+        from_pruned_unconditional = reachable(graph, unconditional_roots, unconditional_only=True)
+
+        missing: Set[str] = set()
+        unproven: Set[str] = set()
+        for node in range(graph.num_nodes):
+            if not from_removed[node] or from_pruned_unconditional[node]:
+                continue
+
+            (unproven if from_pruned[node] else missing).add(package_name(graph.key_of(node)))
+
+        # Group/extra nodes share the package name with the plain package node
+        unproven -= {
+            package_name(graph.key_of(node))
+            for node in range(graph.num_nodes)
+            if from_pruned_unconditional[node]
+        }
+        missing -= {package_name(graph.key_of(node)) for node in range(graph.num_nodes) if from_pruned[node]}
+
+        if unproven:
+            logger.info(
+                f"Preserve-all: {len(unproven)} packages are only reachable through marker-conditional edges "
+                f"({', '.join(sorted(unproven))}), falling back to a re-lock"
+            )
+            return None
+
+        return missing
+
     @classmethod
     def _find_missing_after_prune(
         cls,
@@ -86,11 +191,11 @@ class DependencyPruner:
         Returns:
             Tuple of (missing package names, original lock data).
         """
-        original_lock = read_toml(workspace.base / "uv.lock")
-        original_packages = {p["name"].lower() for p in original_lock.get("package", [])}
+        original_lock = read_toml(workspace.base / "uv.lock", roundtrip=False)
+        original_packages = {canonical_name(p["name"]) for p in original_lock.get("package", [])}
 
-        pyproject_path = workspace.base / "pyproject.toml"
-        pyproject = read_toml(pyproject_path)
+        # The workspace document is the parsed project, which has to stay intact
+        pyproject = deepcopy(workspace.document())
 
         pruned_dep_strs = []
         for dep in pruned_deps:
@@ -104,64 +209,395 @@ class DependencyPruner:
             pruned_dep_strs.append(dep_str)
 
         pyproject["project"]["dependencies"] = pruned_dep_strs
-        write_toml(pyproject, pyproject_path)
+        workspace.update_document(pyproject)
 
+        # A seeded lock is kept, so that uv reuses the prior resolution as preferences
         lock_path = workspace.base / "uv.lock"
-        if lock_path.exists():
+        if lock_path.exists() and not workspace.lock_seeded:
             lock_path.unlink()
 
         workspace.run(["uv", "lock"], "preserve-all re-lock")
-        pruned_lock = read_toml(workspace.base / "uv.lock")
-        pruned_packages = {p["name"].lower() for p in pruned_lock.get("package", [])}
+        pruned_lock = read_toml(workspace.base / "uv.lock", roundtrip=False)
+        pruned_packages = {canonical_name(p["name"]) for p in pruned_lock.get("package", [])}
 
         missing = original_packages - pruned_packages - {"generated-project"}
         return missing, original_lock
 
     @classmethod
-    def _find_redundant_deps(cls, dependencies: ProjectDependencies, keep: List[str]) -> Set[DepKeyT]:
-        """Identifies redundant direct dependencies, preserving those with direct or indirect markers."""
-        redundant = set()
-        keep = [name.lower() for name in keep]
+    def _find_redundant_deps(
+        cls,
+        dependencies: ProjectDependencies,
+        keep: List[str],
+        environments: Optional[Sequence[TargetEnvironment]] = None,
+        state: Optional[PruneState] = None,
+    ) -> Set[DepKeyT]:
+        """Identifies redundant direct dependencies, preserving those with direct or indirect markers.
+
+        A dependency is redundant if other direct dependencies reach it (and its required extras),
+        unless they reach each other.
+
+        If target environments are provided, the markers are evaluated instead: a dependency is redundant
+        only if, in every environment where it is installed, another dependency installed in that environment
+        reaches it through edges whose markers hold there.
+        """
+        keep = [canonical_name(name) for name in keep]
+        graph = dependencies.graph.including(key for dep in dependencies.direct for key in dep.node_keys)
+        sources = [[graph.node_id(key) for key in dep.node_keys] for dep in dependencies.direct]
+        if state is not None:
+            state.refresh(graph, dependencies.lock_hash)
+
+        if environments:
+            prunable = cls._prunable_in_environments(dependencies, graph, sources, keep, environments, state)
+        else:
+            eligible = [
+                dep.marker is None and not dep.indirect_markers and dep.canonical not in keep
+                for dep in dependencies.direct
+            ]
+            need, own, _ = cls._sweep(graph, sources, state)
+            prunable = cls._prunable_deps(need, own, eligible)
+
+        # Dependencies sharing a key (e.g. `pkg` and `pkg[x]`) are only removed together
+        blocked = {dep.key for dep, is_prunable in zip(dependencies.direct, prunable) if not is_prunable}
+        return {dep.key for dep in dependencies.direct} - blocked
 
-        for dep in dependencies.direct:
-            if dep.marker is not None or dep.indirect_markers or dep.name.lower() in keep:
-                continue
+    @classmethod
+    def _prunable_in_environments(
+        cls,
+        dependencies: ProjectDependencies,
+        graph: DependencyGraph,
+        sources: List[List[int]],
+        keep: List[str],
+        environments: Sequence[TargetEnvironment],
+        state: Optional[PruneState] = None,
+    ) -> List[bool]:
+        """Marker-aware redundancy over a matrix of target environments.
+
+        Every distinct marker (of the lock edges and of the direct dependencies) is evaluated against
+        all the environments at once. Environments that agree on every marker share the same edge set,
+        so the graph is restricted and swept once per distinct outcome rather than once per environment.
+        """
+        evaluator = MarkerEvaluator(environments)
+
+        # Unparsable markers are conservative: edges never hold, dependencies are always installed
+        marker_masks = [evaluator.evaluate(marker, default=False) for marker in graph.markers]
+        root_masks = [evaluator.evaluate(dep.marker) for dep in dependencies.direct]
+
+        eligible = [
+            dep.canonical not in keep and mask != 0 for dep, mask in zip(dependencies.direct, root_masks)
+        ]
+        candidates = list(eligible)
+        outcomes: Dict[Tuple[bytes, bytes], List[bool]] = {}
+        coverages: Dict[bytes, Tuple[List[int], List[int], int]] = {}
+        variants = cls._environment_variants(evaluator.environments, marker_masks)
+
+        for env_index, env in enumerate(evaluator.environments):
+            active_markers = bytes((mask >> env_index) & 1 for mask in marker_masks)
+            active = bytes((mask >> env_index) & 1 for mask in root_masks)
+
+            prunable = outcomes.get((active_markers, active))
+            if prunable is None:
+                if active_markers not in coverages:
+                    env_graph = graph.restricted(active_markers)
+                    coverages[active_markers] = cls._sweep(
+                        env_graph, sources, state, variants[active_markers]
+                    )
 
-            for other_dep in dependencies.direct:
-                if other_dep is dep:
-                    continue
+                need, own, _ = coverages[active_markers]
+                prunable = cls._prunable_deps(need, own, eligible, active)
+                outcomes[(active_markers, active)] = prunable
 
-                # If other_dep can reach dep...
-                if not cls._is_in_transitive(other_dep.key, dep.key, dependencies.graph):
-                    continue
+            # Pruning less in a single environment only adds coverage in the others, so the results combine
+            for index, (is_active, is_prunable) in enumerate(zip(active, prunable)):
+                if is_active and not is_prunable and candidates[index]:
+                    logger.debug(f"{dependencies.direct[index].name} is required in {env.name}")
+                    candidates[index] = False
 
-                # ...but if dep can also reach other_dep, it's a cycle; do not mark as redundant.
-                if cls._is_in_transitive(dep.key, other_dep.key, dependencies.graph):
-                    continue
+        logger.info(
+            f"Evaluated {evaluator.num_compiled} distinct markers in {len(evaluator.environments)} environments "
+            f"({len(outcomes)} distinct dependency graphs)"
+        )
+        return candidates
+
+    @staticmethod
+    def _environment_variants(
+        environments: Sequence[TargetEnvironment], marker_masks: List[int]
+    ) -> Dict[bytes, List[str]]:
+        """Groups the environment names by their active markers, i.e. by the restricted graph they share."""
+        variants: Dict[bytes, List[str]] = {}
+        for env_index, env in enumerate(environments):
+            active_markers = bytes((mask >> env_index) & 1 for mask in marker_masks)
+            variants.setdefault(active_markers, []).append(env.name)
+        return variants
+
+    @staticmethod
+    def _prunable_deps(
+        need: List[int],
+        own: List[int],
+        eligible: Sequence[bool],
+        active: Optional[bytes] = None,
+    ) -> List[bool]:
+        """Flags the dependencies whose nodes other (active) dependencies reach, unless they reach each other.
+
+        Nodes sharing a component are mutually reachable, so they never cover each other.
+        A dependency installs its own node and the nodes of its required extras, and every one of them has to be
+        reached by some other dependency. Since a dependency may reach its own nodes (e.g. `pkg[x]` requiring
+        `pkg[y]`), the bits reached by one and by at least two dependencies are tracked separately.
+        Every cover comes from a strictly upstream component, so following the covers of a pruned dependency
+        always ends at a kept one, which then reaches it too.
+
+        Args:
+            need: Per-dependency bits of its own nodes, see `_coverage`.
+            own: Per-dependency bits it strictly reaches, see `_coverage`.
+            eligible: Per-dependency flags of whether the dependency may be pruned.
+            active: Per-dependency flags of whether the dependency is installed. All are if None. Default: None.
+
+        Returns:
+            Per-dependency flags of whether the dependency can be pruned.
+        """
+        is_active = [active is None or bool(active[index]) for index in range(len(need))]
+        reached_once = reached_twice = 0
+        for index, reach in enumerate(own):
+            if is_active[index]:
+                reached_twice |= reached_once & reach
+                reached_once |= reach
+
+        prunable = []
+        for index in range(len(need)):
+            by_others = reached_twice | (reached_once & ~own[index]) if is_active[index] else reached_once
+            prunable.append(eligible[index] and is_active[index] and not need[index] & ~by_others)
+
+        return prunable
+
+    @staticmethod
+    def _sweep(
+        graph: DependencyGraph,
+        sources: List[List[int]],
+        state: Optional[PruneState] = None,
+        variants: Sequence[str] = (ALL_EDGES,),
+    ) -> Tuple[List[int], List[int], int]:
+        """Collects the coverage of the dependencies, reusing the reach summaries of the state if provided."""
+        if state is not None:
+            return state.coverage(graph, sources, variants)
+        return DependencyPruner._coverage(graph, sources)
 
-                redundant.add(dep.key)
-                break
+    @staticmethod
+    def _coverage(graph: DependencyGraph, sources: List[List[int]]) -> Tuple[List[int], List[int], int]:
+        """Sweeps the condensation of the graph once, collecting what every dependency installs and reaches.
 
-        return redundant
+        Instead of searching the graph for every pair of dependencies, the graph is condensed into strongly
+        connected components once, and the set of dependency nodes reachable from each component is propagated
+        as a bitset in a single sweep over the condensation (in reverse topological order).
+        Every component holding at least one dependency node gets a bit.
+
+        Args:
+            graph: The graph to sweep.
+            sources: Node IDs installed by every direct dependency.
+
+        Returns:
+            A tuple of (per-dependency bits of its own nodes, per-dependency bits it strictly reaches, number of bits).
+        """
+        offsets, targets = graph.offsets, graph.targets
+        component, num_components = strongly_connected_components(graph)
+
+        # One bit per component holding at least one dependency node
+        bits = [0] * num_components
+        num_bits = 0
+        for nodes in sources:
+            for node in nodes:
+                comp = component[node]
+                if not bits[comp]:
+                    bits[comp] = 1 << num_bits
+                    num_bits += 1
+
+        # Components are numbered sinks-first, so every successor is finalized before its predecessors
+        reachable = [0] * num_components
+        for comp, members in enumerate(components_members(component, num_components)):
+            for node in members:
+                for child in targets[offsets[node] : offsets[node + 1]]:
+                    child_comp = component[child]
+                    if child_comp != comp:
+                        reachable[comp] |= bits[child_comp] | reachable[child_comp]
+
+        need = [0] * len(sources)
+        own = [0] * len(sources)
+        for index, nodes in enumerate(sources):
+            for node in nodes:
+                need[index] |= bits[component[node]]
+                own[index] |= reachable[component[node]]
+
+        return need, own, num_bits
 
     @classmethod
-    def _is_in_transitive(cls, root: DepKeyT, target: DepKeyT, graph: Dict[DepKeyT, List[DepKeyT]]) -> bool:
-        """Checks if target is in the transitive closure of root."""
-        visited = set()
-        stack = [root]
+    def _find_minimal_roots(
+        cls,
+        dependencies: ProjectDependencies,
+        keep: List[str],
+        environments: Optional[Sequence[TargetEnvironment]] = None,
+        state: Optional[PruneState] = None,
+    ) -> Set[DepKeyT]:
+        """Identifies the direct dependencies outside of a minimal set of roots that installs everything.
+
+        Covering every direct dependency (and its required extras) is enough to install the whole
+        resolved set, so the universe is the bits of the components holding direct dependency nodes,
+        and every dependency covers its own bits plus everything it reaches. Unlike the default search,
+        a cycle of direct dependencies keeps one root only, and dependencies requiring extras may be
+        covered jointly by several others. With target environments, the universes of every distinct
+        environment graph are concatenated into a single bitset, so the roots have to cover all of them.
+
+        Dependencies that cannot be pruned in the default mode are always selected.
+        """
+        keep = [canonical_name(name) for name in keep]
 
-        while stack:
-            current = stack.pop()
-            if current == target:
-                return True
+        # Dependencies sharing a key (e.g. `pkg` and `pkg[x]`) are only removed together, so they are a single set
+        by_key: Dict[DepKeyT, List[Dependency]] = {}
+        for dep in dependencies.direct:
+            by_key.setdefault(dep.key, []).append(dep)
+        candidates = list(by_key.values())
+
+        graph = dependencies.graph.including(key for dep in dependencies.direct for key in dep.node_keys)
+        sources = [[graph.node_id(key) for dep in deps for key in dep.node_keys] for deps in candidates]
+        sets = [0] * len(candidates)
+        if state is not None:
+            state.refresh(graph, dependencies.lock_hash)
+
+        if not environments:
+            forced = [
+                any(dep.marker is not None or dep.indirect_markers or dep.canonical in keep for dep in deps)
+                for deps in candidates
+            ]
+            need, own, _ = cls._sweep(graph, sources, state)
+            sets = [need[index] | own[index] for index in range(len(candidates))]
+
+        else:
+            evaluator = MarkerEvaluator(environments)
+            marker_masks = [evaluator.evaluate(marker, default=False) for marker in graph.markers]
+            root_masks = [0] * len(candidates)
+            for index, deps in enumerate(candidates):
+                for dep in deps:
+                    root_masks[index] |= evaluator.evaluate(dep.marker)
+
+            forced = [
+                mask == 0 or any(dep.canonical in keep for dep in deps)
+                for deps, mask in zip(candidates, root_masks)
+            ]
+
+            width = 0
+            outcomes: Set[Tuple[bytes, bytes]] = set()
+            variants = cls._environment_variants(evaluator.environments, marker_masks)
+            for env_index in range(len(evaluator.environments)):
+                active_markers = bytes((mask >> env_index) & 1 for mask in marker_masks)
+                active = bytes((mask >> env_index) & 1 for mask in root_masks)
+                if (active_markers, active) in outcomes:
+                    continue
+
+                outcomes.add((active_markers, active))
+                env_graph = graph.restricted(active_markers)
+                need, own, num_bits = cls._sweep(env_graph, sources, state, variants[active_markers])
+                for index, is_active in enumerate(active):
+                    if is_active:
+                        sets[index] |= (need[index] | own[index]) << width
+                width += num_bits
 
-            if current in visited:
+        selected = cls._minimal_cover(sets, forced)
+        logger.info(f"Aggressive: {len(selected)} of {len(candidates)} roots cover the resolved set")
+        return {deps[0].key for index, deps in enumerate(candidates) if index not in selected}
+
+    @staticmethod
+    def _minimal_cover(sets: List[int], forced: Sequence[bool]) -> Set[int]:
+        """Picks a small subset of the bitsets whose union equals the union of all of them.
+
+        Lazy greedy set cover: the gain of a set only shrinks as the coverage grows, so a set whose refreshed
+        gain still tops the heap is the best pick without re-evaluating the others. A reverse-delete pass then
+        drops the picks made redundant by later ones.
+
+        Args:
+            sets: Bitset of every candidate.
+            forced: Per-candidate flags of whether the candidate is always selected.
+
+        Returns:
+            Indices of the selected candidates.
+        """
+        universe = 0
+        for bits in sets:
+            universe |= bits
+
+        selected = [index for index, is_forced in enumerate(forced) if is_forced]
+        covered = 0
+        for index in selected:
+            covered |= sets[index]
+
+        heap = [(-_popcount(bits & ~covered), index) for index, bits in enumerate(sets) if not forced[index]]
+        heapq.heapify(heap)
+        picks = []
+
+        while covered != universe:
+            _, index = heapq.heappop(heap)
+            gain = _popcount(sets[index] & ~covered)
+            if not gain:
+                continue
+
+            if heap and gain < -heap[0][0]:
+                heapq.heappush(heap, (-gain, index))
                 continue
 
-            visited.add(current)
-            stack.extend(graph.get(current, []))
+            picks.append(index)
+            covered |= sets[index]
+
+        # A pick is redundant if every one of its bits is covered by at least one other selected set
+        selected += picks
+        twice = _covered_twice(sets, selected)
+        for index in reversed(picks):
+            if not sets[index] & ~twice:
+                selected.remove(index)
+                twice = _covered_twice(sets, selected)
 
-        return False
+        return set(selected)
+
+    @staticmethod
+    def _filter_cross_group(
+        resolved_deps: ProjectDependencies, pruned_deps: List[Dependency], keep: List[str]
+    ) -> List[Dependency]:
+        """Drops the group and extra deps that are installed by the main dependencies anyway.
+
+        Group and extra dependencies are separate nodes, which the lock edges never point at, so the regular
+        redundancy search cannot see that e.g. `requests` in the main dependencies brings a dev `urllib3` in.
+        The always-installed set is the closure of the kept, unmarked main dependencies over unconditional edges.
+        A group or extra dependency is dropped if its package and all of its required extras are in that set,
+        regardless of its own marker.
+        """
+        keep = [canonical_name(name) for name in keep]
+        main = [dep for dep in pruned_deps if not dep.groups and not dep.extras and dep.marker is None]
+        grouped = [dep for dep in pruned_deps if dep.groups or dep.extras]
+
+        # The package node in place of the group/extra node, plus the required extras
+        package_keys = {
+            dep.key: [replace(dep, groups=frozenset(), extras=frozenset()).key, *dep.node_keys[1:]]
+            for dep in grouped
+        }
+        graph = resolved_deps.graph.including(
+            [key for dep in main for key in dep.node_keys]
+            + [key for keys in package_keys.values() for key in keys]
+        )
+        installed = reachable(
+            graph, (graph.node_id(key) for dep in main for key in dep.node_keys), unconditional_only=True
+        )
+
+        dropped = {
+            dep.key
+            for dep in grouped
+            if dep.canonical not in keep
+            and all(installed[graph.node_id(key)] for key in package_keys[dep.key])
+        }
+        if not dropped:
+            return pruned_deps
+
+        logger.info(
+            f"Cross-group: dropped {len(dropped)} group/extra deps installed by the main dependencies: "
+            + ", ".join(
+                sorted(f"{name} ({', '.join(sorted(groups | extras))})" for name, groups, extras in dropped)
+            )
+        )
+        return [dep for dep in pruned_deps if dep.key not in dropped]
 
     @staticmethod
     def _filter_redundant(direct: List[Dependency], redundant: Set[DepKeyT]) -> List[Dependency]:
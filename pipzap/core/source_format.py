@@ -1,5 +1,7 @@
 from enum import Enum
+from functools import partial
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional
 
 from pipzap.exceptions import ParsingError
 from pipzap.utils.io import read_toml
@@ -14,8 +16,16 @@ class SourceFormat(Enum):
     CONDA = "conda"
 
     @classmethod
-    def detect_format(cls, file_path: Path) -> "SourceFormat":
-        """Attempts to guess the build system given a source file path."""
+    def detect_format(
+        cls, file_path: Path, reader: Optional[Callable[[Path], Dict[str, Any]]] = None
+    ) -> "SourceFormat":
+        """Attempts to guess the build system given a source file path.
+
+        Args:
+            file_path: Path to the source file.
+            reader: Parses a pyproject.toml, e.g. into a document shared with the later stages (see
+                    `Workspace.document`). Default: a read-only parse.
+        """
 
         if "requirements" in file_path.name and ".txt" in file_path.suffixes:
             return cls.REQS
@@ -26,7 +36,7 @@ class SourceFormat(Enum):
         if file_path.name != "pyproject.toml":
             raise ParsingError(f"Cannot determine format of {file_path}")
 
-        data = read_toml(file_path)
+        data = (reader or partial(read_toml, roundtrip=False))(file_path)
 
         if "tool" in data and "poetry" in data["tool"]:
             return cls.POETRY
@@ -5,6 +5,8 @@ from typing import List, Set
 from loguru import logger
 from pipreqs import pipreqs
 
+from pipzap.utils.names import canonical_name
+
 
 def discover_dependencies(scan_path: Path) -> Set[str]:
     """Discovers package dependencies by scanning Python source files.
@@ -15,7 +17,7 @@ def discover_dependencies(scan_path: Path) -> Set[str]:
         scan_path: Directory to scan for Python files.
 
     Returns:
-        Set of discovered package names (normalized to lowercase).
+        Set of discovered canonical (PEP 503) package names.
 
     """
     if not scan_path.is_dir():
@@ -47,7 +49,7 @@ def discover_dependencies(scan_path: Path) -> Set[str]:
         logger.warning(f"Failed to map some imports to packages: {e}")
         packages = list(imports)
 
-    discovered = {pkg.lower() for pkg in packages}
+    discovered = {canonical_name(pkg) for pkg in packages}
 
     logger.info(f"Discovered {len(discovered)} packages")
     logger.debug(f"Discovered packages: {sorted(discovered)}")
@@ -14,3 +14,9 @@ class ResolutionError(DependencyError):
     """Raised when dependency resolution fails."""
 
     ...
+
+
+class QueryError(DependencyError):
+    """Raised when a dependency graph query cannot be answered."""
+
+    ...
@@ -3,10 +3,9 @@ from typing import Any, Dict, List, Optional, Tuple, Union, cast
 from urllib.parse import urlparse
 
 import tomlkit
-from packaging.requirements import Requirement
 
 from pipzap.utils.pretty_string import remove_prefix
-from pipzap.utils.requirement_string import parse_requirement_string
+from pipzap.utils.requirement_string import ParsedRequirement, parse_requirement_string
 
 
 class UVToPoetryConverter:
@@ -57,13 +56,13 @@ class UVToPoetryConverter:
         uv_sources = self.uv_doc.get("tool", {}).get("uv", {}).get("sources", [])
         return {source["name"]: {k: v for k, v in source.items() if k != "name"} for source in uv_sources}
 
-    def _handle_url_dependency(self, req: Requirement, dep: dict) -> None:
+    def _handle_url_dependency(self, url: str, dep: dict) -> None:
         """Handles URL-based dependencies (git, file, etc.)."""
-        if req.url.startswith("file://") or not req.url.startswith("git+"):
-            dep["url"] = req.url
+        if url.startswith("file://") or not url.startswith("git+"):
+            dep["url"] = url
             return
 
-        git_url = remove_prefix(req.url, "git+")
+        git_url = remove_prefix(url, "git+")
         parsed = urlparse(git_url)
 
         if "@" not in parsed.path:
@@ -77,13 +76,13 @@ class UVToPoetryConverter:
 
     def _handle_versioned_dependency(
         self,
-        req: Requirement,
+        req: ParsedRequirement,
         sources: Dict[str, Dict[str, dict]],
         dep: dict,
     ) -> Optional[dict]:
         """Handles versioned dependencies and sources, returning source dict if no index is present."""
         if req.specifier:
-            version = remove_prefix(str(req.specifier), "=", 2)
+            version = remove_prefix(req.specifier, "=", 2)
 
             if version.startswith("!="):
                 version = f"*,{version}"
@@ -121,17 +120,17 @@ class UVToPoetryConverter:
         dep: Dict[str, Union[str, List[str]]] = {}
 
         if req.url:
-            self._handle_url_dependency(req, dep)
+            self._handle_url_dependency(req.url, dep)
         else:
             source_dep = self._handle_versioned_dependency(req, sources, dep)
             if source_dep:
                 return name, source_dep
 
         if req.marker:
-            dep["markers"] = str(req.marker).replace('"', "'")
+            dep["markers"] = req.marker.replace('"', "'")
 
         if req.extras:
-            dep["extras"] = list(req.extras)
+            dep["extras"] = sorted(req.extras)
 
         if not dep:
             return name, "*"
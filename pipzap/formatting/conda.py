@@ -5,6 +5,7 @@ from ruamel.yaml import YAML
 
 from pipzap.core.dependencies import DepKeyT
 from pipzap.formatting.base import DependenciesFormatter
+from pipzap.utils.names import canonical_name
 from pipzap.utils.requirement_string import parse_requirement_string
 
 
@@ -51,7 +52,7 @@ class CondaFormatter(DependenciesFormatter):
                 continue
 
             try:
-                name = parse_requirement_string(req_str).name.lower()
+                name = canonical_name(parse_requirement_string(req_str).name)
             except Exception:
                 # Keep unparseable entries
                 filtered.append(req_str)
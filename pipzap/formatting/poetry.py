@@ -5,6 +5,7 @@ import tomlkit
 from pipzap.core.source_format import SourceFormat
 from pipzap.formatting._uv_to_poetry import UVToPoetryConverter
 from pipzap.formatting.base import DependenciesFormatter
+from pipzap.utils.names import canonical_name
 
 
 class PoetryFormatter(DependenciesFormatter):
@@ -32,7 +33,7 @@ class PoetryFormatter(DependenciesFormatter):
         return tomlkit.dumps(pyproject)
 
     def _filter_pyproject(self, pyproject: dict) -> dict:
-        kept_names = {dep.name.lower() for dep in self.dependencies.direct}
+        kept_names = {dep.canonical for dep in self.dependencies.direct}
 
         self._remove_irrelevant_sections(pyproject)
         poetry = pyproject.get("tool", {}).get("poetry", {})
@@ -85,9 +86,9 @@ class PoetryFormatter(DependenciesFormatter):
         """
         extras = poetry.get("extras", {})
         filtered_extras = {
-            extra: tomlkit.array([dep for dep in deps if dep.lower() in kept_names]).multiline(True)
+            extra: tomlkit.array([dep for dep in deps if canonical_name(dep) in kept_names]).multiline(True)
             for extra, deps in extras.items()
-            if [dep for dep in deps if dep.lower() in kept_names]
+            if [dep for dep in deps if canonical_name(dep) in kept_names]
         }
         if not filtered_extras:
             return poetry.pop("extras", None)
@@ -134,7 +135,8 @@ class PoetryFormatter(DependenciesFormatter):
         if name == "python":
             return True
 
+        name = canonical_name(name)
         return any(
-            dep.name.lower() == name.lower() and (group in dep.groups if group else not dep.groups)
+            dep.canonical == name and (group in dep.groups if group else not dep.groups)
             for dep in self.dependencies.direct
         )
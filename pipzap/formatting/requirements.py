@@ -1,7 +1,9 @@
 from loguru import logger
 
 from pipzap import __uv_version__, __version__
+from pipzap.exceptions import ParsingError
 from pipzap.formatting.base import DependenciesFormatter
+from pipzap.utils.names import canonical_name
 from pipzap.utils.requirement_string import parse_requirement_string
 
 
@@ -25,7 +27,7 @@ class RequirementsTXTFormatter(DependenciesFormatter):
             *[line for line in requirements_txt.strip().splitlines() if not line.startswith("#")],
         ]
 
-        direct_deps = {dep.name: dep for dep in self.dependencies.direct}
+        direct_deps = {dep.canonical: dep for dep in self.dependencies.direct}
 
         filtered_lines = []
         for line in lines:
@@ -40,18 +42,19 @@ class RequirementsTXTFormatter(DependenciesFormatter):
 
             try:
                 req = parse_requirement_string(line.split(";")[0].split("#")[0].strip())
-            except ValueError as err:
+            except ParsingError as err:
                 logger.error(
                     f"Unable to parse '{line}' as a requirement. Skipping. \nError: {err}"
                     "This is likely a bug, please report it."
                 )
                 continue
 
-            if req.name not in direct_deps:
+            dep = direct_deps.get(canonical_name(req.name))
+            if dep is None:
                 continue
 
-            comment = f"  # pinned: {direct_deps[req.name].pinned_version or 'none'}"
-            if "==" in str(req.specifier):
+            comment = f"  # pinned: {dep.pinned_version or 'none'}"
+            if "==" in req.specifier:
                 comment = ""
 
             filtered_lines.append(line + comment)
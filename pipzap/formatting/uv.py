@@ -1,10 +1,11 @@
 from copy import deepcopy
-from typing import List, Optional, Set
+from typing import List, Optional, Set, Tuple
 
 import tomlkit
 
 from pipzap.core.dependencies import DepKeyT
 from pipzap.formatting.base import DependenciesFormatter
+from pipzap.utils.names import canonical_name
 from pipzap.utils.requirement_string import parse_requirement_string
 
 
@@ -27,6 +28,11 @@ class UVFormatter(DependenciesFormatter):
 
         keep_keys = {dep.key for dep in self.dependencies.direct}
 
+        # Group requirements also belong to the groups including theirs, so they are matched by membership
+        keep_in_groups = {
+            (name, group) for name, groups, extras in keep_keys if not extras for group in groups
+        }
+
         # [project.dependencies]
         project_deps = project.get("dependencies")
         if project_deps:
@@ -34,13 +40,13 @@ class UVFormatter(DependenciesFormatter):
 
         # [project.optional-dependencies]
         optional_deps = project.get("optional-dependencies", [])
-        for extra in optional_deps:
+        for extra in list(optional_deps):
             optional_deps[extra] = self._filter_section(optional_deps[extra], keep_keys, extra=extra)
 
         # [dependency-groups]
         groups_deps = pyproject.get("dependency-groups", [])
-        for group in groups_deps:
-            groups_deps[group] = self._filter_section(groups_deps[group], keep_keys, group)
+        for group in list(groups_deps):
+            groups_deps[group] = self._filter_section(groups_deps[group], keep_keys, group, keep_in_groups)
 
         pyproject.get("tool", {}).pop("poetry", None)
         return tomlkit.dumps(pyproject)
@@ -50,6 +56,7 @@ class UVFormatter(DependenciesFormatter):
         section: List[str],
         keep_keys: Set[DepKeyT],
         group: Optional[str] = None,
+        keep_in_groups: Optional[Set[Tuple[str, str]]] = None,
         extra: Optional[str] = None,
     ) -> List[str]:
         """Filters a section of dependencies to keep only those in keep_keys.
@@ -58,6 +65,7 @@ class UVFormatter(DependenciesFormatter):
             section: List of requirement strings from the original pyproject.toml.
             keep_keys: Set of (name, groups, extras) tuples to retain.
             group: The group context, if applicable.
+            keep_in_groups: Set of (name, group) pairs to retain in group sections, if applicable.
             extra: The extra context, if applicable.
 
         Returns:
@@ -73,14 +81,18 @@ class UVFormatter(DependenciesFormatter):
                 filtered.append(req_str)
                 continue
 
-            name = parse_requirement_string(req_str).name.lower()
+            name = canonical_name(parse_requirement_string(req_str).name)
             key = (name, group_set, extra_set)
 
             if key in seen_keys:
                 continue
 
-            if key in keep_keys:
+            kept = (name, group) in keep_in_groups if keep_in_groups is not None else key in keep_keys
+            if kept:
                 seen_keys.add(key)
                 filtered.append(req_str)
 
-        return tomlkit.array(filtered).multiline(True)
+        # `tomlkit.array` parses a TOML string, so the entries (include-group tables among them) are added as items
+        array = tomlkit.array()
+        array.extend(filtered)
+        return array.multiline(True)
@@ -1,5 +1,6 @@
 from .converter import ProjectConverter
 from .parser import DependenciesParser
+from .pool import WorkspacePool
 from .workspace import Workspace
 
-__all__ = ["ProjectConverter", "Workspace", "DependenciesParser"]
+__all__ = ["ProjectConverter", "Workspace", "WorkspacePool", "DependenciesParser"]
@@ -1,13 +1,13 @@
 import sys
 from typing import List, Optional
 
+import tomlkit
 from loguru import logger
 from ruamel.yaml import YAML
 
 from pipzap.core.source_format import SourceFormat
 from pipzap.exceptions import ParsingError, ResolutionError
 from pipzap.parsing.workspace import Workspace
-from pipzap.utils.io import read_toml, write_toml
 
 
 class ProjectConverter:
@@ -44,7 +44,7 @@ class ProjectConverter:
         Returns:
             The source file format identified.
         """
-        deps_format = SourceFormat.detect_format(workspace.path)
+        deps_format = SourceFormat.detect_format(workspace.path, lambda path: workspace.document(path.name))
         logger.debug(f"Identified source format as '{deps_format.value}'")
 
         if deps_format == SourceFormat.REQS:
@@ -85,15 +85,14 @@ class ProjectConverter:
             "conversion",
         )
 
-        path = workspace.base / "pyproject.toml"
-        pyproject = read_toml(path)
+        pyproject = workspace.document()
         pyproject["project"]["name"] = self.DUMMY_PROJECT_NAME
-        write_toml(pyproject, path)
+        workspace.update_document(pyproject)
 
         if not self._try_inject_python_version(workspace):
             raise ResolutionError("An explicit python version must be provided for requirements.txt projects")
 
-        workspace.run(["uv", "lock"], "resolution")
+        self._lock(workspace)
 
     def _convert_from_poetry(self, workspace: Workspace):
         """Implements the pyproject.toml (poetry) -> pyproject.toml (uv) conversion.
@@ -106,19 +105,28 @@ class ProjectConverter:
         )
 
         self._try_inject_python_version(workspace)
-        workspace.run(["uv", "lock"], "resolution")
+        self._lock(workspace)
 
-        pyproject_path = workspace.base / "pyproject.toml"
-        pyproject = read_toml(pyproject_path)
+        pyproject = workspace.document()
         pyproject["tool"] = {key: val for key, val in pyproject["tool"].items() if key != "poetry"}
-        write_toml(pyproject, pyproject_path)
+        workspace.update_document(pyproject)
 
     def _convert_from_uv(self, workspace: Workspace):
-        """Pass-though uv-to-uv conversion. Makes sure to perform locking if not done yet."""
-        if (workspace.base / "uv.lock").is_file():
+        """Pass-though uv-to-uv conversion. Makes sure to perform locking if not done yet.
+
+        A seeded lock is always re-locked, since it may be stale relative to the pyproject.toml.
+        """
+        if (workspace.base / "uv.lock").is_file() and not workspace.lock_seeded:
             return
 
         self._try_inject_python_version(workspace)
+        self._lock(workspace)
+
+    def _lock(self, workspace: Workspace) -> None:
+        """Resolves the workspace project, warm-starting from the seeded `uv.lock` if there is one."""
+        if workspace.lock_seeded:
+            logger.info("Locking with the existing uv.lock as a seed")
+
         workspace.run(["uv", "lock"], "resolution")
 
     def _try_inject_python_version(self, workspace: Workspace) -> bool:
@@ -130,10 +138,10 @@ class ProjectConverter:
             Whether it has managed to inject the python version field.
         """
         fallback: Optional[str] = None
-        potential_pyproject_path = workspace.base / "pyproject.toml"
+        pyproject = None
 
-        if potential_pyproject_path.is_file():
-            pyproject = read_toml(potential_pyproject_path)
+        if (workspace.base / "pyproject.toml").is_file():
+            pyproject = workspace.document()
             uv_version = pyproject.get("project", {}).get("requires-python")
             poetry_version = pyproject.get("tool", {}).get("poetry", {}).get("dependencies", {}).get("python")
             fallback = uv_version or poetry_version
@@ -143,10 +151,11 @@ class ProjectConverter:
         if version is None:
             return False
 
-        path = workspace.base / "pyproject.toml"
-        pyproject = read_toml(path)
+        if pyproject is None:
+            pyproject = workspace.document()
+
         pyproject["project"]["requires-python"] = version
-        write_toml(pyproject, path)
+        workspace.update_document(pyproject)
 
         return True
 
@@ -283,5 +292,5 @@ class ProjectConverter:
         return None
 
     def _log_intermediate(self, workspace: Workspace) -> None:
-        content = (workspace.base / "pyproject.toml").read_text()
+        content = tomlkit.dumps(workspace.document())
         logger.debug(f"Intermediate UV pyproject:\n{content}")
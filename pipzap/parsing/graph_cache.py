@@ -0,0 +1,147 @@
+import hashlib
+import marshal
+import os
+import sys
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Union
+
+from loguru import logger
+
+from pipzap.core.graph import DepKeyT, DependencyGraph
+from pipzap.utils.cache import cache_dir, evict_lru, temp_path
+
+
+@dataclass(frozen=True)
+class LockGraph:
+    """Everything the parser takes from a uv.lock, given the direct dependencies."""
+
+    graph: DependencyGraph
+    """Dependency graph, the direct dependency nodes included."""
+
+    indirect_markers: Dict[str, Set[str]]
+    """Markers of the lock entries requiring a package, by canonical package name."""
+
+    versions: Dict[str, Optional[str]]
+    """Locked version of every package, by canonical package name."""
+
+
+def _decode_ids(data: bytes) -> array:
+    ids = array("i")
+    ids.frombytes(data)
+    return ids
+
+
+class GraphCache:
+    """On-disk cache of the graphs parsed out of uv.lock files, so that processing a lock again skips TOML parsing.
+
+    Entries are keyed by the lock content hash and the direct dependency keys (the direct dependencies
+    are graph nodes as well), and hold the CSR arrays and tables as a single `marshal` blob.
+    Several processes may share the directory: entries are written to a temporary file and atomically
+    moved in place, unreadable entries are misses, and the least recently used entries are evicted
+    once the directory outgrows its size bound.
+    """
+
+    FORMAT = 2
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, directory: Union[Path, str], max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Directory of the cache entries.
+            max_bytes: Total size of the entries to evict down to. Default: 256 MiB.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def default(cls) -> "GraphCache":
+        """The cache in the pipzap cache directory."""
+        return cls(cache_dir() / "graphs")
+
+    def load(self, lock_hash: str, direct_keys: Iterable[DepKeyT]) -> Optional[LockGraph]:
+        """Looks a parsed lock up.
+
+        Args:
+            lock_hash: SHA-256 of the uv.lock contents.
+            direct_keys: Keys of the direct dependencies the graph was built for.
+
+        Returns:
+            The cached lock graph, None on a miss.
+        """
+        path = self._path(lock_hash, direct_keys)
+        try:
+            keys, offsets, targets, defined, edge_markers, markers, indirect, versions = marshal.loads(
+                path.read_bytes()
+            )
+            graph = DependencyGraph(
+                list(keys),
+                _decode_ids(offsets),
+                _decode_ids(targets),
+                bytearray(defined),
+                None,
+                _decode_ids(edge_markers),
+                list(markers),
+            )
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            logger.debug(f"Ignoring an unreadable graph cache entry {path}: {e}")
+            return None
+
+        # Refreshes the recency for the LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        logger.debug(f"Graph cache hit: {path.name}")
+        return LockGraph(graph, {name: set(names) for name, names in indirect.items()}, versions)
+
+    def store(self, lock_hash: str, direct_keys: Iterable[DepKeyT], entry: LockGraph) -> None:
+        """Saves a parsed lock, evicting the least recently used entries if the cache grows too large.
+
+        Args:
+            lock_hash: SHA-256 of the uv.lock contents.
+            direct_keys: Keys of the direct dependencies the graph was built for.
+            entry: The parsed lock graph.
+        """
+        graph = entry.graph
+        path = self._path(lock_hash, direct_keys)
+
+        try:
+            data = marshal.dumps(
+                (
+                    tuple(graph.key_of(node) for node in range(graph.num_nodes)),
+                    graph.offsets.tobytes(),
+                    graph.targets.tobytes(),
+                    bytes(graph.defined),
+                    graph.edge_markers.tobytes(),
+                    tuple(graph.markers),
+                    {name: tuple(sorted(markers)) for name, markers in entry.indirect_markers.items()},
+                    entry.versions,
+                )
+            )
+        except ValueError as e:
+            logger.debug(f"Unable to serialize the lock graph for the cache: {e}")
+            return
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp = temp_path(path)
+            temp.write_bytes(data)
+            os.replace(temp, path)
+            evict_lru(self.directory, self.max_bytes)
+        except OSError as e:
+            logger.warning(f"Unable to save the lock graph to {path}: {e}")
+
+    def _path(self, lock_hash: str, direct_keys: Iterable[DepKeyT]) -> Path:
+        # marshal's format and the array byte order are platform-dependent, so they are a part of the key
+        digest = hashlib.sha256(f"{self.FORMAT}|{marshal.version}|{sys.byteorder}|{lock_hash}".encode())
+        for name, groups, extras in sorted(
+            {(name, tuple(sorted(groups)), tuple(sorted(extras))) for name, groups, extras in direct_keys}
+        ):
+            digest.update(f"\n{name}|{','.join(groups)}|{','.join(extras)}".encode())
+
+        return self.directory / f"{digest.hexdigest()[:32]}.bin"
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from pipzap.exceptions import ParsingError
+from pipzap.utils.io import loads_toml
+from pipzap.utils.names import canonical_name
+
+
+@dataclass(frozen=True)
+class LockedArtifact:
+    """A wheel or an sdist of a locked package."""
+
+    filename: str
+    """File name of the artifact (e.g., "numpy-2.2.3-cp312-cp312-manylinux_2_17_x86_64.whl")."""
+
+    size: Optional[int] = None
+    """Size of the artifact in bytes, if recorded."""
+
+
+@dataclass
+class LockedPackage:
+    """The artifacts of a single `[[package]]` entry of uv.lock."""
+
+    name: str
+    """Canonical (PEP 503) package name."""
+
+    version: Optional[str] = None
+    """Locked version."""
+
+    wheels: List[LockedArtifact] = field(default_factory=list)
+    """Wheels available for the locked version."""
+
+    sdist: Optional[LockedArtifact] = None
+    """Source distribution, if any."""
+
+    resolution_markers: List[str] = field(default_factory=list)
+    """Markers of the forks this version is locked for, empty if the package is not forked."""
+
+    @property
+    def is_local(self) -> bool:
+        """Whether the package is the project itself or another local source without registry artifacts."""
+        return not self.wheels and self.sdist is None
+
+
+def iter_locked_packages(path: Union[Path, str]) -> Iterator[LockedPackage]:
+    """Streams the packages of a uv.lock, one `[[package]]` entry at a time.
+
+    The lock is read line by line, and only the lines of the current entry (including its
+    `[package.*]` subtables) are held and parsed. Every entry is reduced to its name, version
+    and artifact file names and sizes, so the full wheel tables never accumulate in memory.
+
+    Args:
+        path: Path to the uv.lock.
+
+    Raises:
+        ParsingError: If an entry cannot be parsed.
+
+    Returns:
+        An iterator over the locked packages, in the lock order.
+    """
+    chunk: List[str] = []
+    in_package = False
+
+    with Path(path).open("r") as file:
+        for line in file:
+            # Subtables (`[package.optional-dependencies]`, ...) belong to the current entry
+            if line.startswith("[") and not line.startswith("[package."):
+                if chunk:
+                    yield _parse_package(chunk)
+                    chunk = []
+
+                in_package = line.startswith("[[package]]")
+
+            if in_package:
+                chunk.append(line)
+
+    if chunk:
+        yield _parse_package(chunk)
+
+
+def _parse_package(lines: List[str]) -> LockedPackage:
+    """Parses a single `[[package]]` entry, subtables included."""
+    try:
+        entry = loads_toml("".join(lines), roundtrip=False)["package"][0]
+    except Exception as e:
+        raise ParsingError(f"Unable to parse a uv.lock package entry: {e}") from e
+
+    sdist = entry.get("sdist")
+    return LockedPackage(
+        name=canonical_name(entry["name"]),
+        version=entry.get("version"),
+        wheels=[_parse_artifact(wheel) for wheel in entry.get("wheels", [])],
+        sdist=_parse_artifact(sdist) if sdist else None,
+        resolution_markers=[str(marker) for marker in entry.get("resolution-markers", [])],
+    )
+
+
+def _parse_artifact(artifact: Dict[str, Any]) -> LockedArtifact:
+    location = artifact.get("filename") or artifact.get("url") or artifact.get("path") or ""
+    return LockedArtifact(filename=str(location).rsplit("/", 1)[-1], size=artifact.get("size"))
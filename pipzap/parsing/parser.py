@@ -1,14 +1,20 @@
+from dataclasses import replace
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 import tomlkit
 import tomlkit.items
 from loguru import logger
+from packaging.utils import canonicalize_name
 
-from pipzap.core.dependencies import Dependency, DepKeyT, ProjectDependencies
+from pipzap.core.dependencies import Dependency, ProjectDependencies
+from pipzap.core.graph import DepKeyT, DependencyGraph, GraphBuilder, fork_key
 from pipzap.core.source_format import SourceFormat
 from pipzap.exceptions import ParsingError
+from pipzap.parsing.graph_cache import GraphCache, LockGraph
 from pipzap.parsing.workspace import Workspace
-from pipzap.utils.io import read_toml
+from pipzap.utils.io import hash_file, read_toml
+from pipzap.utils.names import canonical_name
 from pipzap.utils.requirement_string import parse_requirement_string
 
 
@@ -16,12 +22,15 @@ class DependenciesParser:
     """Parser for uv project dependencies from `pyproject.toml` and `uv.lock`."""
 
     @classmethod
-    def parse(cls, workspace: Workspace, source_format: SourceFormat) -> ProjectDependencies:
+    def parse(
+        cls, workspace: Workspace, source_format: SourceFormat, cache: Optional[GraphCache] = None
+    ) -> ProjectDependencies:
         """Parse project dependencies from `pyproject.toml` and `uv.lock` into an internal runtime representation.
 
         Args:
             workspace: The workspace containing the project files.
             source_format: The format of the original dependencies definition.
+            cache: Cache of parsed lock graphs. On a hit, `uv.lock` is not parsed at all. Default: None.
 
         Returns:
             A ProjectDependencies instance with all dependencies and the extract information,
@@ -29,20 +38,78 @@ class DependenciesParser:
         """
         original_project: Optional[dict] = None
         if workspace.backup and workspace.backup.suffix == ".toml":
-            original_project = read_toml(workspace.backup)
+            original_project = workspace.document(workspace.backup.name)
 
-        project = read_toml(workspace.base / "pyproject.toml")
-        lock = read_toml(workspace.base / "uv.lock")
-        lock.setdefault("package", [])
+        project = workspace.document()
+        return cls._parse_documents(
+            project, workspace.base / "uv.lock", source_format, original_project, cache
+        )
+
+    @classmethod
+    def parse_locked(cls, path: Path, cache: Optional[GraphCache] = None) -> ProjectDependencies:
+        """Parse an already resolved uv project in place, without converting or re-locking it.
+
+        Args:
+            path: Path to the uv `pyproject.toml`, or to the directory containing it.
+                  A `uv.lock` is expected next to it.
+            cache: Cache of parsed lock graphs. On a hit, `uv.lock` is not parsed at all. Default: None.
+
+        Raises:
+            ParsingError: If the project is not a locked uv project.
+
+        Returns:
+            A ProjectDependencies instance, same as `parse` would produce for the project.
+        """
+        pyproject_path = path / "pyproject.toml" if path.is_dir() else path
+        lock_path = pyproject_path.parent / "uv.lock"
+
+        if not pyproject_path.is_file() or SourceFormat.detect_format(pyproject_path) != SourceFormat.UV:
+            raise ParsingError(f"Expected a uv pyproject.toml, got '{pyproject_path}'")
+
+        if not lock_path.is_file():
+            raise ParsingError(f"No uv.lock found next to '{pyproject_path}'. Run `uv lock` first.")
+
+        # Nothing is written back in place, so the project is parsed into plain dicts
+        project = read_toml(pyproject_path, roundtrip=False)
+        return cls._parse_documents(project, lock_path, SourceFormat.UV, cache=cache)
 
+    @classmethod
+    def _parse_documents(
+        cls,
+        project: Dict[str, Any],
+        lock_path: Path,
+        source_format: SourceFormat,
+        original_project: Optional[dict] = None,
+        cache: Optional[GraphCache] = None,
+    ) -> ProjectDependencies:
+        """Builds the runtime representation out of the already loaded `pyproject.toml` and the `uv.lock` at a path."""
         indexes = cls._parse_indexes(project)
         direct = cls._build_direct_dependencies(project, indexes)
-        graph, indirect_markers_map = cls._build_dependency_graph(lock, direct)
-        cls._set_indirect_markers(direct, indirect_markers_map)
-        cls._set_pinned_version(lock, direct)
 
-        py_version = project["project"]["requires-python"]
-        parsed = ProjectDependencies(direct, graph, source_format, py_version, original_project, project)
+        lock_hash = hash_file(lock_path)
+        direct_keys = [dep.key for dep in direct]
+        locked = cache.load(lock_hash, direct_keys) if cache else None
+
+        if locked is None:
+            lock = read_toml(lock_path, roundtrip=False)
+            lock.setdefault("package", [])
+
+            graph, indirect_markers_map = cls._build_dependency_graph(lock, direct)
+            versions = {
+                canonical_name(package["name"]): package.get("version") for package in lock["package"]
+            }
+            locked = LockGraph(graph, indirect_markers_map, versions)
+            if cache:
+                cache.store(lock_hash, direct_keys, locked)
+
+        graph = locked.graph
+        direct = cls._with_indirect_markers(direct, locked.indirect_markers)
+        direct = cls._with_pinned_versions(locked.versions, direct)
+
+        py_version = project["project"].get("requires-python")
+        parsed = ProjectDependencies(
+            direct, graph, source_format, py_version, original_project, project, lock_hash
+        )
         logger.debug(f"Parsed dependencies:\n{str(parsed)}")
         return parsed
 
@@ -93,16 +160,72 @@ class DependenciesParser:
                 direct.append(cls._parse_requirement(req, set(), {extra}, sources, indexes))
 
         # [dependency-groups]
-        for group, deps in project.get("dependency-groups", {}).items():
+        dependency_groups = project.get("dependency-groups", {})
+        memberships = cls._group_memberships(dependency_groups)
+        for group, deps in dependency_groups.items():
             for dep in deps:
                 if not isinstance(dep, str):
-                    logger.warning(f"Found a non-flat dependency-group: {dep}. This is not implemented yet.")
+                    if "include-group" not in dep:
+                        logger.warning(f"Found an unsupported dependency-group entry: {dep}. Skipping.")
                     continue
 
-                direct.append(cls._parse_requirement(dep, {group}, set(), sources, indexes))
+                direct.append(cls._parse_requirement(dep, memberships[group], set(), sources, indexes))
 
         return direct
 
+    @staticmethod
+    def _group_memberships(dependency_groups: Dict[str, List[Any]]) -> Dict[str, Set[str]]:
+        """Resolves the `{include-group = "..."}` entries of `[dependency-groups]` (PEP 735).
+
+        A requirement belongs to the group listing it and to every group including that one, transitively.
+        The closure of every group (itself and everything it includes) is expanded once and memoized,
+        so a group included from many places is never walked again.
+
+        Args:
+            dependency_groups: The `[dependency-groups]` table.
+
+        Raises:
+            ParsingError: If a group includes an unknown group, or the groups include each other in a cycle.
+
+        Returns:
+            Mapping of every group to the groups its own requirements belong to.
+        """
+        names = {canonicalize_name(group): group for group in dependency_groups}
+        closures: Dict[str, Set[str]] = {}
+        path: List[str] = []
+
+        def closure(group: str) -> Set[str]:
+            if group in closures:
+                return closures[group]
+
+            if group in path:
+                cycle = " -> ".join([*path[path.index(group) :], group])
+                raise ParsingError(f"Dependency groups include each other in a cycle: {cycle}")
+
+            path.append(group)
+            members = {group}
+            for entry in dependency_groups[group]:
+                if isinstance(entry, str) or "include-group" not in entry:
+                    continue
+
+                included = names.get(canonicalize_name(entry["include-group"]))
+                if included is None:
+                    raise ParsingError(
+                        f"Dependency group '{group}' includes an unknown group '{entry['include-group']}'"
+                    )
+                members |= closure(included)
+
+            path.pop()
+            closures[group] = members
+            return members
+
+        memberships: Dict[str, Set[str]] = {group: set() for group in dependency_groups}
+        for group in dependency_groups:
+            for included in closure(group):
+                memberships[included].add(group)
+
+        return memberships
+
     @staticmethod
     def _parse_requirement(
         req_str: str,
@@ -120,69 +243,151 @@ class DependenciesParser:
             name=name,
             groups=frozenset(groups),
             extras=frozenset(extras),
-            marker=str(req.marker) if req.marker else None,
+            marker=req.marker,
             index=indexes.get(source.get("index")) if "index" in source else None,
-            required_extras=frozenset(req.extras or []),
+            required_extras=req.extras,
         )
 
-    @staticmethod
+    @classmethod
     def _build_dependency_graph(
-        lock: Dict[str, Any], deps: List[Dependency]
-    ) -> Tuple[Dict[DepKeyT, List[DepKeyT]], Dict[str, Set[str]]]:
-        """Parse the resolved dependency graph from uv.lock and collect indirect markers."""
-        graph: Dict[DepKeyT, List[DepKeyT]] = {}
-        direct_map = {dep.key: dep for dep in deps}
+        cls, lock: Dict[str, Any], deps: List[Dependency]
+    ) -> Tuple[DependencyGraph, Dict[str, Set[str]]]:
+        """Parse the resolved dependency graph from uv.lock and collect indirect markers.
+
+        Besides `dependencies`, every `[package.optional-dependencies]` table becomes an extra node,
+        so that requesting `pkg[x]` anywhere activates the optional dependencies of `pkg`'s extra `x`.
+
+        The lock packages are indexed by name once, and every entry is visited once. A name locked more
+        than once (one entry per `resolution-markers` fork) gets a node per version, and its package and
+        extra nodes point at the versions under the markers of their forks. Direct dependency nodes get
+        the edges of their package node.
+        """
+        builder = GraphBuilder()
         indirect_markers_map: Dict[str, Set[str]] = {}
 
+        packages: Dict[str, List[Dict[str, Any]]] = {}
         for package in lock.get("package", []):
-            name = package["name"].lower()
-            package_deps = package.get("dependencies", [])
+            packages.setdefault(canonical_name(package["name"]), []).append(package)
 
-            for dep_entry in package_deps:
-                dep_name = dep_entry["name"].lower()
-                marker = dep_entry.get("marker")
+        forks = {
+            name: {entry["version"] for entry in entries if "version" in entry}
+            for name, entries in packages.items()
+            if len(entries) > 1
+        }
 
-                if not marker:
+        direct_keys: Dict[str, List[DepKeyT]] = {}
+        for dep in deps:
+            direct_keys.setdefault(dep.key[0], []).append(dep.key)
+
+        for name, entries in packages.items():
+            versions: Tuple[List[int], List[int]] = ([], [])
+            extras: Dict[str, Tuple[List[int], List[int]]] = {}
+
+            for package in entries:
+                package_deps = package.get("dependencies", [])
+                optional_deps = package.get("optional-dependencies", {})
+
+                for dep_entry in [
+                    *package_deps,
+                    *(entry for entries in optional_deps.values() for entry in entries),
+                ]:
+                    marker = dep_entry.get("marker")
+                    if marker:
+                        indirect_markers_map.setdefault(canonical_name(dep_entry["name"]), set()).add(marker)
+
+                if name not in forks:
+                    edges = cls._lock_edges(builder, package_deps, forks)
+                    builder.set_edges(builder.package_node(name), *edges)
+                    for extra, extra_entries in optional_deps.items():
+                        builder.set_edges(
+                            builder.extra_node(name, extra), *cls._lock_edges(builder, extra_entries, forks)
+                        )
                     continue
 
-                if dep_name not in indirect_markers_map:
-                    indirect_markers_map[dep_name] = set()
-                indirect_markers_map[dep_name].add(marker)
+                version = package.get("version", "")
+                label = fork_key(name, version)[0]
+                fork_marker = builder.marker(cls._fork_marker(package))
 
-            for d_name, groups, extras in direct_map:
-                if d_name != name:
-                    continue
-                key = (name, groups, extras)
-                graph[key] = [(dep["name"].lower(), frozenset(), frozenset()) for dep in package_deps]
+                node = builder.fork_node(name, version)
+                builder.set_edges(node, *cls._lock_edges(builder, package_deps, forks))
+                versions[0].append(node)
+                versions[1].append(fork_marker)
 
-        for package in lock.get("package", []):
-            name = package["name"].lower()
-            key = (name, frozenset(), frozenset())
-            if key in graph:
-                continue
+                for extra, extra_entries in optional_deps.items():
+                    extra_node = builder.extra_node(label, extra)
+                    builder.set_edges(extra_node, *cls._lock_edges(builder, extra_entries, forks))
+                    extras.setdefault(extra, ([], []))[0].append(extra_node)
+                    extras[extra][1].append(fork_marker)
 
-            graph[key] = [
-                (dep["name"].lower(), frozenset(), frozenset())  #
-                for dep in package.get("dependencies", [])
-            ]
+            if name in forks:
+                edges = versions
+                builder.set_edges(builder.package_node(name), *versions)
+                for extra, extra_versions in extras.items():
+                    builder.set_edges(builder.extra_node(name, extra), *extra_versions)
 
-        return graph, indirect_markers_map
+            for key in direct_keys.get(name, ()):
+                builder.set_edges(builder.node(key), *edges)
+
+        return builder.build(), indirect_markers_map
 
     @staticmethod
-    def _set_indirect_markers(deps: List[Dependency], indirect_markers_map: Dict[str, Set[str]]) -> None:
-        """Set indirect markers on direct dependencies."""
-        for dep in deps:
-            if dep.name.lower() not in indirect_markers_map:
-                continue
+    def _fork_marker(package: Dict[str, Any]) -> Optional[str]:
+        """The marker of the forks a package version is locked for, None if it applies to every fork."""
+        markers = [str(marker) for marker in package.get("resolution-markers", [])]
+        if len(markers) > 1:
+            return " or ".join(f"({marker})" for marker in markers)
+        return markers[0] if markers else None
+
+    @staticmethod
+    def _lock_edges(
+        builder: GraphBuilder, entries: List[Dict[str, Any]], forks: Dict[str, Set[str]]
+    ) -> Tuple[List[int], List[int]]:
+        """Converts uv.lock dependency entries into successor node IDs and their marker IDs.
+
+        An entry requesting extras (`{ name = "pkg", extra = ["x"] }`) yields an edge to `pkg` itself
+        and one to every requested extra node, all under the entry's marker. Entries pinning a version
+        of a forked package (`{ name = "pkg", version = "1.0" }`) point at the node of that version.
+        """
+        children: List[int] = []
+        markers: List[int] = []
+
+        for entry in entries:
+            name = canonical_name(entry["name"])
+            marker = builder.marker(entry.get("marker"))
+            version = entry.get("version")
 
-            dep.indirect_markers = frozenset(indirect_markers_map[dep.name.lower()])
+            if version is not None and version in forks.get(name, ()):
+                children.append(builder.fork_node(name, version))
+                name = fork_key(name, version)[0]
+            else:
+                children.append(builder.package_node(name))
+
+            children.extend(builder.extra_node(name, extra) for extra in entry.get("extra", []))
+            markers.extend([marker] * (1 + len(entry.get("extra", []))))
+
+        return children, markers
 
     @staticmethod
-    def _set_pinned_version(lock: Dict[str, Any], deps: List[Dependency]) -> None:
-        """Fills the pinned versions of the dependencies from `uv.lock`."""
-        versions = {package["name"]: package.get("version") for package in lock["package"]}
+    def _with_indirect_markers(
+        deps: List[Dependency], indirect_markers_map: Dict[str, Set[str]]
+    ) -> List[Dependency]:
+        """Copies the direct dependencies with their indirect markers set."""
+        return [
+            replace(dep, indirect_markers=frozenset(indirect_markers_map[dep.canonical]))
+            if dep.canonical in indirect_markers_map
+            else dep
+            for dep in deps
+        ]
+
+    @staticmethod
+    def _with_pinned_versions(versions: Dict[str, Optional[str]], deps: List[Dependency]) -> List[Dependency]:
+        """Copies the dependencies with their pinned versions from `uv.lock` filled in."""
+        pinned = []
         for dep in deps:
-            dep.pinned_version = version = versions.get(dep.name)
+            version = versions.get(dep.canonical)
+            pinned.append(replace(dep, pinned_version=version))
 
             if not version:
                 logger.warning(f"Unable to determine a pinned version of {dep.name}")
+
+        return pinned
@@ -0,0 +1,159 @@
+import shutil
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from pipzap.parsing.workspace import Workspace, WorkspaceDirectory, workspace_directory
+from pipzap.utils.debug import is_debug
+
+_Idle = Tuple[WorkspaceDirectory, Optional[Path], float]
+"""An idle directory, the source path of its last job and the time it became idle."""
+
+
+def _remove_all(idle: List[_Idle]) -> None:
+    for directory, _, _ in idle:
+        shutil.rmtree(directory.path, ignore_errors=True)
+    idle.clear()
+
+
+class WorkspacePool:
+    """A bounded pool of reusable workspace directories, for processing many projects in one long-running process.
+
+    Instead of creating and removing a temporary directory per job, every isolated workspace borrows
+    an idle directory, preferably the one that last served the same source, and returns it to the pool on exit.
+    The input files placed by a job are kept as a known-clean set (see `WorkspaceDirectory`): the next job of
+    the same unchanged source finds them in place, and only the files a job created or changed are removed.
+    Up to `max_idle` directories are kept, the least recently used ones are removed beyond that.
+
+    Directories idle for longer than the timeout are evicted whenever the pool is used (or by `evict_idle`),
+    and the rest are removed on `close`, or when the pool is garbage collected or the interpreter exits.
+
+    The pool is thread-safe; every concurrent job gets a directory of its own.
+    """
+
+    def __init__(
+        self,
+        max_idle: int = 4,
+        idle_timeout: float = 300.0,
+        base_dir: Union[Path, str, None] = None,
+        prefill: int = 0,
+    ):
+        """
+        Args:
+            max_idle: Number of idle directories to keep at most. Default: 4.
+            idle_timeout: Seconds a directory may stay idle before it is evicted. Default: 300.
+            base_dir: Directory to create the workspace directories in (see `workspace_directory`). Default: None.
+            prefill: Number of directories to create upfront, up to `max_idle`. Default: 0.
+        """
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.base_dir = base_dir
+
+        self._mutex = threading.Lock()
+        self._idle: List[_Idle] = []
+        self._finalizer = weakref.finalize(self, _remove_all, self._idle)
+
+        now = time.monotonic()
+        self._idle.extend(
+            (WorkspaceDirectory(workspace_directory(base_dir)), None, now)
+            for _ in range(min(prefill, max_idle))
+        )
+
+    def __enter__(self) -> "WorkspacePool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def idle(self) -> int:
+        """Number of idle directories in the pool."""
+        with self._mutex:
+            return len(self._idle)
+
+    @contextmanager
+    def workspace(self, source_path: Union[Path, str, None], **kwargs: Any) -> Iterator[Workspace]:
+        """Enters a workspace on a pooled directory.
+
+        Non-isolated and debug workspaces do not use a directory of their own, so those are not pooled.
+
+        Args:
+            source_path: The path to the source file to be processed (see `Workspace`).
+            **kwargs: Other `Workspace` arguments.
+
+        Returns:
+            A context manager of the entered workspace.
+        """
+        if kwargs.get("no_isolation") or is_debug():
+            with Workspace(source_path, **kwargs) as workspace:
+                yield workspace
+            return
+
+        source = Path(source_path).absolute() if source_path else None
+        directory = self._take(source)
+        try:
+            with Workspace(source_path, directory=directory, **kwargs) as workspace:
+                yield workspace
+        except BaseException:
+            # The directory may not have been reset
+            shutil.rmtree(directory.path, ignore_errors=True)
+            raise
+
+        self._give_back(directory, source)
+
+    def evict_idle(self) -> int:
+        """Removes the directories idle for longer than the timeout.
+
+        Returns:
+            Number of directories removed.
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        with self._mutex:
+            expired = [directory for directory, _, since in self._idle if since < deadline]
+            self._idle[:] = [idle for idle in self._idle if idle[2] >= deadline]
+
+        for directory in expired:
+            logger.debug(f"Evicting idle workspace directory '{directory.path}'")
+            shutil.rmtree(directory.path, ignore_errors=True)
+
+        return len(expired)
+
+    def close(self) -> None:
+        """Removes all idle directories."""
+        with self._mutex:
+            _remove_all(self._idle)
+
+    def _take(self, source: Optional[Path]) -> WorkspaceDirectory:
+        self.evict_idle()
+        with self._mutex:
+            # The directory of the same source, else an empty one. Directories of other sources keep their
+            # inputs while there is room for another one, and the least recently used is given up otherwise
+            sources = [idle_source for _, idle_source, _ in self._idle]
+            index = next((i for i in reversed(range(len(sources))) if sources[i] == source), None)
+            if index is None and None in sources:
+                index = sources.index(None)
+            if index is None and len(sources) >= self.max_idle > 0:
+                index = 0
+            directory = self._idle.pop(index)[0] if index is not None else None
+
+        # The directory may have been removed externally (e.g. by a temporary directory cleaner)
+        if directory is not None and directory.path.is_dir():
+            return directory
+
+        return WorkspaceDirectory(workspace_directory(self.base_dir))
+
+    def _give_back(self, directory: WorkspaceDirectory, source: Optional[Path]) -> None:
+        with self._mutex:
+            self._idle.append((directory, source, time.monotonic()))
+            excess = [self._idle.pop(0)[0] for _ in range(len(self._idle) - self.max_idle)]
+
+        for idle in excess:
+            logger.debug(f"Removing least recently used workspace directory '{idle.path}'")
+            shutil.rmtree(idle.path, ignore_errors=True)
+
+        self.evict_idle()
@@ -1,16 +1,21 @@
+import asyncio
+import os
 import re
 import shutil
-import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from loguru import logger
 from typing_extensions import Self
 
 from pipzap.exceptions import ResolutionError
 from pipzap.utils.debug import is_debug
+from pipzap.utils.files import clone_file
+from pipzap.utils.io import read_toml, write_toml
+from pipzap.utils.locks import DirectoryLock
 
 
 @dataclass
@@ -35,19 +40,160 @@ class BackupPath:
         return self._base_path / self.fname
 
 
+@dataclass
+class _Document:
+    """A parsed TOML file of the workspace."""
+
+    data: Dict[str, Any]
+    """The format-preserving document."""
+
+    stamp: Optional[Tuple[int, int]]
+    """Modification time and size of the file as parsed or last written, None if not written yet."""
+
+    dirty: bool = False
+    """Whether the document has changes not written to the file yet."""
+
+
+def workspace_directory(base_dir: Union[Path, str, None] = None) -> Path:
+    """Creates a temporary directory for an isolated workspace.
+
+    Args:
+        base_dir: Directory to create it in, e.g. a RAM-backed `/dev/shm`. Falls back to the system
+                  temporary directory if unusable. Default: `PIPZAP_WORKSPACE_DIR` if set.
+
+    Returns:
+        Path to the new empty directory.
+    """
+    base_dir = base_dir or os.environ.get("PIPZAP_WORKSPACE_DIR")
+    if base_dir:
+        try:
+            return Path(tempfile.mkdtemp(prefix="pipzap-", dir=base_dir))
+        except OSError as e:
+            logger.warning(f"Unable to use '{base_dir}' for the workspace ({e}), using the default")
+
+    return Path(tempfile.mkdtemp())
+
+
+def _stamp(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class _PlacedFile:
+    """An input file placed into a reusable workspace directory."""
+
+    source: Tuple[Path, int, int]
+    """Path, modification time and size of the file it is a copy of."""
+
+    stamp: Tuple[int, int, int]
+    """Modification time, size and inode of the copy as placed."""
+
+
+def _placed_stamp(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class WorkspaceDirectory:
+    """A directory reused by consecutive isolated workspaces (e.g. of a `WorkspacePool`).
+
+    The input files placed into it are kept between the workspaces as a known-clean set, keyed by the path,
+    modification time and size of their sources. A workspace placing the same unchanged input finds it
+    already in place, and on exit only the files created or changed by the job are removed.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: An existing empty directory.
+        """
+        self.path = path
+        self._files: Dict[str, _PlacedFile] = {}
+        self._used: Set[str] = set()
+
+    def place(self, source: Path, target: Path, read_only: bool = False) -> str:
+        """Places a copy of a file into the directory, unless a clean copy of the unchanged file is in place.
+
+        Args:
+            source: The file to copy.
+            target: Path of the copy in the directory.
+            read_only: Whether the copy may share the data of the source (see `clone_file`). Default: False.
+
+        Returns:
+            The method used: "kept", or the one of `clone_file`.
+        """
+        stat = source.stat()
+        key = (source.absolute(), stat.st_mtime_ns, stat.st_size)
+        self._used.add(target.name)
+
+        placed = self._files.get(target.name)
+        if placed is not None and placed.source == key:
+            try:
+                if _placed_stamp(target.stat()) == placed.stamp:
+                    return "kept"
+            except FileNotFoundError:
+                pass
+
+        method = clone_file(source, target, read_only=read_only)
+        if method != "hardlink":
+            # A write by the job then always moves the modification time away from the one placed
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self._files[target.name] = _PlacedFile(key, _placed_stamp(target.stat()))
+        return method
+
+    def drop_unused(self) -> None:
+        """Removes the kept files not placed since the last reset, e.g. the inputs of another source."""
+        for name in list(self._files):
+            if name not in self._used:
+                del self._files[name]
+                (self.path / name).unlink(missing_ok=True)
+
+    def reset(self) -> None:
+        """Removes the files created by the job, and the placed ones it changed or replaced."""
+        kept: Dict[str, _PlacedFile] = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                placed = self._files.get(entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                elif placed is not None and _placed_stamp(entry.stat(follow_symlinks=False)) == placed.stamp:
+                    kept[entry.name] = placed
+                else:
+                    os.unlink(entry.path)
+
+        self._files = kept
+        self._used = set()
+
+
 class Workspace:
     """A context manager for creating and managing temporary workspaces for dependency processing.
 
     Handles the creation of temporary directories, file copying, command execution,
     and cleanup for dependency management operations.
+
+    Workspaces are safe to use concurrently, from threads and processes alike: isolated ones only copy
+    the source files (under a shared lock of the source directory), while non-isolated ones operate on
+    the source directory in place and hold an exclusive lock of it until they exit.
+
+    The TOML files of the workspace are parsed once and the same in-memory documents are handed to every
+    processing stage (see `document`). Changes are kept in memory and only written back right before
+    an external command, which may read the files, is run.
     """
 
+    STREAM_LIMIT = 1024 * 1024
+    """Longest command output line to buffer, in bytes."""
+
     def __init__(
         self,
         source_path: Union[Path, str, None],
         no_isolation: bool = False,
         restore_backup: bool = True,
         extra_backup: Optional[List[BackupPath]] = None,
+        seed_lock: bool = False,
+        timeout: Optional[float] = None,
+        base_dir: Union[Path, str, None] = None,
+        directory: Optional[WorkspaceDirectory] = None,
     ):
         """
         Args:
@@ -56,13 +202,30 @@ class Workspace:
             no_isolation: Whether to disable the creation of a temp directory to operate in.
             restore_backup: Whether to restore the backup file after the exit.
             extra_backup: Additional files to silently backup from the same dir as source_path.
+            seed_lock: Whether to place an existing `uv.lock` from the same dir as source_path into
+                       the workspace, so that locking reuses its resolution as preferences. Default: False.
+            timeout: Seconds to wait for every command to finish, unless overridden per command.
+                     Default: None (wait indefinitely).
+            base_dir: Directory to create isolated workspaces in, e.g. a RAM-backed `/dev/shm`. Falls back
+                      to the system temporary directory if unusable. Default: `PIPZAP_WORKSPACE_DIR` if set.
+            directory: A reusable directory to use as the isolated workspace (e.g. one of a `WorkspacePool`),
+                       which keeps the clean input files on exit instead of being removed. Ignored in debug mode.
+                       Default: None (a new temporary directory).
         """
         self.source_path = Path(source_path) if source_path else None
         self._restore_backup = restore_backup
         self._no_isolation = no_isolation
+        self._seed_lock = seed_lock
+        self._timeout = timeout
+        self._base_dir = base_dir
+        self._directory = directory
+        self._reused: Optional[WorkspaceDirectory] = None
+        self._lock_seeded = False
         self._base: Optional[Path] = None
         self._path: Optional[Path] = None
         self._backup: Optional[BackupPath] = None
+        self._lock: Optional[DirectoryLock] = None
+        self._documents: Dict[Path, _Document] = {}
 
         if extra_backup and source_path is None:
             logger.warning("Extra backup files requested, but no source path is provided. Ignoring.")
@@ -93,6 +256,11 @@ class Workspace:
             raise RuntimeError("Unable to get Workspace.path: context not entered.")
         return self._path
 
+    @property
+    def lock_seeded(self) -> bool:
+        """Whether the workspace `uv.lock` was seeded from an existing one, and should be kept across re-locks."""
+        return self._lock_seeded
+
     @property
     def backup(self) -> Path:
         if not self._backup:
@@ -102,7 +270,7 @@ class Workspace:
     def __enter__(self) -> Self:
         """Enters the context, setting up the temporary workspace.
 
-        Creates a temporary directory (or uses a fixed location in debug mode),
+        Creates a temporary directory (or a kept one in debug mode),
         copies the source file if provided, and sets up the working path.
 
         Returns:
@@ -110,68 +278,123 @@ class Workspace:
 
         Notes:
             - In normal mode, creates a random temporary directory
-            - In debug mode, uses `./pipzap-temp` and ensures it's clean
+            - In debug mode, creates a unique `./pipzap-temp-*` directory, which is kept after the exit
         """
         if self._no_isolation and self.source_path:
             self._base = self.source_path.parent
 
-        elif not is_debug():
-            self._base = Path(tempfile.mkdtemp())
+        elif is_debug():
+            self._base = Path(tempfile.mkdtemp(prefix="pipzap-temp-", dir="."))
 
-        else:
-            self._base = Path("./pipzap-temp")
+        elif self._directory is not None:
+            self._base = self._directory.path
+            self._reused = self._directory
 
-            if self._base.exists():
-                shutil.rmtree(self._base)
-            self._base.mkdir(parents=True)
+        else:
+            self._base = workspace_directory(self._base_dir)
 
         logger.debug(f"Entered workspace: '{self._base}' from '{self.source_path}' ({self._no_isolation =})")
 
         if not self.source_path:
             logger.debug("No source path provided")
+            self._drop_unused()
             return self
 
-        self._path = self._base / self.source_path.name
+        # Isolated workspaces only need a consistent snapshot of the source directory
+        self._lock = DirectoryLock(self.source_path.parent)
+        self._lock.acquire(shared=not self._no_isolation)
+
+        try:
+            self._setup_files()
+        except BaseException:
+            self._lock.release()
+            raise
+
+        if not self._no_isolation:
+            self._lock.release()
+
+        self._drop_unused()
+        return self
+
+    def _setup_files(self) -> None:
+        """Backs up the source files and places the working copies into the workspace."""
+        assert self.source_path, "[internal assertion] Setting the files up requires a source path"
+        self._path = self.base / self.source_path.name
 
         backup_fname = self._format_backup(self.source_path)
         self._backup = BackupPath(backup_fname, keep=True, original_path=self.source_path)
-        self._backup.with_path(self._base)
+        self._backup.with_path(self.base)
 
-        logger.debug(f"Backing up (copying) '{self.source_path}' -> '{self._backup.path}'")
-        shutil.copyfile(self.source_path, self._backup.path)
+        # The source backup is read as the original project, a snapshot of a user file that may be edited in place
+        # meanwhile, so it is never hardlinked
+        method = self._place(self.source_path, self._backup.path)
+        logger.debug(f"Backing up ({method}) '{self.source_path}' -> '{self._backup.path}'")
 
         self._extra_backup_target = []
         for extra_backup in self._extra_backup_source:
             target_fname = self._format_backup(extra_backup.path)
+            if self.base / target_fname == self._backup.path:
+                # The source file itself, already backed up
+                continue
+
             target = BackupPath(target_fname, extra_backup.keep, original_path=extra_backup.path)
-            target.with_path(self._base)
+            target.with_path(self.base)
             self._extra_backup_target.append(target)
 
-            logger.debug(
-                f"Backing up ({'copying' if extra_backup.keep else 'moving'}) "
-                f"'{extra_backup.path}' -> '{target.path}'"
-            )
-            backup_op = shutil.copyfile if extra_backup.keep else shutil.move
-
             if extra_backup.keep and extra_backup.path == target.path:
                 continue
 
-            backup_op(str(extra_backup.path.absolute()), target.path)
+            # The user files are never moved out of place while an isolated run is in flight. Its backups are
+            # neither restored nor written to (e.g. the uv.lock one is only a seed source), so they share the data
+            if extra_backup.keep or not self._no_isolation:
+                method = self._place(
+                    extra_backup.path.absolute(), target.path, read_only=not self._no_isolation
+                )
+            else:
+                method = "moving"
+                shutil.move(str(extra_backup.path.absolute()), target.path)
+
+            logger.debug(f"Backing up ({method}) '{extra_backup.path}' -> '{target.path}'")
 
         if not self._no_isolation:
             # same path otherwise
-            logger.debug(f"Backing up (copying) the target file '{self.source_path}' -> '{self._path}'")
-            shutil.copyfile(self.source_path.resolve(), self._path)
+            method = self._place(self.source_path.resolve(), self._path)
+            logger.debug(f"Backing up ({method}) the target file '{self.source_path}' -> '{self._path}'")
 
-        return self
+        if self._seed_lock:
+            self._lock_seeded = self._place_seed_lock()
+
+    def _place(self, source: Path, target: Path, read_only: bool = False) -> str:
+        """Places a copy of an input file, reusing a clean one already in a reusable directory."""
+        if self._reused is not None:
+            return self._reused.place(source, target, read_only=read_only)
+
+        return clone_file(source, target, read_only=read_only)
+
+    def _drop_unused(self) -> None:
+        if self._reused is not None:
+            self._reused.drop_unused()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Exits the context, cleaning up the workspace.
 
-        Removes the temporary directory unless in debug mode.
+        Removes the temporary directory unless in debug mode. Only non-isolated workspaces restore
+        the backups, since isolated ones leave the source files in place.
         """
+        try:
+            self._cleanup()
+        finally:
+            if self._lock:
+                self._lock.release()
+
+        logger.debug(f"Exited workspace: {self.base}")
+
+    def _cleanup(self) -> None:
+        if is_debug():
+            # The debug directory is kept for inspection, so it should reflect the final state
+            self.flush()
 
-        if self._restore_backup:
+        if self._restore_backup and self._no_isolation:
             to_restore = []
             if self._backup:
                 to_restore.append(self._backup)
@@ -189,60 +412,221 @@ class Workspace:
                 shutil.move(str(backup.path.absolute()), backup.original_path)
 
         if self.base and not self._no_isolation and not is_debug():
-            logger.debug(f"Removing base: {self.base}")
-            shutil.rmtree(self.base)
+            if self._reused is not None:
+                logger.debug(f"Resetting base: {self.base}")
+                self._reused.reset()
+            else:
+                logger.debug(f"Removing base: {self.base}")
+                shutil.rmtree(self.base)
 
-        logger.debug(f"Exited workspace: {self.base}")
+    def document(self, name: str = "pyproject.toml") -> Dict[str, Any]:
+        """Parses a TOML file of the workspace, or hands out the already parsed document.
+
+        The file is only parsed again if it has changed on disk since (e.g. was rewritten by a command).
 
-    def run(self, cmd: List[str], marker: str, log_filter: Callable[[str], bool] = lambda l: True) -> str:
+        Args:
+            name: Name of the file in the workspace base. Default: "pyproject.toml".
+
+        Returns:
+            The format-preserving document, shared by all callers. Changes to it are to be
+            registered with `update_document`.
+        """
+        path = self.base / name
+        document = self._documents.get(path)
+        if document is not None and (document.dirty or document.stamp == _stamp(path)):
+            return document.data
+
+        stamp = _stamp(path)
+        data = read_toml(path)
+        self._documents[path] = _Document(data, stamp)
+        return data
+
+    def update_document(self, data: Dict[str, Any], name: str = "pyproject.toml") -> None:
+        """Sets the contents of a TOML file of the workspace, deferring the write until it is needed (see `flush`).
+
+        Args:
+            data: The new (or the modified) document.
+            name: Name of the file in the workspace base. Default: "pyproject.toml".
+        """
+        path = self.base / name
+        document = self._documents.get(path)
+        self._documents[path] = _Document(data, document.stamp if document else None, dirty=True)
+
+    def flush(self) -> None:
+        """Writes the documents changed in memory back to their files."""
+        for path, document in self._documents.items():
+            if not document.dirty:
+                continue
+
+            logger.debug(f"Writing '{path}'")
+            write_toml(document.data, path)
+            document.stamp = _stamp(path)
+            document.dirty = False
+
+    def run(
+        self,
+        cmd: List[str],
+        marker: str,
+        log_filter: Callable[[str], bool] = lambda l: True,
+        timeout: Optional[float] = None,
+    ) -> str:
         """Executes the specified (shell) command in the workspace directory and captures its output.
 
+        A synchronous facade of `run_async`. Inside a running event loop (e.g. a Jupyter notebook),
+        the command is run on a loop of its own in a worker thread, blocking the caller until it finishes.
+
         Args:
             cmd: List of command arguments to execute
             marker: A string identifier for the command (used in error messages).
             log_filter: A callable determining whether the log level inference should happen for a given line.
+            timeout: Seconds to wait for the command to finish. Default: the workspace timeout.
 
         Raises:
-            ResolutionError: If the command fails to execute successfully
+            ResolutionError: If the command fails to execute successfully, times out
+                             or writes an output line longer than `STREAM_LIMIT`
+
+        Returns:
+            stdout string of the command.
+        """
+        coroutine = self.run_async(cmd, marker, log_filter, timeout)
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # `asyncio.run` refuses to nest in a running loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    async def run_async(
+        self,
+        cmd: List[str],
+        marker: str,
+        log_filter: Callable[[str], bool] = lambda l: True,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Executes the specified (shell) command in the workspace directory and captures its output.
+
+        The changed documents are written to disk beforehand, so that the command sees them.
+        Several commands may be awaited at once (e.g. with `asyncio.gather`), and cancelling the
+        awaiting task kills the command.
+
+        Args:
+            cmd: List of command arguments to execute
+            marker: A string identifier for the command (used in error messages).
+            log_filter: A callable determining whether the log level inference should happen for a given line.
+            timeout: Seconds to wait for the command to finish. Default: the workspace timeout.
+
+        Raises:
+            ResolutionError: If the command fails to execute successfully, times out
+                             or writes an output line longer than `STREAM_LIMIT`
 
         Returns:
             stdout string of the command.
 
         Notes:
-            - Command output is logged at debug level
+            - stderr is logged line by line while the command runs, at debug level unless it reports
+              a warning or an error
             - stderr is captured and included in any error messages
         """
+        self.flush()
+        timeout = timeout if timeout is not None else self._timeout
+
+        logger.debug(f"Running: {' '.join(cmd)}")
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.base,
+            limit=self.STREAM_LIMIT,
+        )
+        assert process.stdout and process.stderr, "[internal assertion] Pipes must be open"
+        stderr: List[str] = []
+
         try:
-            inner_logger = logger.opt(depth=1)
+            stdout, _ = await asyncio.wait_for(
+                asyncio.gather(
+                    process.stdout.read(), self._log_stream(process.stderr, cmd, log_filter, stderr)
+                ),
+                timeout,
+            )
+            returncode = await process.wait()
 
-            logger.debug(f"Running: {' '.join(cmd)}")
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True, cwd=(self.base))
-            for line in str(result.stderr).splitlines():
-                line = line.strip()
+        except asyncio.TimeoutError as e:
+            raise ResolutionError(f"Timed out executing {marker} after {timeout} seconds") from e
 
-                if not line:
-                    continue
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            raise ResolutionError(
+                f"Failed to execute {marker}: an output line exceeds {self.STREAM_LIMIT} bytes"
+            ) from e
 
-                log_level = inner_logger.debug
-                tokens = set(re.split(r"\W+", line.lower()))
-                padding = " " * 7
+        finally:
+            # Timed out or cancelled
+            if process.returncode is None:
+                logger.debug(f"Killing: {' '.join(cmd)}")
+                process.kill()
+                await process.wait()
 
-                if log_filter(line):
-                    if tokens & {"warning", "warn"}:
-                        log_level = inner_logger.warning
+        if returncode != 0:
+            raise ResolutionError(f"Failed to execute {marker}:\n{''.join(stderr)}")
 
-                    if tokens & {"error"}:
-                        log_level = inner_logger.error
+        return stdout.decode(errors="replace")
 
-                    if log_level != inner_logger.debug:
-                        padding = f"[{cmd[0][: len(padding)]}]".rjust(len(padding))
+    @staticmethod
+    async def _log_stream(
+        stream: asyncio.StreamReader, cmd: List[str], log_filter: Callable[[str], bool], lines: List[str]
+    ) -> None:
+        """Logs the lines of a command output stream as they arrive, collecting them into `lines`."""
+        padding = " " * 7
+        prefix = f"[{cmd[0][: len(padding)]}]".rjust(len(padding))
+
+        async for raw in stream:
+            lines.append(raw.decode(errors="replace"))
+            line = lines[-1].strip()
+
+            if not line:
+                continue
+
+            log_level = logger.debug
+            if log_filter(line):
+                tokens = set(re.split(r"\W+", line.lower()))
+                if tokens & {"error"}:
+                    log_level = logger.error
+                elif tokens & {"warning", "warn"}:
+                    log_level = logger.warning
 
-                log_level(f"{padding} >>> {line}", depth=1)
+            log_level(f"{prefix if log_level != logger.debug else padding} >>> {line}")
 
-            return result.stdout
+    def _place_seed_lock(self) -> bool:
+        """Copies the existing sibling `uv.lock` (or its backup, if it was moved away) into the workspace.
 
-        except subprocess.CalledProcessError as e:
-            raise ResolutionError(f"Failed to execute {marker}:\n{e.stderr}") from e
+        Returns:
+            Whether a seed lock is in place.
+        """
+        assert self.source_path, "[internal assertion] Seeding requires a source path"
+        target = self.base / "uv.lock"
+
+        candidates = [
+            *(
+                backup.path
+                for backup in self._extra_backup_target
+                if backup.original_path and backup.original_path.name == "uv.lock"
+            ),
+            self.source_path.parent / "uv.lock",
+        ]
+        seed = next((path for path in candidates if path.is_file()), None)
+
+        if seed is None:
+            logger.debug("No existing uv.lock to seed the workspace with")
+            return False
+
+        # uv rewrites the workspace lock in place, which would write through a hardlink to the seed
+        if seed.resolve() != target.resolve():
+            method = self._place(seed, target)
+            logger.debug(f"Seeding the workspace lock ({method}) '{seed}' -> '{target}'")
+
+        return True
 
     @staticmethod
     def _format_backup(file: Path) -> str:
@@ -1,5 +1,17 @@
+from .cache import cache_dir
 from .debug import is_debug
-from .io import read_toml, write_toml
-from .requirement_string import parse_requirement_string
+from .io import hash_file, loads_toml, read_toml, write_toml
+from .names import canonical_name
+from .requirement_string import ParsedRequirement, parse_requirement_string
 
-__all__ = ["read_toml", "write_toml", "parse_requirement_string", "is_debug"]
+__all__ = [
+    "read_toml",
+    "loads_toml",
+    "write_toml",
+    "hash_file",
+    "canonical_name",
+    "parse_requirement_string",
+    "ParsedRequirement",
+    "is_debug",
+    "cache_dir",
+]
@@ -0,0 +1,55 @@
+import os
+import threading
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """Directory for the state pipzap persists across runs.
+
+    `PIPZAP_CACHE_DIR` if set, otherwise `pipzap` under `XDG_CACHE_HOME` (`~/.cache` by default).
+    """
+    override = os.environ.get("PIPZAP_CACHE_DIR")
+    if override:
+        return Path(override)
+
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "pipzap"
+
+
+def temp_path(path: Path) -> Path:
+    """Temporary file to write an entry to before atomically moving it in place, unique to the writing thread."""
+    return path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def evict_lru(directory: Path, max_bytes: int) -> None:
+    """Deletes the least recently used files of a cache directory until it fits into `max_bytes`.
+
+    Recency is the modification time, which cache readers refresh on every hit. Temporary files
+    of writers still in progress are left alone, and files removed concurrently are skipped.
+
+    Args:
+        directory: The cache directory.
+        max_bytes: Total size the directory may take.
+    """
+    entries = []
+    for path in directory.iterdir():
+        if path.suffix == ".tmp":
+            continue
+
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        total -= size
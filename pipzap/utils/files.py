@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+# `_IOW(0x94, 9, int)` from linux/fs.h
+_FICLONE = 0x40049409
+
+
+def clone_file(source: Union[Path, str], target: Union[Path, str], read_only: bool = False) -> str:
+    """Places a copy of a file, as cheaply as the filesystem allows.
+
+    A copy-on-write reflink (btrfs, XFS, ...) is tried first, then a hardlink if the copy is read-only,
+    with a regular copy as the fallback (e.g. across filesystems).
+
+    Args:
+        source: The file to copy.
+        target: Path of the copy, replaced if it exists. An existing file is unlinked rather than written
+                to, so any other links to its data are left untouched.
+        read_only: Whether neither of the files is ever written to in place while the copy exists, which allows
+                   sharing the data through a hardlink. Default: False.
+
+    Raises:
+        shutil.SameFileError: If the source and the target are the same path.
+
+    Returns:
+        The method used: "reflink", "hardlink" or "copy".
+    """
+    if Path(source).resolve() == Path(target).resolve():
+        raise shutil.SameFileError(f"'{source}' and '{target}' are the same file")
+
+    try:
+        Path(target).unlink()
+    except FileNotFoundError:
+        pass
+
+    if _reflink(source, target):
+        return "reflink"
+
+    if read_only:
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError:
+            pass
+
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+def _reflink(source: Union[Path, str], target: Union[Path, str]) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+
+    try:
+        # Exclusive creation, the target is never truncated in place
+        with open(source, "rb") as src, open(target, "xb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        pass
+
+    try:
+        Path(target).unlink()
+    except OSError:
+        pass
+    return False
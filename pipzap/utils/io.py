@@ -1,13 +1,46 @@
+import hashlib
+import sys
 from pathlib import Path
 from typing import Any, Dict, Union
+
 import tomlkit
 
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+def read_toml(path: Union[Path, str], roundtrip: bool = True) -> Dict[str, Any]:
+    """Reads a TOML file.
+
+    Args:
+        path: Path to the TOML file.
+        roundtrip: Whether the document is to be modified and written back, so its formatting has to be
+                   preserved (tomlkit). Read-only data (e.g. uv.lock) is parsed several times faster into
+                   plain dicts instead (tomllib, or tomli before Python 3.11). Default: True.
+
+    Returns:
+        The parsed document.
+    """
+    if not roundtrip:
+        with Path(path).open("rb") as f:
+            return tomllib.load(f)
 
-def read_toml(path: Union[Path, str]) -> Dict[str, Any]:
     with Path(path).open("r") as f:
         return tomlkit.load(f)
 
 
+def loads_toml(text: str, roundtrip: bool = True) -> Dict[str, Any]:
+    """Same as `read_toml`, parsing a TOML string."""
+    return tomllib.loads(text) if not roundtrip else tomlkit.parse(text)
+
+
 def write_toml(data: Dict[str, Any], path: Union[Path, str]) -> None:
     with Path(path).open("w") as f:
         return tomlkit.dump(data, f)
+
+
+def hash_file(path: Union[Path, str]) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class DirectoryLock:
+    """An advisory (`flock`) lock on a directory, held by many readers or a single writer.
+
+    The directory itself is locked, so no lock file is left behind. Every instance opens its own
+    descriptor, which makes the lock exclusive between threads of a process as well as between processes.
+    Where `flock` is unavailable (Windows), locking is a no-op.
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        """
+        Args:
+            path: The directory to lock.
+        """
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    def acquire(self, shared: bool = False) -> None:
+        """Blocks until the lock is acquired.
+
+        Args:
+            shared: Whether to take a shared (reader) lock instead of an exclusive one. Default: False.
+        """
+        if fcntl is None or self._fd is not None:
+            return
+
+        fd = os.open(self.path, os.O_RDONLY)
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+
+        try:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info(f"Waiting for another pipzap run in '{self.path}' to finish")
+                fcntl.flock(fd, operation)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        self._fd = fd
+        logger.debug(f"Locked '{self.path}' ({'shared' if shared else 'exclusive'})")
+
+    def release(self) -> None:
+        """Releases the lock, if held."""
+        if self._fd is None:
+            return
+
+        # Closing the descriptor releases the lock
+        os.close(self._fd)
+        self._fd = None
+        logger.debug(f"Unlocked '{self.path}'")
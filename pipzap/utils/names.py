@@ -0,0 +1,23 @@
+import sys
+from functools import lru_cache
+
+from packaging.utils import canonicalize_name
+
+CACHE_SIZE = 16384
+"""Number of distinct package name spellings whose canonical form is kept for the whole process."""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonical_name(name: str) -> str:
+    """PEP 503 normalized form of a package name (lowercase, runs of `-`, `_` and `.` collapsed into `-`).
+
+    Recently seen spellings are normalized once, and all of them map to the same interned string, so comparing
+    canonical names (including as dict and set keys) mostly boils down to an identity check.
+
+    Args:
+        name: Package name as written anywhere (pyproject.toml, uv.lock, `--keep`, ...).
+
+    Returns:
+        The interned canonical name.
+    """
+    return sys.intern(str(canonicalize_name(name)))
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, List, Mapping, Optional
 
 if TYPE_CHECKING:
     from pipzap.core.dependencies import Dependency, DepKeyT, ProjectDependencies
@@ -16,6 +16,24 @@ def format_project_dependencies(deps: "ProjectDependencies") -> str:
     return "\n".join(parts)
 
 
+def format_size(size: float) -> str:
+    """Formats a size in bytes with a binary unit (e.g., "1.5 MiB")."""
+    if size < 1024:
+        return f"{size:.0f} B"
+
+    for unit in ["KiB", "MiB"]:
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+
+    return f"{size / 1024:.1f} GiB"
+
+
+def pluralize(count: int, noun: str) -> str:
+    """Formats a count of a noun (e.g., "1 package", "3 packages")."""
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
 def remove_prefix(text, prefix, num_iters=1):
     """Compat re-implementation of python 3.9+ `str.removeprefix`.
 
@@ -75,7 +93,7 @@ def _get_dep_attributes(dep: "Dependency") -> str:
     return f" [{', '.join(attributes)}]"
 
 
-def _get_graph_lines(graph: Dict["DepKeyT", List["DepKeyT"]]) -> List[str]:
+def _get_graph_lines(graph: Mapping["DepKeyT", List["DepKeyT"]]) -> List[str]:
     if not graph:
         return [f"{INDENT}(none)"]
 
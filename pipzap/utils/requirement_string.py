@@ -1,11 +1,41 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, Optional
+
 from packaging.requirements import InvalidRequirement, Requirement
 
 from pipzap.exceptions import ParsingError
 
+CACHE_SIZE = 8192
+"""Number of distinct requirement strings whose parsed form is kept for the whole process."""
+
+
+@dataclass(frozen=True)
+class ParsedRequirement:
+    """An immutable parsed PEP 508 requirement, shared by every caller parsing the same string."""
+
+    name: str
+    """Package name, as written."""
+
+    extras: FrozenSet[str]
+    """Requested extras."""
+
+    specifier: str
+    """Version specifier set (e.g., ">=2.0,<3"), empty if unconstrained."""
 
-def parse_requirement_string(requirement_string: str) -> Requirement:
-    """Attempts to parse a PEP 508 requirement string into a packaging object,
-    wrapping the exceptions.
+    url: Optional[str]
+    """Direct reference URL, if any."""
+
+    marker: Optional[str]
+    """Environment marker (e.g., 'python_version >= "3.8"'), if any."""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_requirement_string(requirement_string: str) -> ParsedRequirement:
+    """Attempts to parse a PEP 508 requirement string, wrapping the exceptions.
+
+    Parsed requirements are memoized process-wide (bounded LRU), so the parser, the formatters and the converter
+    parse every unique string once per run. `parse_requirement_string.cache_info()` reports the hits and misses.
 
     Args:
         requirement_string: PEP 508 requirement string to parse. May include markers.
@@ -14,13 +44,21 @@ def parse_requirement_string(requirement_string: str) -> Requirement:
         ParsingError: If a malformed (or otherwise invalid) requirement is provided.
 
     Returns:
-        A parsed `Requirement` object.
+        A parsed, immutable requirement.
     """
     try:
-        return Requirement(requirement_string)
+        requirement = Requirement(requirement_string)
 
     except InvalidRequirement as e:
         raise ParsingError(f"Malformed dependency '{requirement_string}': {e}") from e
 
     except Exception as e:
         raise ParsingError(f"Unable to parse dependency '{requirement_string}': {e}") from e
+
+    return ParsedRequirement(
+        name=requirement.name,
+        extras=frozenset(requirement.extras),
+        specifier=str(requirement.specifier),
+        url=requirement.url,
+        marker=str(requirement.marker) if requirement.marker else None,
+    )
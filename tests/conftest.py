@@ -1,12 +1,19 @@
+import random
 from argparse import Namespace
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Set
 
 import pytest
 
 from pipzap.utils.io import write_toml
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    """Keeps the state pipzap persists across runs out of the user's cache directory."""
+    monkeypatch.setenv("PIPZAP_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
+
+
 @pytest.fixture
 def dummy_pyproject_dict() -> dict:
     """Generates a dummy uv-based pyproject.toml content."""
@@ -42,6 +49,28 @@ def make_pyproject(tmp_path: Path):
     return _make_pyproject
 
 
+@pytest.fixture
+def locked_project(request, make_pyproject, dummy_pyproject_dict) -> Path:
+    """A uv project depending on lightning and requests, with a pre-resolved uv.lock next to it.
+
+    The lock is the `LOCK` of the test module, either TOML text or a document, and the module may declare
+    the `DEPENDENCY_GROUPS` of the project as well.
+    """
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["lightning", "requests"]
+    groups = getattr(request.module, "DEPENDENCY_GROUPS", None)
+    if groups:
+        content["dependency-groups"] = groups
+
+    file = make_pyproject(content)
+    lock = request.module.LOCK
+    if isinstance(lock, str):
+        (file.parent / "uv.lock").write_text(lock)
+    else:
+        write_toml(lock, file.parent / "uv.lock")
+    return file
+
+
 @pytest.fixture
 def dummy_requirements_txt(tmp_path: Path) -> Path:
     """Provides a dummy requirements.txt file."""
@@ -67,7 +96,52 @@ def cli_args():
             "discover": kwargs.get("discover", False),
             "keep": kwargs.get("keep", None),
             "preserve_all": kwargs.get("preserve_all", False),
+            "warm_lock": kwargs.get("warm_lock", False),
+            "cross_group": kwargs.get("cross_group", False),
+            "aggressive": kwargs.get("aggressive", False),
+            "target_python": kwargs.get("target_python", None),
+            "target_platform": kwargs.get("target_platform", None),
+            "no_cache": kwargs.get("no_cache", False),
+            "timeout": kwargs.get("timeout", None),
+            "workspace_dir": kwargs.get("workspace_dir", None),
         }
         return Namespace(**defaults)
 
     return _cli_args
+
+
+@pytest.fixture(params=range(10))
+def rng(request) -> random.Random:
+    """A seeded random generator, running the test once per seed."""
+    return random.Random(request.param)
+
+
+@pytest.fixture
+def random_graph(rng: random.Random):
+    """Factory fixture to create random, possibly cyclic, dependency graphs of package names."""
+
+    def _random_graph(
+        num_nodes: Optional[int] = None, edge_prob: Optional[float] = None
+    ) -> Dict[str, List[str]]:
+        names = [f"pkg{i}" for i in range(num_nodes or rng.randint(1, 40))]
+        edge_prob = edge_prob or rng.choice([0.02, 0.05, 0.1, 0.2])
+        return {name: [other for other in names if rng.random() < edge_prob] for name in names}
+
+    return _random_graph
+
+
+@pytest.fixture
+def closure():
+    """Reference reachability check: everything a plain DFS reaches from the roots, the roots included."""
+
+    def _closure(graph: Mapping[Hashable, Iterable[Hashable]], roots: Iterable[Hashable]) -> Set[Hashable]:
+        seen = set(roots)
+        stack = list(seen)
+        while stack:
+            for child in graph.get(stack.pop(), []):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen
+
+    return _closure
@@ -1,11 +1,22 @@
+import os
+import pickle
+from dataclasses import FrozenInstanceError, replace
+
 import pytest
 
+from pipzap.core.dependencies import Dependency
+from pipzap.core.environments import environment_matrix
+from pipzap.core.pruner import DependencyPruner
 from pipzap.core.source_format import SourceFormat
 from pipzap.exceptions import ParsingError, ResolutionError
+from pipzap.formatting.uv import UVFormatter
 from pipzap.parsing.converter import ProjectConverter
+from pipzap.parsing.graph_cache import GraphCache, LockGraph
 from pipzap.parsing.parser import DependenciesParser
 from pipzap.parsing.workspace import Workspace
-from pipzap.utils.requirement_string import parse_requirement_string
+from pipzap.utils.io import write_toml
+from pipzap.utils.names import canonical_name
+from pipzap.utils.requirement_string import ParsedRequirement, parse_requirement_string
 
 
 def test_malformed_dependency_strings(make_pyproject, dummy_pyproject_dict):
@@ -26,6 +37,20 @@ def test_malformed_dependency_strings(make_pyproject, dummy_pyproject_dict):
             parse_requirement_string(dep)
 
 
+def test_requirement_string_memo():
+    """Tests that every unique requirement string is parsed once, into a shared immutable result."""
+    parse_requirement_string.cache_clear()
+    requirement = "Torch[cuda]>=2.0; sys_platform == 'linux'"
+
+    parsed = parse_requirement_string(requirement)
+    assert parse_requirement_string(requirement) is parsed
+    assert parse_requirement_string.cache_info()[:2] == (1, 1)
+
+    assert parsed == ParsedRequirement("Torch", frozenset({"cuda"}), ">=2.0", None, 'sys_platform == "linux"')
+    with pytest.raises(FrozenInstanceError):
+        parsed.name = "numpy"  # type: ignore[misc]
+
+
 def test_empty_missing_dependency_sections(make_pyproject, dummy_pyproject_dict):
     """Tests parsing a pyproject.toml with an empty dependencies list and no optional sections."""
     content = dummy_pyproject_dict
@@ -65,3 +90,317 @@ def test_dependency_strings_split_across_lines(make_pyproject, dummy_pyproject_d
 
         with pytest.raises(ParsingError, match="Malformed dependency"):
             DependenciesParser.parse(ws, SourceFormat.UV)
+
+
+def test_lock_graph_parsing(make_pyproject, dummy_pyproject_dict):
+    """Tests building the dependency graph from a pre-resolved uv.lock."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["requests>=2.28.1"]
+    content["dependency-groups"] = {"dev": ["urllib3"]}
+    lock = {
+        "version": 1,
+        "package": [
+            {
+                "name": "requests",
+                "version": "2.32.3",
+                "dependencies": [{"name": "urllib3"}, {"name": "idna"}],
+            },
+            {"name": "urllib3", "version": "2.3.0"},
+            {"name": "idna", "version": "3.10"},
+        ],
+    }
+
+    file = make_pyproject(content)
+    with Workspace(file) as ws:
+        write_toml(lock, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+
+    empty = frozenset()
+    assert parsed.graph[("requests", empty, empty)] == [("urllib3", empty, empty), ("idna", empty, empty)]
+    assert parsed.graph[("urllib3", frozenset({"dev"}), empty)] == []
+    assert {dep.name: dep.pinned_version for dep in parsed.direct} == {
+        "requests": "2.32.3",
+        "urllib3": "2.3.0",
+    }
+
+
+def test_lock_graph_name_spellings(make_pyproject, dummy_pyproject_dict):
+    """Tests that names spelled differently in the pyproject and the uv.lock refer to the same package."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["Typing_Extensions", "ruamel.yaml", "Ruamel.Yaml.Clib"]
+    lock = {
+        "version": 1,
+        "package": [
+            {"name": "typing-extensions", "version": "4.12.2"},
+            {"name": "ruamel-yaml", "version": "0.18.6", "dependencies": [{"name": "ruamel.yaml.clib"}]},
+            {"name": "ruamel-yaml-clib", "version": "0.2.12"},
+        ],
+    }
+
+    file = make_pyproject(content)
+    with Workspace(file) as ws:
+        write_toml(lock, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+
+    empty = frozenset()
+    assert parsed.graph[("ruamel-yaml", empty, empty)] == [("ruamel-yaml-clib", empty, empty)]
+    assert {dep.name: dep.pinned_version for dep in parsed.direct} == {
+        "Typing_Extensions": "4.12.2",
+        "ruamel.yaml": "0.18.6",
+        "Ruamel.Yaml.Clib": "0.2.12",
+    }
+    assert parsed.direct[0].canonical is canonical_name("typing.extensions")
+
+    assert [dep.name for dep in DependencyPruner.prune(parsed).direct] == ["Typing_Extensions", "ruamel.yaml"]
+    pruned = DependencyPruner.prune(parsed, keep=["ruamel_yaml_clib"])
+    assert [dep.name for dep in pruned.direct] == ["Typing_Extensions", "ruamel.yaml", "Ruamel.Yaml.Clib"]
+
+
+def test_lock_graph_extras(make_pyproject, dummy_pyproject_dict):
+    """Tests that extras requested in uv.lock activate the optional dependencies of the package."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["lightning[pytorch]", "torch", "nvidia-cublas", "rich"]
+    lock = {
+        "version": 1,
+        "package": [
+            {
+                "name": "lightning",
+                "version": "2.5.0",
+                "dependencies": [{"name": "packaging"}],
+                "optional-dependencies": {"pytorch": [{"name": "torch", "extra": ["cuda"]}]},
+            },
+            {
+                "name": "torch",
+                "version": "2.6.0",
+                "optional-dependencies": {
+                    "cuda": [{"name": "nvidia-cublas", "marker": "sys_platform == 'linux'"}]
+                },
+            },
+            {"name": "nvidia-cublas", "version": "12.4.5"},
+            {"name": "packaging", "version": "24.2"},
+            {"name": "rich", "version": "13.9.4"},
+        ],
+    }
+
+    file = make_pyproject(content)
+    with Workspace(file) as ws:
+        write_toml(lock, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+
+    empty = frozenset()
+    assert parsed.graph[("lightning[pytorch]", empty, empty)] == [
+        ("torch", empty, empty),
+        ("torch[cuda]", empty, empty),
+    ]
+    assert parsed.graph[("torch[cuda]", empty, empty)] == [("nvidia-cublas", empty, empty)]
+
+    # Extra edges pull torch in, but the extra's marker still protects nvidia-cublas without targets
+    pruned = DependencyPruner.prune(parsed)
+    assert [dep.name for dep in pruned.direct] == ["lightning", "nvidia-cublas", "rich"]
+
+    environments = environment_matrix(["3.12"], ["linux"])
+    pruned = DependencyPruner.prune(parsed, environments=environments)
+    assert [dep.name for dep in pruned.direct] == ["lightning", "rich"]
+
+
+def test_lock_graph_forks(make_pyproject, dummy_pyproject_dict):
+    """Tests that every version of a forked package is a node of its own, under the markers of its fork."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["app", "six"]
+    old, new = "python_full_version < '3.12'", "python_full_version >= '3.12'"
+    lock = {
+        "version": 1,
+        "package": [
+            {
+                "name": "app",
+                "version": "1.0",
+                "dependencies": [
+                    {"name": "legacy", "version": "1.0", "marker": old},
+                    {"name": "legacy", "version": "2.0", "marker": new},
+                ],
+            },
+            {
+                "name": "legacy",
+                "version": "1.0",
+                "resolution-markers": [old],
+                "dependencies": [{"name": "six"}],
+            },
+            {"name": "legacy", "version": "2.0", "resolution-markers": [new]},
+            {"name": "six", "version": "1.17.0"},
+        ],
+    }
+
+    file = make_pyproject(content)
+    with Workspace(file) as ws:
+        write_toml(lock, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+
+    empty = frozenset()
+    versions = [("legacy@1.0", empty, empty), ("legacy@2.0", empty, empty)]
+    assert parsed.graph[("app", empty, empty)] == versions
+    assert parsed.graph[("legacy", empty, empty)] == versions
+    assert parsed.graph[("legacy@1.0", empty, empty)] == [("six", empty, empty)]
+    assert parsed.graph[("legacy@2.0", empty, empty)] == []
+
+    # Only the older fork pulls six in
+    pruned = DependencyPruner.prune(parsed, environments=environment_matrix(["3.11"], ["linux"]))
+    assert [dep.name for dep in pruned.direct] == ["app"]
+
+    pruned = DependencyPruner.prune(parsed, environments=environment_matrix(["3.11", "3.12"], ["linux"]))
+    assert [dep.name for dep in pruned.direct] == ["app", "six"]
+
+
+def test_dependency_records():
+    """Tests that dependency records are immutable, slotted and share their interned values."""
+    dep = Dependency(name="Torch", groups={"dev"}, marker="".join(["python_version", " >= '3.9'"]))
+    other = Dependency(name="numpy", groups=frozenset({"dev"}), marker="python_version >= '3.9'")
+
+    assert dep.key == ("torch", frozenset({"dev"}), frozenset())
+    assert dep.key is dep.key
+    assert dep.groups is other.groups and dep.marker is other.marker
+    assert not hasattr(dep, "__dict__")
+    assert Dependency(name="six").groups is Dependency(name="pip").extras
+
+    with pytest.raises(FrozenInstanceError):
+        dep.pinned_version = "2.0"  # type: ignore[misc]
+
+    pinned = replace(dep, pinned_version="2.0")
+    assert (pinned.pinned_version, pinned.key) == ("2.0", dep.key)
+    assert pickle.loads(pickle.dumps(pinned)) == pinned
+    assert pickle.loads(pickle.dumps(pinned)).key == dep.key
+
+
+def test_include_group_expansion(make_pyproject, dummy_pyproject_dict):
+    """Tests that included groups are expanded, and that pruning and formatting see their dependencies."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["requests"]
+    content["dependency-groups"] = {
+        "test": ["pytest", "pytest-cov"],
+        "lint": ["ruff"],
+        "dev": [{"include-group": "test"}, {"include-group": "Lint"}, "mypy"],
+        "all": [{"include-group": "dev"}, {"include-group": "test"}],
+    }
+    lock = {
+        "version": 1,
+        "package": [
+            {"name": "requests", "version": "2.32.3", "dependencies": [{"name": "urllib3"}]},
+            {"name": "pytest", "version": "8.3.4"},
+            {"name": "pytest-cov", "version": "6.0.0", "dependencies": [{"name": "pytest"}]},
+            {"name": "ruff", "version": "0.9.6"},
+            {"name": "mypy", "version": "1.15.0"},
+            {"name": "urllib3", "version": "2.3.0"},
+        ],
+    }
+
+    file = make_pyproject(content)
+    with Workspace(file) as ws:
+        write_toml(lock, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+        pruned = replace(parsed, direct=[dep for dep in parsed.direct if dep.name not in ("pytest", "mypy")])
+        output = UVFormatter(ws, pruned).format()
+
+    groups = {dep.name: dep.groups for dep in parsed.direct if dep.groups}
+    assert groups == {
+        "pytest": {"test", "dev", "all"},
+        "pytest-cov": {"test", "dev", "all"},
+        "ruff": {"lint", "dev", "all"},
+        "mypy": {"dev", "all"},
+    }
+
+    assert '"pytest-cov"' in output and '"pytest",' not in output and '"mypy"' not in output
+    assert 'include-group = "test"' in output
+
+
+@pytest.mark.parametrize(
+    "groups, match",
+    [
+        (
+            {"a": [{"include-group": "b"}], "b": [{"include-group": "c"}], "c": [{"include-group": "a"}]},
+            "a -> b -> c -> a",
+        ),
+        ({"a": [{"include-group": "missing"}]}, "unknown group 'missing'"),
+    ],
+)
+def test_include_group_errors(groups, match):
+    """Tests that include-group cycles and unknown groups are reported."""
+    with pytest.raises(ParsingError, match=match):
+        DependenciesParser._group_memberships(groups)
+
+
+def test_graph_cache(make_pyproject, dummy_pyproject_dict, tmp_path, monkeypatch):
+    """Tests that a cached lock graph is reused without parsing uv.lock, and keyed by the lock and direct deps."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["requests"]
+    lock = {
+        "version": 1,
+        "package": [
+            {
+                "name": "requests",
+                "version": "2.32.3",
+                "dependencies": [
+                    {"name": "urllib3"},
+                    {"name": "pysocks", "marker": "sys_platform == 'win32'"},
+                ],
+            },
+            {"name": "urllib3", "version": "2.3.0"},
+            {"name": "pysocks", "version": "1.7.1"},
+        ],
+    }
+    file = make_pyproject(content)
+    write_toml(lock, file.parent / "uv.lock")
+    cache = GraphCache(tmp_path / "graphs")
+
+    parsed = DependenciesParser.parse_locked(file, cache)
+    assert len(list(cache.directory.iterdir())) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("uv.lock parsed on a cache hit")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(DependenciesParser, "_build_dependency_graph", fail)
+        cached = DependenciesParser.parse_locked(file, cache)
+
+    assert dict(cached.graph) == dict(parsed.graph)
+    assert cached.graph.markers == parsed.graph.markers
+    assert cached.direct == parsed.direct
+
+    # Other direct dependencies are a miss, and so is a corrupt entry
+    content["project"]["dependencies"] = ["requests", "urllib3"]
+    make_pyproject(content)
+    assert [dep.name for dep in DependenciesParser.parse_locked(file, cache).direct] == [
+        "requests",
+        "urllib3",
+    ]
+    assert len(list(cache.directory.iterdir())) == 2
+
+    for entry in cache.directory.iterdir():
+        entry.write_bytes(b"garbage")
+    assert DependenciesParser.parse_locked(file, cache).direct[1].pinned_version == "2.3.0"
+
+
+def test_graph_cache_eviction(tmp_path):
+    """Tests that the least recently used entries are evicted once the cache outgrows its bound."""
+    parsed = DependenciesParser._build_dependency_graph(
+        {"package": [{"name": "a", "version": "1", "dependencies": [{"name": "b"}]}]}, []
+    )[0]
+    cache = GraphCache(tmp_path / "graphs")
+    entry = LockGraph(parsed, {}, {"a": "1"})
+
+    for index, lock_hash in enumerate(["first", "second", "third"]):
+        cache.store(lock_hash, [], entry)
+        os.utime(cache._path(lock_hash, []), (index, index))
+
+    # A hit makes an entry the most recently used one
+    assert cache.load("first", []) is not None
+    size = cache._path("first", []).stat().st_size
+    cache.max_bytes = 2 * size
+    cache.store("fourth", [], entry)
+
+    assert [
+        cache.load(lock_hash, []) is not None for lock_hash in ["first", "second", "third", "fourth"]
+    ] == [
+        True,
+        False,
+        False,
+        True,
+    ]
@@ -0,0 +1,286 @@
+import pytest
+
+from pipzap.analysis import FootprintReport, SourceBuildReport
+from pipzap.analysis.builds import SourceBuild
+from pipzap.analysis.footprint import PackageFootprint, select_artifacts, select_wheel
+from pipzap.cli import PipZapCLI
+from pipzap.core.environments import TargetEnvironment, environment_matrix
+from pipzap.parsing.lock_stream import LockedArtifact, LockedPackage, iter_locked_packages
+from pipzap.parsing.parser import DependenciesParser
+
+LOCK = """\
+version = 1
+requires-python = ">=3.10"
+
+[[package]]
+name = "test-project"
+version = "0.1.0"
+source = { virtual = "." }
+dependencies = [
+    { name = "lightning" },
+    { name = "requests" },
+]
+
+[package.metadata]
+requires-dist = [{ name = "lightning" }, { name = "requests" }]
+
+[[package]]
+name = "lightning"
+version = "2.5.0"
+source = { registry = "https://pypi.org/simple" }
+dependencies = [
+    { name = "numpy" },
+    { name = "pywin32", marker = "sys_platform == 'win32'" },
+]
+sdist = { url = "https://files/lightning-2.5.0.tar.gz", hash = "sha256:00", size = 5000 }
+wheels = [
+    { url = "https://files/lightning-2.5.0-py3-none-any.whl", hash = "sha256:01", size = 800 },
+]
+
+[package.optional-dependencies]
+extra = [
+    { name = "rich" },
+]
+
+[[package]]
+name = "numpy"
+version = "2.2.3"
+source = { registry = "https://pypi.org/simple" }
+sdist = { url = "https://files/numpy-2.2.3.tar.gz", hash = "sha256:02", size = 9000 }
+wheels = [
+    { url = "https://files/numpy-2.2.3-cp312-cp312-macosx_14_0_arm64.whl", hash = "sha256:03", size = 500 },
+    { url = "https://files/numpy-2.2.3-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl", hash = "sha256:04", size = 1500 },
+    { url = "https://files/numpy-2.2.3-cp312-cp312-win_amd64.whl", hash = "sha256:05", size = 700 },
+]
+
+[[package]]
+name = "pywin32"
+version = "308"
+source = { registry = "https://pypi.org/simple" }
+wheels = [
+    { url = "https://files/pywin32-308-cp312-cp312-win_amd64.whl", hash = "sha256:06", size = 300 },
+]
+
+[[package]]
+name = "requests"
+version = "2.32.3"
+source = { registry = "https://pypi.org/simple" }
+dependencies = [
+    { name = "numpy" },
+    { name = "legacy" },
+]
+wheels = [
+    { url = "https://files/requests-2.32.3-py3-none-any.whl", hash = "sha256:07", size = 100 },
+]
+
+[[package]]
+name = "legacy"
+version = "1.0"
+source = { registry = "https://pypi.org/simple" }
+sdist = { url = "https://files/legacy-1.0.tar.gz", hash = "sha256:08", size = 40 }
+
+[[package]]
+name = "rich"
+version = "13.9.4"
+source = { registry = "https://pypi.org/simple" }
+wheels = [
+    { url = "https://files/rich-13.9.4-py3-none-any.whl", hash = "sha256:09", size = 200 },
+]
+"""
+
+NUMPY = LockedPackage(
+    name="numpy",
+    wheels=[
+        LockedArtifact("numpy-2.2.3-cp312-cp312-macosx_14_0_arm64.whl"),
+        LockedArtifact("numpy-2.2.3-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"),
+        LockedArtifact("numpy-2.2.3-cp312-cp312-win_amd64.whl"),
+    ],
+)
+
+
+def test_iter_locked_packages(locked_project):
+    """Tests streaming the package entries, subtables included."""
+    packages = list(iter_locked_packages(locked_project.parent / "uv.lock"))
+
+    assert [package.name for package in packages] == [
+        "test-project",
+        "lightning",
+        "numpy",
+        "pywin32",
+        "requests",
+        "legacy",
+        "rich",
+    ]
+    assert packages[0].is_local
+    assert packages[1].sdist == LockedArtifact("lightning-2.5.0.tar.gz", 5000)
+    assert packages[2].wheels[2] == LockedArtifact("numpy-2.2.3-cp312-cp312-win_amd64.whl", 700)
+    assert packages[5].wheels == [] and not packages[5].is_local
+
+
+@pytest.mark.parametrize(
+    "python_version, platform, expected",
+    [
+        ("3.12", "linux", "numpy-2.2.3-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl"),
+        ("3.12", "macos", "numpy-2.2.3-cp312-cp312-macosx_14_0_arm64.whl"),
+        ("3.12", "windows", "numpy-2.2.3-cp312-cp312-win_amd64.whl"),
+        ("3.12", "linux-aarch64", None),
+        ("3.11", "linux", None),
+    ],
+)
+def test_select_wheel(python_version, platform, expected):
+    """Tests picking the wheel an installer would choose for a target."""
+    tags = TargetEnvironment.from_strings(python_version, platform).supported_tags()
+
+    wheel = select_wheel(NUMPY, {tag: rank for rank, tag in enumerate(tags)})
+    assert (wheel.filename if wheel else None) == expected
+
+
+def test_footprint_attribution(locked_project):
+    """Tests the per-root footprint with shared and marker-conditional packages."""
+    dependencies = DependenciesParser.parse_locked(locked_project)
+    lock_path = locked_project.parent / "uv.lock"
+
+    linux = FootprintReport(dependencies, lock_path, TargetEnvironment.from_strings("3.12", "linux"))
+    assert linux.total == 800 + 1500 + 100 + 40
+    assert [package.name for package in linux.built] == ["legacy"]
+
+    lightning, requests = linux.roots()
+    assert (lightning.label, lightning.closure, lightning.exclusive, lightning.fractional) == (
+        "lightning",
+        2300,
+        800,
+        1550,
+    )
+    assert (requests.label, requests.closure, requests.exclusive, requests.fractional) == (
+        "requests",
+        1640,
+        140,
+        890,
+    )
+
+    windows = FootprintReport(dependencies, lock_path, TargetEnvironment.from_strings("3.12", "windows"))
+    assert [root.label for root in windows.roots("exclusive")] == ["lightning", "requests"]
+    assert windows.roots()[0].closure == 800 + 700 + 300
+
+    with pytest.raises(ValueError, match="attribution"):
+        linux.roots("random")
+
+
+def test_cli_footprint(locked_project, capsys, monkeypatch):
+    """Tests the footprint command end-to-end."""
+    argv = [
+        "pipzap",
+        "footprint",
+        str(locked_project),
+        "--target-python",
+        "3.12",
+        "--attribution",
+        "exclusive",
+    ]
+    monkeypatch.setattr("sys.argv", argv)
+    PipZapCLI().run(do_raise=True)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "Footprint for py3.12.0-linux: 2.4 KiB"
+    assert lines[1] == "    lightning: 800 B exclusive, 2.2 KiB closure of 2 packages"
+    assert lines[-1] == "    ! legacy: no compatible wheel, builds legacy-1.0.tar.gz"
+
+
+def test_source_builds(locked_project):
+    """Tests flagging the packages without a compatible wheel across an environment matrix."""
+    dependencies = DependenciesParser.parse_locked(locked_project)
+    lock_path = locked_project.parent / "uv.lock"
+    environments = environment_matrix(["3.11", "3.12"], ["linux", "windows"])
+
+    builds = {
+        build.name: build for build in SourceBuildReport(dependencies, lock_path, environments).builds()
+    }
+    assert list(builds) == ["legacy", "numpy", "pywin32"]
+
+    assert builds["legacy"] == SourceBuild(
+        "legacy", "1.0", "legacy-1.0.tar.gz", [env.name for env in environments], ["requests"]
+    )
+    assert builds["numpy"].environments == ["py3.11.0-linux", "py3.11.0-windows"]
+    assert builds["numpy"].required_by == ["lightning", "requests"]
+    assert builds["pywin32"] == SourceBuild("pywin32", "308", None, ["py3.11.0-windows"], ["lightning"])
+
+
+@pytest.fixture
+def forked_project(make_pyproject, dummy_pyproject_dict):
+    """A uv project locking `legacy` twice: 1.0 (sdist only) below Python 3.12, 2.0 (a wheel) from 3.12 on."""
+    content = dummy_pyproject_dict
+    content["project"]["dependencies"] = ["legacy"]
+    file = make_pyproject(content)
+
+    fork = """
+[[package]]
+name = "legacy"
+version = "{version}"
+source = {{ registry = "https://pypi.org/simple" }}
+resolution-markers = ["{marker}"]
+sdist = {{ url = "https://files/legacy-{version}.tar.gz", hash = "sha256:00", size = 40 }}
+wheels = [{wheels}]
+"""
+    (file.parent / "uv.lock").write_text(
+        """version = 1
+requires-python = ">=3.10"
+
+[[package]]
+name = "test-project"
+version = "0.1.0"
+source = { virtual = "." }
+dependencies = [
+    { name = "legacy", version = "1.0", marker = "python_full_version < '3.12'" },
+    { name = "legacy", version = "2.0", marker = "python_full_version >= '3.12'" },
+]
+"""
+        + fork.format(version="1.0", marker="python_full_version < '3.12'", wheels="")
+        + fork.format(
+            version="2.0",
+            marker="python_full_version >= '3.12'",
+            wheels='{ url = "https://files/legacy-2.0-py3-none-any.whl", size = 30 }',
+        )
+    )
+    return file
+
+
+def test_source_builds_forks(forked_project):
+    """Tests that every forked version is only checked in the environments its fork applies to."""
+    dependencies = DependenciesParser.parse_locked(forked_project)
+    environments = environment_matrix(["3.11", "3.12"], ["linux"])
+    builds = SourceBuildReport(dependencies, forked_project.parent / "uv.lock", environments).builds()
+
+    assert builds == [SourceBuild("legacy", "1.0", "legacy-1.0.tar.gz", ["py3.11.0-linux"], ["legacy"])]
+
+
+def test_footprint_forks(forked_project):
+    """Tests that forked packages use the artifact of the fork applying to the environment."""
+    lock_path = forked_project.parent / "uv.lock"
+
+    assert select_artifacts(lock_path, TargetEnvironment.from_strings("3.12", "linux"))["legacy"] == (
+        PackageFootprint("legacy", 30, "legacy-2.0-py3-none-any.whl", built=False)
+    )
+    assert select_artifacts(lock_path, TargetEnvironment.from_strings("3.11", "linux"))["legacy"] == (
+        PackageFootprint("legacy", 40, "legacy-1.0.tar.gz", built=True)
+    )
+
+
+def test_cli_builds(locked_project, capsys, monkeypatch):
+    """Tests the builds command end-to-end."""
+    argv = [
+        "pipzap",
+        "builds",
+        str(locked_project),
+        "--target-python",
+        "3.11",
+        "3.12",
+        "--target-platform",
+        "linux",
+    ]
+    monkeypatch.setattr("sys.argv", argv)
+    PipZapCLI().run(do_raise=True)
+
+    assert capsys.readouterr().out.splitlines() == [
+        "legacy 1.0: builds legacy-1.0.tar.gz on every environment (required by requests)",
+        "numpy 2.2.3: builds numpy-2.2.3.tar.gz on py3.11.0-linux (required by lightning, requests)",
+    ]
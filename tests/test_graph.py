@@ -0,0 +1,105 @@
+from pipzap.core.dependencies import Dependency, ProjectDependencies
+from pipzap.core.graph import DependencyGraph, GraphBuilder, reachable, strongly_connected_components
+from pipzap.core.source_format import SourceFormat
+
+
+def _key(name: str, groups=(), extras=()):
+    return (name, frozenset(groups), frozenset(extras))
+
+
+def test_graph_mapping_view_roundtrip():
+    """Tests that the compact graph exposes the same mapping as the plain dict it was built from."""
+    plain = {
+        _key("a"): [_key("b"), _key("c")],
+        _key("b"): [_key("c")],
+        _key("a", groups=["dev"]): [_key("b")],
+    }
+    graph = DependencyGraph.from_mapping(plain)
+
+    assert dict(graph) == plain
+    assert len(graph) == 3
+    assert _key("c") not in graph, "Successor-only nodes are not mapping keys"
+    assert graph.num_nodes == 4
+    assert DependencyGraph.from_mapping(graph) is graph
+
+
+def test_graph_csr_successors():
+    """Tests the integer CSR accessors."""
+    builder = GraphBuilder()
+    a, b, c = (builder.package_node(name) for name in "abc")
+    builder.set_edges(a, [b, c])
+    builder.set_edges(c, [a])
+    graph = builder.build()
+
+    assert list(graph.successors(graph.node_id(_key("a")))) == [b, c]
+    assert list(graph.successors(b)) == []
+    assert list(graph.offsets) == [0, 2, 2, 3]
+    assert graph.key_of(c) == _key("c")
+
+
+def test_graph_including_adds_isolated_nodes():
+    """Tests that missing nodes are added without edges and without becoming mapping keys."""
+    graph = DependencyGraph.from_mapping({_key("a"): [_key("b")]})
+    extended = graph.including([_key("a"), _key("z")])
+
+    assert graph.including([_key("a")]) is graph
+    assert extended.num_nodes == 3
+    assert list(extended.successors(extended.node_id(_key("z")))) == []
+    assert dict(extended) == dict(graph)
+
+
+def test_strongly_connected_components_order():
+    """Tests that components are numbered in reverse topological order."""
+    graph = DependencyGraph.from_mapping(
+        {_key("a"): [_key("b")], _key("b"): [_key("a"), _key("c")], _key("c"): [_key("d")]}
+    )
+    component, num_components = strongly_connected_components(graph)
+    comp = {key[0]: component[graph.node_id(key)] for key in map(_key, "abcd")}
+
+    assert num_components == 3
+    assert comp["a"] == comp["b"]
+    assert comp["d"] < comp["c"] < comp["a"]
+
+
+def test_project_dependencies_compacts_graph():
+    """Tests that plain dict graphs are converted on construction."""
+    deps = ProjectDependencies(
+        direct=[Dependency(name="a")],
+        graph={_key("a"): [_key("b")]},
+        source_format=SourceFormat.UV,
+    )
+    assert isinstance(deps.graph, DependencyGraph)
+    assert deps.graph[_key("a")] == [_key("b")]
+
+
+def test_reachable_skips_conditional_edges():
+    """Tests marker interning and unconditional-only traversal."""
+    builder = GraphBuilder()
+    a, b, c = (builder.package_node(name) for name in "abc")
+    win = builder.marker("sys_platform == 'win32'")
+    builder.set_edges(a, [b, c], [DependencyGraph.NO_MARKER, win])
+    builder.set_edges(b, [c], [builder.marker("sys_platform == 'win32'")])
+    graph = builder.build()
+
+    assert graph.markers == ["sys_platform == 'win32'"]
+    assert list(graph.edge_markers) == [DependencyGraph.NO_MARKER, win, win]
+    assert list(reachable(graph, [a])) == [1, 1, 1]
+    assert list(reachable(graph, [a], unconditional_only=True)) == [1, 1, 0]
+    assert list(graph.reversed().edge_markers) == [DependencyGraph.NO_MARKER, win, win]
+
+
+def test_restricted_drops_inactive_edges():
+    """Tests restricting a graph to the edges whose markers hold in one environment."""
+    builder = GraphBuilder()
+    a, b, c = (builder.package_node(name) for name in "abc")
+    win = builder.marker("sys_platform == 'win32'")
+    linux = builder.marker("sys_platform == 'linux'")
+    builder.set_edges(a, [b, c], [win, linux])
+    builder.set_edges(b, [c])
+    graph = builder.build()
+
+    restricted = graph.restricted(bytes([0, 1]))
+    assert list(restricted.successors(a)) == [c]
+    assert list(restricted.successors(b)) == [c]
+    assert list(restricted.edge_markers) == [linux, DependencyGraph.NO_MARKER]
+    assert restricted.node_id(_key("b")) == b
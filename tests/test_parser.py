@@ -70,3 +70,18 @@ def test_invalid_python_version_specifications(make_pyproject):
 
         with pytest.raises(Exception):
             converter.convert_to_uv(ws)
+
+
+def test_convert_uv_relocks_seeded_lock(make_pyproject, dummy_pyproject_dict, monkeypatch):
+    """Tests that a seeded lock is re-locked (warm) instead of being taken as-is."""
+    file = make_pyproject(dummy_pyproject_dict)
+    (file.parent / "uv.lock").write_text("version = 1\n")
+    commands = []
+
+    monkeypatch.setattr(Workspace, "run", lambda self, cmd, *args, **kwargs: commands.append(cmd) or "")
+
+    with Workspace(file, seed_lock=True) as ws:
+        ProjectConverter().convert_to_uv(ws)
+        assert (ws.base / "uv.lock").read_text() == "version = 1\n"
+
+    assert commands == [["uv", "lock"]]
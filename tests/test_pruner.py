@@ -1,14 +1,20 @@
+import random
 import threading
-from typing import Union
+from dataclasses import replace
+from typing import Dict, List, Set, Union
 
 import pytest
 
 from pipzap.core.dependencies import Dependency, DepKeyT, ProjectDependencies
+from pipzap.core.environments import MarkerEvaluator, TargetEnvironment, environment_matrix
+from pipzap.core.graph import DependencyGraph, GraphBuilder
+from pipzap.core.prune_state import PruneState
 from pipzap.core.pruner import DependencyPruner
 from pipzap.core.source_format import SourceFormat
 from pipzap.parsing.converter import ProjectConverter
 from pipzap.parsing.parser import DependenciesParser
 from pipzap.parsing.workspace import Workspace
+from pipzap.utils.io import write_toml
 
 
 def create_project_deps(direct_names: list, graph: dict) -> ProjectDependencies:
@@ -83,6 +89,203 @@ def test_dependency_cycles():
     assert {dep.name for dep in pruned.direct} == {"A", "B"}
 
 
+def _pairwise_redundant(dependencies: ProjectDependencies) -> Set[DepKeyT]:
+    """Reference implementation: one DFS per ordered pair of direct dependencies."""
+
+    def reaches(root: DepKeyT, target: DepKeyT, graph: Dict[DepKeyT, List[DepKeyT]]) -> bool:
+        visited = set()
+        stack = [root]
+        while stack:
+            current = stack.pop()
+            if current == target:
+                return True
+            if current in visited:
+                continue
+            visited.add(current)
+            stack.extend(graph.get(current, []))
+        return False
+
+    redundant = set()
+    for dep in dependencies.direct:
+        for other in dependencies.direct:
+            if other is dep:
+                continue
+            if reaches(other.key, dep.key, dependencies.graph) and not reaches(
+                dep.key, other.key, dependencies.graph
+            ):
+                redundant.add(dep.key)
+                break
+
+    return redundant
+
+
+def test_redundancy_matches_pairwise_search(rng, random_graph):
+    """Tests the SCC-condensed redundancy search against the pairwise DFS on randomized cyclic graphs."""
+    graph = random_graph()
+    names = list(graph)
+    direct = rng.sample(names, rng.randint(0, len(names)))
+    direct += rng.sample(names, min(rng.randint(0, 3), len(names)))  # duplicated direct deps
+
+    proj_deps = create_project_deps(direct, graph)
+    assert DependencyPruner._find_redundant_deps(proj_deps, []) == _pairwise_redundant(proj_deps)
+
+
+def test_aggressive_pruning_minimal_cover(rng, random_graph, closure):
+    """Tests that the aggressive mode keeps one root per unreached cycle, installing the same closure."""
+    graph = random_graph()
+    direct = rng.sample(list(graph), rng.randint(0, len(graph)))
+    proj_deps = create_project_deps(direct, graph)
+
+    pruned = DependencyPruner.prune(proj_deps, aggressive=True)
+    kept = [dep.key for dep in pruned.direct]
+    all_keys = [dep.key for dep in proj_deps.direct]
+    assert closure(proj_deps.graph, kept) == closure(proj_deps.graph, all_keys)
+
+    # Optimal: a root per class of mutually reachable direct deps that no other direct dep reaches
+    closures = {key: closure(proj_deps.graph, [key]) for key in all_keys}
+    sources = {
+        frozenset(other for other in all_keys if key in closures[other] and other in closures[key])
+        for key in all_keys
+        if all(key not in closures[other] or other in closures[key] for other in all_keys)
+    }
+    assert len(kept) == len(sources)
+    assert set(kept) <= {dep.key for dep in DependencyPruner.prune(proj_deps).direct}
+
+
+def test_aggressive_pruning_large_graph(closure):
+    """Tests the aggressive mode on a large synthetic layered graph."""
+    rng = random.Random(0)
+    names = [f"pkg{i}" for i in range(5000)]
+    graph = {
+        name: [names[rng.randrange(index + 1, len(names))] for _ in range(rng.randint(0, 4))]
+        for index, name in enumerate(names[:-1])
+    }
+    direct = rng.sample(names, 1000)
+    proj_deps = create_project_deps(direct, graph)
+
+    pruned = DependencyPruner.prune(proj_deps, keep=[direct[-1]], aggressive=True)
+    kept = [dep.key for dep in pruned.direct]
+
+    assert direct[-1] in {dep.name for dep in pruned.direct}
+    assert closure(proj_deps.graph, kept) == closure(proj_deps.graph, [dep.key for dep in proj_deps.direct])
+
+
+def test_pruning_requires_covered_extras():
+    """Tests that a dependency with required extras is pruned only if all of its extras are covered."""
+    direct = [Dependency(name="lightning"), Dependency(name="torch", required_extras=frozenset({"cuda"}))]
+    graph = {
+        ("lightning", frozenset(), frozenset()): [("torch", frozenset(), frozenset())],
+        ("torch[cuda]", frozenset(), frozenset()): [("nvidia-cublas", frozenset(), frozenset())],
+    }
+    proj_deps = ProjectDependencies(direct=direct, graph=graph, source_format=SourceFormat.UV)
+    assert {dep.name for dep in DependencyPruner.prune(proj_deps).direct} == {"lightning", "torch"}
+
+    # Same key as the covered plain `torch`, so it must not be filtered out along with it
+    proj_deps.direct.append(Dependency(name="torch"))
+    assert len(DependencyPruner.prune(proj_deps).direct) == 3
+
+    graph[("lightning", frozenset(), frozenset())].append(("torch[cuda]", frozenset(), frozenset()))
+    proj_deps = replace(proj_deps, graph=graph)
+    assert {dep.name for dep in DependencyPruner.prune(proj_deps).direct} == {"lightning"}
+
+
+def test_cross_group_pruning():
+    """Tests dropping group/extra deps that the main dependencies always install."""
+    dev, docs = frozenset({"dev"}), frozenset({"docs"})
+    direct = [
+        Dependency(name="requests"),
+        Dependency(name="urllib3", groups=dev),
+        Dependency(name="certifi", groups=dev),
+        Dependency(name="requests", groups=dev, required_extras=frozenset({"socks"})),
+        Dependency(name="pytest", groups=dev),
+        Dependency(name="urllib3", extras=docs, marker="python_version >= '3.9'"),
+    ]
+    builder = GraphBuilder()
+    requests, urllib3, certifi = (builder.package_node(name) for name in ["requests", "urllib3", "certifi"])
+    builder.set_edges(
+        requests, [urllib3, certifi], [DependencyGraph.NO_MARKER, builder.marker("os_name == 'nt'")]
+    )
+    builder.set_edges(builder.extra_node("requests", "socks"), [builder.package_node("pysocks")])
+    proj_deps = ProjectDependencies(direct=direct, graph=builder.build(), source_format=SourceFormat.UV)
+
+    assert len(DependencyPruner.prune(proj_deps).direct) == len(direct)
+
+    pruned = DependencyPruner.prune(proj_deps, cross_group=True)
+    assert [dep.key for dep in pruned.direct] == [direct[i].key for i in (0, 2, 3, 4)]
+
+    pruned = DependencyPruner.prune(proj_deps, keep=["urllib3"], cross_group=True)
+    assert len(pruned.direct) == len(direct)
+
+
+def _marker_project(target_python_marker: str) -> ProjectDependencies:
+    """Direct deps guarded by platform markers, all pulled in by conditional lock edges."""
+    direct = [
+        Dependency(name="torch"),
+        Dependency(name="nvidia-cublas", marker="sys_platform == 'linux'"),
+        Dependency(name="triton", marker="sys_platform == 'linux'"),
+        Dependency(name="click"),
+        Dependency(name="colorama", marker="sys_platform == 'win32'"),
+        Dependency(name="typing-extensions", indirect_markers=frozenset({"python_version < '3.13'"})),
+    ]
+    builder = GraphBuilder()
+    nodes = {dep.name: builder.node(dep.key) for dep in direct}
+    builder.set_edges(
+        nodes["torch"],
+        [nodes["nvidia-cublas"], nodes["triton"], nodes["typing-extensions"]],
+        [
+            builder.marker("sys_platform == 'linux'"),
+            builder.marker(f"sys_platform == 'linux' and {target_python_marker}"),
+            DependencyGraph.NO_MARKER,
+        ],
+    )
+    builder.set_edges(nodes["click"], [nodes["colorama"]], [builder.marker("platform_system == 'Windows'")])
+
+    return ProjectDependencies(direct=direct, graph=builder.build(), source_format=SourceFormat.UV)
+
+
+@pytest.mark.parametrize(
+    "python_marker, expected_kept",
+    [
+        ("python_version < '3.13'", {"torch", "click"}),
+        ("python_version < '3.12'", {"torch", "click", "triton"}),  # Not covered on 3.12
+    ],
+)
+def test_environment_matrix_pruning(python_marker, expected_kept):
+    """Tests that marker-guarded deps are pruned only if covered in every target environment."""
+    proj_deps = _marker_project(python_marker)
+    environments = environment_matrix(["3.11", "3.12"], ["linux", "macos", "windows"])
+
+    pruned = DependencyPruner.prune(proj_deps, environments=environments)
+    assert {dep.name for dep in pruned.direct} == expected_kept
+
+    pruned = DependencyPruner.prune(proj_deps, keep=["colorama"], environments=environments)
+    assert {dep.name for dep in pruned.direct} == expected_kept | {"colorama"}
+
+    pruned = DependencyPruner.prune(proj_deps, environments=environments, aggressive=True)
+    assert {dep.name for dep in pruned.direct} == expected_kept
+
+    # Without targets, marker-guarded deps are preserved
+    pruned = DependencyPruner.prune(proj_deps)
+    assert {dep.name for dep in pruned.direct} == {dep.name for dep in proj_deps.direct}
+
+
+def test_marker_evaluator_cache():
+    """Tests batched marker evaluation and the invalid-marker fallback."""
+    evaluator = MarkerEvaluator(environment_matrix(["3.8", "3.12"], ["linux", "windows"]))
+
+    assert evaluator.evaluate(None) == evaluator.all == 0b1111
+    assert evaluator.evaluate("sys_platform == 'win32'") == 0b1010
+    assert evaluator.evaluate("python_version >= '3.9' and os_name == 'posix'") == 0b0100
+    assert evaluator.evaluate("sys_platform == 'win32'") == 0b1010
+    assert evaluator.num_compiled == 2
+
+    assert evaluator.evaluate("not a marker") == evaluator.all
+    assert evaluator.evaluate("not a marker", default=False) == 0
+
+    with pytest.raises(ValueError):
+        TargetEnvironment.from_strings("3.11", "solaris")
+
+
 def test_concurrent_dependency_resolution(make_pyproject):
     """Tests concurrent dependency resolution consistency."""
     content = {
@@ -132,3 +335,121 @@ def test_invalid_python_version_specifications(make_pyproject):
 
         with pytest.raises(Exception):
             converter.convert_to_uv(ws)
+
+
+@pytest.mark.parametrize(
+    "packages, expect_relock",
+    [
+        # b is pulled in by a unconditionally: proven by the graph
+        (
+            [{"name": "a", "dependencies": [{"name": "b"}]}, {"name": "b", "dependencies": [{"name": "c"}]}],
+            False,
+        ),
+        # b is pulled in only through a marker-conditional intermediate: requires a re-lock
+        (
+            [
+                {"name": "a", "dependencies": [{"name": "x", "marker": "sys_platform == 'win32'"}]},
+                {"name": "x", "dependencies": [{"name": "b"}]},
+                {"name": "b"},
+            ],
+            True,
+        ),
+    ],
+)
+def test_preserve_all_graph_verification(make_pyproject, monkeypatch, packages, expect_relock):
+    """Tests that preserve-all only falls back to a re-lock when the lock graph cannot prove equivalence."""
+    relocks = []
+
+    def fake_relock(pruned_deps, workspace):
+        relocks.append(pruned_deps)
+        return set(), {}
+
+    monkeypatch.setattr(DependencyPruner, "_find_missing_after_prune", fake_relock)
+    content = {
+        "project": {"name": "test-project", "version": "0.1.0", "dependencies": ["a", "b"]},
+        "tool": {"uv": {}},
+    }
+
+    with Workspace(make_pyproject(content)) as ws:
+        write_toml({"version": 1, "package": packages}, ws.base / "uv.lock")
+        parsed = DependenciesParser.parse(ws, SourceFormat.UV)
+        pruned = DependencyPruner.prune(parsed, preserve_all=True, workspace=ws)
+
+    assert [dep.name for dep in pruned.direct] == ["a"]
+    assert bool(relocks) == expect_relock
+
+
+def _random_marker_project(rng: random.Random, adjacency: Dict[str, List[str]], direct: List[str]):
+    """Builds a project whose lock edges are randomly guarded by a small pool of markers."""
+    markers = [None, None, "sys_platform == 'linux'", "sys_platform == 'win32'", "python_version < '3.12'"]
+    deps = [Dependency(name=name) for name in direct]
+    builder = GraphBuilder()
+    for name, children in adjacency.items():
+        builder.set_edges(
+            builder.node(Dependency(name=name).key),
+            [builder.node(Dependency(name=child).key) for child in children],
+            [builder.marker(rng.choice(markers)) for _ in children],
+        )
+    return ProjectDependencies(direct=deps, graph=builder.build(), source_format=SourceFormat.UV)
+
+
+def test_incremental_pruning_matches_full(rng, random_graph, tmp_path):
+    """Tests that re-pruning from a persisted state matches a fresh prune across lock, keep and target changes."""
+    adjacency = random_graph(num_nodes=30, edge_prob=0.08)
+    names = list(adjacency)
+    direct = rng.sample(names, 12)
+    environments = environment_matrix(["3.11", "3.12"], ["linux", "windows"])
+    markers_seed = rng.random()
+
+    for _ in range(8):
+        proj_deps = _random_marker_project(random.Random(markers_seed), adjacency, direct)
+        options = dict(
+            keep=rng.sample(direct, rng.randint(0, 2)),
+            environments=rng.choice([None, environments, environments[:2]]),
+            aggressive=rng.random() < 0.3,
+        )
+
+        state = PruneState(tmp_path / "state.bin")
+        pruned = DependencyPruner.prune(proj_deps, state=state, **options)
+        state.save()
+
+        expected = DependencyPruner.prune(proj_deps, **options)
+        assert [dep.key for dep in pruned.direct] == [dep.key for dep in expected.direct]
+
+        # A lock update touching a single package, occasionally dropping one (renumbering the graph nodes)
+        # or changing a direct dependency
+        adjacency[rng.choice(names)] = [other for other in names if rng.random() < 0.08]
+        if rng.random() < 0.3:
+            dropped = rng.choice(names)
+            adjacency = {
+                name: [other for other in children if other != dropped]
+                for name, children in adjacency.items()
+                if name != dropped
+            }
+        if rng.random() < 0.3:
+            direct = [name for name in direct if name != rng.choice(direct)] + [rng.choice(names)]
+            direct = list(dict.fromkeys(direct))
+
+
+def test_incremental_pruning_reuses_summaries(tmp_path):
+    """Tests that a keep-list change reuses every reach summary, and a lock change only recomputes its ancestors."""
+    graph = {"a": ["b"], "b": ["c"], "c": [], "d": ["e"], "e": [], "f": []}
+    direct = ["a", "b", "d", "e", "f"]
+
+    state = PruneState(tmp_path / "state.bin")
+    DependencyPruner.prune(create_project_deps(direct, graph), state=state)
+    state.save()
+    assert (state.reused, state.recomputed) == (0, 5)
+
+    state = PruneState(tmp_path / "state.bin")
+    pruned = DependencyPruner.prune(create_project_deps(direct, graph), keep=["b"], state=state)
+    state.save()
+    assert {dep.name for dep in pruned.direct} == {"a", "b", "d", "f"}
+    assert (state.reused, state.recomputed) == (5, 0)
+
+    # Only `d` reaches the updated `e`
+    graph["e"] = ["f"]
+    state = PruneState(tmp_path / "state.bin")
+    pruned = DependencyPruner.prune(create_project_deps(direct, graph), state=state)
+    assert {dep.name for dep in pruned.direct} == {"a", "d"}
+    assert (state.reused, state.recomputed) == (3, 2)
@@ -0,0 +1,164 @@
+import pytest
+
+from pipzap.analysis import DependencyQuery, RemovalImpact
+from pipzap.cli import PipZapCLI
+from pipzap.core.dependencies import Dependency, ProjectDependencies
+from pipzap.core.environments import TargetEnvironment
+from pipzap.core.graph import GraphBuilder, fork_key
+from pipzap.core.source_format import SourceFormat
+from pipzap.exceptions import ParsingError, QueryError
+from pipzap.parsing.parser import DependenciesParser
+
+# Dependency groups of the `locked_project` fixture (see conftest.py)
+DEPENDENCY_GROUPS = {"dev": ["numpy"]}
+
+LOCK = {
+    "version": 1,
+    "package": [
+        {
+            "name": "test-project",
+            "version": "0.1.0",
+            "dependencies": [{"name": "lightning"}, {"name": "requests"}],
+        },
+        {"name": "lightning", "version": "2.5.0", "dependencies": [{"name": "torch"}, {"name": "fsspec"}]},
+        {"name": "torch", "version": "2.6.0", "dependencies": [{"name": "numpy"}, {"name": "fsspec"}]},
+        {"name": "requests", "version": "2.32.3", "dependencies": [{"name": "urllib3"}]},
+        {"name": "fsspec", "version": "2025.2.0"},
+        {"name": "numpy", "version": "2.2.3"},
+        {"name": "urllib3", "version": "2.3.0"},
+    ],
+}
+
+
+def test_why_shortest_paths(locked_project):
+    """Tests shortest paths from each direct dependency to the queried package."""
+    query = DependencyQuery(DependenciesParser.parse_locked(locked_project))
+
+    assert query.why("numpy") == {"lightning": ["lightning", "torch", "numpy"], "numpy (dev)": ["numpy"]}
+    assert query.why("FSSPEC") == {"lightning": ["lightning", "fsspec"]}
+    assert query.why("urllib3") == {"requests": ["requests", "urllib3"]}
+
+
+def test_rdeps_and_closure(locked_project):
+    """Tests reverse dependencies and the transitive closure of a package."""
+    dependencies = DependenciesParser.parse_locked(locked_project.parent)
+    assert type(dependencies.uv_pyproject_source) is dict
+    query = DependencyQuery(dependencies)
+
+    assert query.rdeps("fsspec") == ["lightning", "torch"]
+    assert query.rdeps("numpy", transitive=True) == ["lightning", "torch"]
+    assert query.rdeps("requests") == []
+    assert query.closure("lightning") == ["fsspec", "numpy", "torch"]
+    assert query.closure("numpy") == []
+
+    with pytest.raises(QueryError, match="not present"):
+        query.why("nonexistent")
+
+
+def test_query_cycles():
+    """Tests that queries terminate on cyclic graphs."""
+    a, b = Dependency(name="a"), Dependency(name="b")
+    deps = ProjectDependencies(
+        direct=[a], graph={a.key: [b.key], b.key: [a.key]}, source_format=SourceFormat.UV
+    )
+    query = DependencyQuery(deps)
+
+    assert query.closure("a") == ["b"]
+    assert query.rdeps("a", transitive=True) == ["b"]
+    assert query.why("b") == {"a": ["a", "b"]}
+
+
+def test_query_forks():
+    """Tests that the versions of a forked package answer for the package."""
+    app, legacy = Dependency(name="app"), Dependency(name="legacy")
+    old, new, six = fork_key("legacy", "1.0"), fork_key("legacy", "2.0"), Dependency(name="six").key
+    deps = ProjectDependencies(
+        direct=[app],
+        graph={app.key: [old], legacy.key: [old, new], old: [six], new: []},
+        source_format=SourceFormat.UV,
+    )
+    query = DependencyQuery(deps)
+
+    assert query.why("six") == {"app": ["app", "legacy@1.0", "six"]}
+    assert query.rdeps("legacy") == ["app"]
+    assert query.rdeps("six") == ["legacy"]
+    assert query.closure("legacy") == ["six"]
+
+
+def test_parse_locked_requires_lock(make_pyproject, dummy_pyproject_dict):
+    """Tests that querying a project without a uv.lock fails early."""
+    with pytest.raises(ParsingError, match="No uv.lock"):
+        DependenciesParser.parse_locked(make_pyproject(dummy_pyproject_dict))
+
+
+def test_cli_why(locked_project, capsys):
+    """Tests the `why` subcommand end-to-end."""
+    cli = PipZapCLI()
+    cli.run(do_raise=True, args=cli._parse_args(["why", "numpy", str(locked_project)]))
+
+    out = capsys.readouterr().out
+    assert "lightning: lightning -> torch -> numpy" in out
+    assert "numpy (dev): numpy" in out
+
+
+def test_removal_impact(locked_project):
+    """Tests the exclusively-owned packages of every direct dependency."""
+    impact = RemovalImpact(DependenciesParser.parse_locked(locked_project))
+
+    # numpy stays with the dev group, fsspec is shared by lightning and torch, both owned by lightning
+    assert impact.exclusive() == {
+        "lightning": ["fsspec", "lightning", "torch"],
+        "requests": ["requests", "urllib3"],
+        "numpy (dev)": [],
+    }
+
+
+def test_removal_impact_markers_and_extras():
+    """Tests dominators with required extras, shared keys, cycles and marker-conditional edges."""
+    builder = GraphBuilder()
+    a, b, c, d, e = (builder.package_node(name) for name in "abcde")
+    builder.set_edges(a, [b])
+    builder.set_edges(b, [c, a])
+    builder.set_edges(builder.extra_node("a", "x"), [d])
+    builder.set_edges(e, [d], [builder.marker("sys_platform == 'win32'")])
+    direct = [
+        Dependency(name="a"),
+        Dependency(name="a", required_extras=frozenset({"x"})),
+        Dependency(name="e"),
+    ]
+    deps = ProjectDependencies(direct=direct, graph=builder.build(), source_format=SourceFormat.UV)
+
+    assert RemovalImpact(deps).exclusive() == {"a": ["a", "b", "c"], "e": ["e"]}
+
+    linux = TargetEnvironment.from_strings("3.12", "linux")
+    assert RemovalImpact(deps, linux).exclusive() == {"a": ["a", "b", "c", "d"], "e": ["e"]}
+
+
+def test_removal_impact_matches_relocking(rng, random_graph, closure):
+    """Tests the dominator-based impact against recomputing the closure without every direct dependency."""
+    graph = {
+        Dependency(name=name).key: [Dependency(name=child).key for child in children]
+        for name, children in random_graph(num_nodes=rng.randint(1, 30)).items()
+    }
+    direct = [Dependency(name=name) for name, *_ in rng.sample(list(graph), rng.randint(1, len(graph)))]
+    deps = ProjectDependencies(direct=direct, graph=graph, source_format=SourceFormat.UV)
+
+    def installed(roots):
+        return {name for name, *_ in closure(graph, roots)}
+
+    everything = installed([dep.key for dep in direct])
+    expected = {
+        dep.name: sorted(everything - installed([other.key for other in direct if other.key != dep.key]))
+        for dep in direct
+    }
+    assert RemovalImpact(deps).exclusive() == expected
+
+
+def test_cli_impact(locked_project, capsys, monkeypatch):
+    """Tests the impact command end-to-end."""
+    monkeypatch.setattr("sys.argv", ["pipzap", "impact", str(locked_project), "--target-platform", "macos"])
+    PipZapCLI().run(do_raise=True)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "lightning: 3 packages (fsspec, lightning, torch)"
+    assert lines[-1] == "numpy (dev): 0 packages"
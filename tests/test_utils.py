@@ -5,8 +5,9 @@ from pipzap.core.source_format import SourceFormat
 from pipzap.exceptions import ParsingError, ResolutionError
 from pipzap.parsing.workspace import Workspace
 from pipzap.utils.debug import is_debug
+from pipzap.utils.files import clone_file
 from pipzap.utils.io import read_toml, write_toml
-from pipzap.utils.pretty_string import remove_prefix
+from pipzap.utils.pretty_string import pluralize, remove_prefix
 
 
 def test_external_command_failures():
@@ -33,6 +34,13 @@ def test_remove_prefix():
     assert remove_prefix("no_prefix", "prefix_") == "no_prefix", "No prefix should leave string unchanged"
 
 
+def test_pluralize():
+    """Tests count formatting with singular and plural nouns."""
+    assert pluralize(1, "package") == "1 package"
+    assert pluralize(0, "package") == "0 packages"
+    assert pluralize(3, "package") == "3 packages"
+
+
 def test_read_write_toml(tmp_path):
     """Tests that TOML data is correctly written and read back."""
     data = {"section": {"key": "value", "list": [1, 2, 3]}}
@@ -44,6 +52,17 @@ def test_read_write_toml(tmp_path):
     assert result == data, "Read TOML should match written data"
 
 
+def test_read_toml_readonly(tmp_path):
+    """Tests that read-only TOML data is parsed into plain values, matching the round-trip parser."""
+    file = tmp_path / "uv.lock"
+    file.write_text('version = 1\n\n[[package]]\nname = "numpy" # comment\nwheels = [{ size = 1 }]\n')
+
+    result = read_toml(file, roundtrip=False)
+
+    assert result == read_toml(file)
+    assert type(result) is dict and type(result["package"][0]["name"]) is str
+
+
 def test_read_toml_invalid(tmp_path):
     """Test reading an invalid TOML file raises an error."""
     file = tmp_path / "invalid.toml"
@@ -60,3 +79,22 @@ def test_is_debug_env(monkeypatch):
 
     monkeypatch.delenv("PIPZAP_DEBUG", raising=False)
     assert is_debug() is False, "Debug should be False when PIPZAP_DEBUG is unset"
+
+
+def test_clone_file(tmp_path):
+    """Tests that read-only copies share the data where possible, and writable ones never do."""
+    source = tmp_path / "source.txt"
+    source.write_text("original")
+
+    assert clone_file(source, tmp_path / "linked.txt", read_only=True) in ("reflink", "hardlink")
+    assert (tmp_path / "linked.txt").read_text() == "original"
+
+    copy = tmp_path / "copy.txt"
+    assert clone_file(source, copy) in ("reflink", "copy")
+    copy.write_text("modified")
+    assert source.read_text() == "original"
+
+    # Replacing a target that is a hardlink of the source leaves the source intact
+    clone_file(copy, tmp_path / "linked.txt")
+    assert source.read_text() == "original"
+    assert (tmp_path / "linked.txt").read_text() == "modified"
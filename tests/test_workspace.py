@@ -1,12 +1,15 @@
+import asyncio
 import os
 import shutil
 import stat
-import subprocess
-from threading import Thread
+import sys
+import time
+from threading import Event, Thread
 
 import pytest
 
 from pipzap.exceptions import ResolutionError
+from pipzap.parsing import WorkspacePool
 from pipzap.parsing.workspace import BackupPath, Workspace
 
 
@@ -45,29 +48,73 @@ def test_workspace_isolation(tmp_path):
     assert source.read_text() == "original", "Original file should remain unchanged in isolation"
 
 
-def test_workspace_run_success(monkeypatch):
+def test_workspace_run_success():
     """Tests successful command execution within Workspace."""
-
-    def fake_run(cmd, *args, **kwargs):
-        return subprocess.CompletedProcess(cmd, 0, stdout="success", stderr="")
-
-    monkeypatch.setattr(subprocess, "run", fake_run)
     with Workspace(None) as ws:
-        output = ws.run(["dummy"], "test")
+        output = ws.run([sys.executable, "-c", "print('success')"], "test")
         assert "success" in output, "Command output should contain 'success'"
 
 
-def test_workspace_run_failure(tmp_path, monkeypatch):
+def test_workspace_run_failure():
     """Tests command failure handling within Workspace."""
+    script = "import sys; sys.stderr.write('error: broken\\n'); sys.exit(1)"
+
+    with Workspace(None) as ws:
+        with pytest.raises(ResolutionError, match="error: broken"):
+            ws.run([sys.executable, "-c", script], "test")
+
+
+def test_workspace_run_timeout():
+    """Tests that a command exceeding its timeout is killed."""
+    with Workspace(None, timeout=60) as ws:
+        started = time.monotonic()
+        with pytest.raises(ResolutionError, match="Timed out"):
+            ws.run([sys.executable, "-c", "import time; time.sleep(60)"], "test", timeout=0.5)
 
-    def fake_run(cmd, *args, **kwargs):
-        raise subprocess.CalledProcessError(1, cmd, output="fail", stderr="error")
+        assert time.monotonic() - started < 30
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
+
+def test_workspace_run_async():
+    """Tests awaiting several commands at once, and that cancelling a command kills it."""
+
+    async def scenario(ws):
+        first, second = await asyncio.gather(
+            ws.run_async([sys.executable, "-c", "print(1)"], "first"),
+            ws.run_async([sys.executable, "-c", "print(2)"], "second"),
+        )
+        assert (first.strip(), second.strip()) == ("1", "2")
+
+        script = "import pathlib, time; pathlib.Path('started').touch(); time.sleep(60)"
+        task = asyncio.ensure_future(ws.run_async([sys.executable, "-c", script], "hanging"))
+        while not (ws.base / "started").exists():
+            await asyncio.sleep(0.05)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
 
     with Workspace(None) as ws:
-        with pytest.raises(ResolutionError):
-            ws.run(["dummy"], "test")
+        asyncio.run(asyncio.wait_for(scenario(ws), 30))
+
+
+def test_workspace_run_in_running_loop():
+    """Tests the synchronous facade when called from within a running event loop."""
+
+    async def scenario(ws):
+        return ws.run([sys.executable, "-c", "print('nested')"], "test")
+
+    with Workspace(None) as ws:
+        assert asyncio.run(scenario(ws)).strip() == "nested"
+
+
+def test_workspace_run_long_line(monkeypatch):
+    """Tests that an output line over the stream limit fails the command instead of leaking a ValueError."""
+    monkeypatch.setattr(Workspace, "STREAM_LIMIT", 1024)
+    script = "import sys; sys.stderr.write('x' * 4096 + '\\n')"
+
+    with Workspace(None) as ws:
+        with pytest.raises(ResolutionError, match="exceeds 1024 bytes"):
+            ws.run([sys.executable, "-c", script], "test")
 
 
 def test_concurrent_workspace_access(tmp_path):
@@ -152,3 +199,252 @@ def test_workspace_large_file(tmp_path):
         ws.path.write_text("modified")
 
     assert source.read_text() == data, "Original large file should be restored"
+
+
+@pytest.mark.parametrize("no_isolation", [False, True])
+def test_workspace_seed_lock(tmp_path, no_isolation):
+    """Tests that an existing sibling uv.lock is placed into the workspace and the original is preserved."""
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\n")
+    lock = tmp_path / "uv.lock"
+    lock.write_text("version = 1\n")
+
+    to_backup = [BackupPath("uv.lock", keep=False)]
+    with Workspace(source, no_isolation, extra_backup=to_backup, seed_lock=True) as ws:
+        assert ws.lock_seeded
+        assert (ws.base / "uv.lock").read_text() == "version = 1\n"
+        (ws.base / "uv.lock").write_text("version = 2\n")
+
+    assert lock.read_text() == "version = 1\n", "Original lock should be restored"
+
+
+def test_workspace_seed_lock_missing(tmp_path):
+    """Tests that seeding is a no-op without an existing lock."""
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\n")
+
+    with Workspace(source, seed_lock=True) as ws:
+        assert not ws.lock_seeded
+        assert not (ws.base / "uv.lock").exists()
+
+
+def test_workspace_documents(tmp_path):
+    """Tests that documents are parsed once, and changes are only written right before a command runs."""
+    source = tmp_path / "pyproject.toml"
+    source.write_text('[project]\nname = "test"\n')
+    cat = [sys.executable, "-c", "print(open('pyproject.toml').read(), end='')"]
+
+    with Workspace(source) as ws:
+        document = ws.document()
+        assert ws.document() is document
+
+        document["project"]["requires-python"] = ">=3.8"
+        ws.update_document(document)
+        assert "requires-python" not in ws.path.read_text()
+        assert ws.document() is document
+
+        assert ws.run(cat, "test") == '[project]\nname = "test"\nrequires-python = ">=3.8"\n'
+
+        # A file rewritten externally is parsed again
+        ws.path.write_text('[project]\nname = "changed"\n')
+        assert ws.document()["project"]["name"] == "changed"
+
+    assert source.read_text() == '[project]\nname = "test"\n'
+
+
+def test_workspace_debug_dirs(tmp_path, monkeypatch):
+    """Tests that debug workspaces get unique directories, which are kept after the exit."""
+    monkeypatch.setenv("PIPZAP_DEBUG", "1")
+    monkeypatch.chdir(tmp_path)
+
+    with Workspace(None) as first, Workspace(None) as second:
+        assert first.base != second.base
+        assert first.base.name.startswith("pipzap-temp-")
+
+    assert first.base.is_dir() and second.base.is_dir()
+
+
+def test_workspace_isolated_keeps_sources(tmp_path):
+    """Tests that an isolated run copies the user files instead of moving them out of place."""
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\n")
+    lock = tmp_path / "uv.lock"
+    lock.write_text("version = 1\n")
+
+    with Workspace(source, extra_backup=[BackupPath("uv.lock", keep=False)]) as ws:
+        assert lock.read_text() == "version = 1\n"
+        assert not (ws.base / "uv.lock").exists()
+
+        # Edits made by the user while a run is in flight are not clobbered
+        source.write_text("[project]\nname = 'edited'\n")
+
+    assert source.read_text() == "[project]\nname = 'edited'\n"
+    assert lock.read_text() == "version = 1\n"
+
+
+@pytest.mark.parametrize("no_isolation", [False, True])
+def test_workspace_cli_backups_keep_source(tmp_path, no_isolation):
+    """Tests that a pyproject.toml source, which is also among the CLI extra backups, is never truncated."""
+    content = "[project]\nname = 'demo'\n"
+    source = tmp_path / "pyproject.toml"
+    source.write_text(content)
+    to_backup = [
+        BackupPath("uv.lock", keep=False),
+        BackupPath("requirements.txt", keep=True),
+        BackupPath("pyproject.toml", keep=True),
+    ]
+
+    with Workspace(source, no_isolation, extra_backup=to_backup) as ws:
+        assert ws.backup.read_text() == content
+        if not no_isolation:
+            assert source.read_text() == content
+            assert ws.backup.stat().st_ino != source.stat().st_ino, "Backups should not share the user file"
+
+        ws.path.write_text("[project]\nname = 'pruned'\n")
+
+    assert source.read_text() == content
+
+
+def test_workspace_isolated_lock_backup_linked(tmp_path, monkeypatch):
+    """Tests that an isolated run hardlinks its read-only uv.lock backup, while the seeded lock is a private copy."""
+    monkeypatch.setattr("pipzap.utils.files._reflink", lambda source, target: False)
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\n")
+    lock = tmp_path / "uv.lock"
+    lock.write_text("version = 1\n")
+
+    with Workspace(source, extra_backup=[BackupPath("uv.lock", keep=False)], seed_lock=True) as ws:
+        backup = ws.base / "__pipzap-uv.backup.lock"
+        assert backup.stat().st_ino == lock.stat().st_ino
+        assert ws.lock_seeded
+
+        # Like uv, rewrite the workspace lock in place
+        (ws.base / "uv.lock").write_text("version = 2\n")
+
+    assert lock.read_text() == "version = 1\n"
+
+
+def test_workspace_directory_lock(tmp_path):
+    """Tests that a non-isolated workspace excludes others on the same source directory until it exits."""
+    pytest.importorskip("fcntl")
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\n")
+    entered = Event()
+
+    def worker():
+        with Workspace(source):
+            entered.set()
+
+    with Workspace(source, no_isolation=True):
+        thread = Thread(target=worker)
+        thread.start()
+        assert not entered.wait(0.5), "An isolated workspace should wait for the in-place one"
+
+    assert entered.wait(10)
+    thread.join()
+
+
+def test_workspace_base_dir(tmp_path, monkeypatch):
+    """Tests creating isolated workspaces in a configured directory, falling back to the default if unusable."""
+    source = tmp_path / "source.txt"
+    source.write_text("original")
+    base_dir = tmp_path / "ram"
+    base_dir.mkdir()
+
+    with Workspace(source, base_dir=base_dir) as ws:
+        assert ws.base.parent == base_dir
+        assert ws.path.read_text() == "original"
+
+    monkeypatch.setenv("PIPZAP_WORKSPACE_DIR", str(tmp_path / "missing"))
+    with Workspace(source) as ws:
+        assert ws.base.parent != tmp_path / "missing"
+        assert ws.path.read_text() == "original"
+
+
+def test_workspace_pool_reuse(tmp_path):
+    """Tests that pooled directories keep the clean inputs and are reused, up to the idle bound."""
+    source = tmp_path / "source.txt"
+    source.write_text("original")
+    (tmp_path / "pool").mkdir()
+
+    with WorkspacePool(max_idle=1, base_dir=tmp_path / "pool", prefill=2) as pool:
+        assert pool.idle == 1
+
+        with pool.workspace(source) as ws:
+            first = ws.base
+            assert first.parent == tmp_path / "pool"
+            (ws.base / "uv.lock").write_text("version = 1\n")
+
+        assert pool.idle == 1 and first.is_dir()
+        assert sorted(path.name for path in first.iterdir()) == ["__pipzap-source.backup.txt", "source.txt"]
+
+        with pool.workspace(source) as ws, pool.workspace(source) as other:
+            assert ws.base == first and other.base != first
+            assert ws.path.read_text() == "original"
+            second = other.base
+
+        # The least recently used directory exceeds the bound
+        assert pool.idle == 1 and first.is_dir() and not second.exists()
+
+    assert not first.exists()
+    assert source.read_text() == "original"
+
+
+def test_workspace_pool_reset(tmp_path):
+    """Tests that only the files created or changed by a job are reset, and unchanged inputs are kept."""
+    source = tmp_path / "pyproject.toml"
+    source.write_text("[project]\nname = 'demo'\n")
+    (tmp_path / "uv.lock").write_text("version = 1\n")
+    kwargs = dict(extra_backup=[BackupPath("uv.lock", keep=False)], seed_lock=True)
+
+    with WorkspacePool() as pool:
+        with pool.workspace(source, **kwargs) as ws:
+            base = ws.base
+            inode = (ws.base / "uv.lock").stat().st_ino
+            ws.path.write_text("modified")
+            (ws.base / "requirements.txt").write_text("requests\n")
+            (ws.base / ".venv").mkdir()
+            (ws.base / ".venv" / "pyvenv.cfg").write_text("home = /usr\n")
+
+        with pool.workspace(source, **kwargs) as ws:
+            assert ws.base == base and ws.lock_seeded
+            assert ws.path.read_text() == "[project]\nname = 'demo'\n"
+            assert not (ws.base / "requirements.txt").exists() and not (ws.base / ".venv").exists()
+            assert (ws.base / "uv.lock").stat().st_ino == inode
+
+            # Rewritten in place, with the same size
+            with open(ws.base / "uv.lock", "r+") as lock:
+                lock.write("version = 2\n")
+
+        with pool.workspace(source, **kwargs) as ws:
+            assert (ws.base / "uv.lock").read_text() == "version = 1\n"
+
+        source.write_text("[project]\nname = 'other'\n")
+        with pool.workspace(source) as ws:
+            assert ws.path.read_text() == "[project]\nname = 'other'\n"
+            assert not (ws.base / "uv.lock").exists() and not (ws.base / "__pipzap-uv.backup.lock").exists()
+
+    assert (tmp_path / "uv.lock").read_text() == "version = 1\n"
+
+
+def test_workspace_pool_eviction(tmp_path):
+    """Tests that idle directories expire, and that directories of failed jobs are not reused."""
+    source = tmp_path / "source.txt"
+    source.write_text("original")
+    pool = WorkspacePool()
+
+    with pool.workspace(source) as ws:
+        base = ws.base
+
+    assert pool.evict_idle() == 0
+    pool.idle_timeout = 0
+    assert pool.evict_idle() == 1
+    assert pool.idle == 0 and not base.exists()
+
+    pool.idle_timeout = 300
+    with pytest.raises(RuntimeError):
+        with pool.workspace(source) as ws:
+            base = ws.base
+            raise RuntimeError("job failed")
+
+    assert pool.idle == 0 and not base.exists()